@@ -0,0 +1,86 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+from .observability import get_logger
+
+logger = get_logger("cache")
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a fixed time to live"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None on a miss or an expired entry"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+def normalize_query(query: str) -> str:
+    """Cache key form of a query: lower case, single spaces, no surrounding punctuation"""
+    return re.sub(r'\s+', ' ', query.lower()).strip(' \t\n?!.,;:"\'')
+
+# Level 1: query text -> embedding. Embeddings only change with the model, so they live long.
+embedding_cache = TTLCache(
+    maxsize=int(os.environ.get("EMBEDDING_CACHE_SIZE", "4096")),
+    ttl=float(os.environ.get("EMBEDDING_CACHE_TTL", "86400")),
+)
+
+# Level 2: (tool, query, filters, top_k) -> formatted tool output. Shorter TTL so catalog changes show up.
+result_cache = TTLCache(
+    maxsize=int(os.environ.get("RESULT_CACHE_SIZE", "1024")),
+    ttl=float(os.environ.get("RESULT_CACHE_TTL", "900")),
+)
+
+def invalidate_caches(include_embeddings: bool = False):
+    """Drop cached tool results after reindexing (embeddings stay valid unless the model changed)"""
+    result_cache.clear()
+    if include_embeddings:
+        embedding_cache.clear()
+    logger.info("Invalidated result cache%s", " and embedding cache" if include_embeddings else "")
+
+def cache_stats() -> Dict[str, Dict[str, float]]:
+    return {
+        "embeddings": embedding_cache.stats(),
+        "results": result_cache.stats(),
+    }
@@ -0,0 +1,134 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from .cache import embedding_cache, normalize_query
+from .observability import get_logger
+
+logger = get_logger("embedding")
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+# "torch" (default) runs the sentence transformer; "onnx" runs the int8 export from RAG.onnx_embedding
+# and needs the optional packages in requirements-onnx.txt (pip install -r requirements-onnx.txt)
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "torch").lower()
+
+# Encoding is CPU bound and torch already multithreads each call, so keep this pool small
+EMBEDDING_WORKERS = int(os.environ.get("EMBEDDING_WORKERS", "2"))
+_encode_executor = ThreadPoolExecutor(max_workers=EMBEDDING_WORKERS, thread_name_prefix="embedding")
+
+# Single model instance shared by the parts, repairs and support searches
+_model = None
+_model_lock = threading.Lock()
+_model_stats: Dict[str, Optional[float]] = {
+    "load_seconds": None,
+    "parameter_mb": None,
+    "rss_delta_mb": None,
+}
+
+def _rss_mb() -> float:
+    """Current resident set size of this process in MB"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # Non-Linux fallback: peak RSS is the best we can do without extra dependencies
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _load_model():
+    """Load the embedding model for EMBEDDING_BACKEND and record how long and how much memory it took"""
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    if EMBEDDING_BACKEND == "onnx":
+        try:
+            import onnxruntime  # noqa: F401
+        except ImportError as e:
+            raise ImportError(
+                "EMBEDDING_BACKEND=onnx needs ONNX Runtime, which is optional: pip install -r requirements-onnx.txt"
+            ) from e
+        from .onnx_embedding import OnnxEncoder
+
+        model = OnnxEncoder()
+        parameter_bytes = model.model_bytes()
+    elif EMBEDDING_BACKEND == "torch":
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer(MODEL_NAME)
+        parameter_bytes = sum(p.numel() * p.element_size() for p in model.parameters())
+    else:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND: {EMBEDDING_BACKEND}")
+    load_seconds = time.perf_counter() - start
+
+    _model_stats["load_seconds"] = load_seconds
+    _model_stats["parameter_mb"] = parameter_bytes / (1024 * 1024)
+    _model_stats["rss_delta_mb"] = _rss_mb() - rss_before
+
+    logger.info(
+        "Loaded %s (%s) in %.2fs (parameters: %.1f MB, RSS delta: %.1f MB)",
+        MODEL_NAME, EMBEDDING_BACKEND, load_seconds, _model_stats['parameter_mb'], _model_stats['rss_delta_mb']
+    )
+    return model
+
+def get_model():
+    """Return the shared model, loading it on first use"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = _load_model()
+    return _model
+
+def _encode_and_cache(text: str, key: str) -> List[float]:
+    vector = get_model().encode(text).tolist()
+    embedding_cache.set(key, vector)
+    return vector
+
+def encode(text: str, use_cache: bool = True) -> List[float]:
+    """Embed a single piece of text, reusing cached embeddings for repeated queries"""
+    if not use_cache:
+        return get_model().encode(text).tolist()
+    key = normalize_query(text)
+    vector = embedding_cache.get(key)
+    return vector if vector is not None else _encode_and_cache(text, key)
+
+async def encode_async(text: str) -> List[float]:
+    """Embed text on the bounded encoding pool without blocking the event loop"""
+    key = normalize_query(text)
+    vector = embedding_cache.get(key)
+    if vector is not None:
+        return vector
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_encode_executor, _encode_and_cache, text, key)
+
+def encode_batch(texts: List[str], batch_size: int = 256, pool: Optional[Dict] = None):
+    """
+    Embed many texts at once for ingestion (no caching); returns an (n, dim) float32 array
+    Pass a pool from start_encode_pool to spread the work over several processes
+    """
+    model = get_model()
+    if pool is not None:
+        return model.encode_multi_process(texts, pool, batch_size=batch_size)
+    return model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+
+def start_encode_pool(processes: Optional[int] = None) -> Optional[Dict]:
+    """Start a multi-process encoding pool, one CPU worker per core by default (None for the onnx backend)"""
+    if EMBEDDING_BACKEND == "onnx":
+        logger.info("The onnx backend encodes in-process; ONNX Runtime already uses every core per batch")
+        return None
+    processes = processes or os.cpu_count() or 1
+    return get_model().start_multi_process_pool(target_devices=['cpu'] * processes)
+
+def stop_encode_pool(pool: Dict):
+    get_model().stop_multi_process_pool(pool)
+
+def model_stats() -> Dict[str, Optional[float]]:
+    """Load time and memory footprint of the shared model (None until loaded)"""
+    return {
+        "model": MODEL_NAME,
+        "backend": EMBEDDING_BACKEND,
+        "loaded": _model is not None,
+        **_model_stats,
+    }
@@ -0,0 +1,192 @@
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+# Normalized, typed facets shared by ingestion (stored as metadata) and query-side
+# filter extraction, so the values a filter asks for are the values the index holds.
+
+# Canonical symptom keys and the phrasings that map to them. The same patterns are run
+# over the catalog's symptom strings at ingestion and over user queries at search time.
+SYMPTOM_PATTERNS: Dict[str, str] = {
+    "leaking": r"\bleak",
+    "noisy": r"\bnois|\bloud\b|\bclicking\b|\brattl|\bbuzz|\bsqueal|\bgrind",
+    "not_starting": r"\bnot (start|turn on|power on)|\bno power\b|\bdead\b",
+    "not_cleaning": r"\bnot clean|\bdirty dishes\b|\bdishes (are |still )?dirty\b",
+    "not_draining": r"\bnot drain|\bstanding water\b|\bwater in the bottom\b",
+    "not_filling": r"\bnot fill",
+    "not_drying": r"\bnot dry",
+    "not_dispensing_detergent": r"\bdetergent\b|\bsoap\b",
+    "ice_not_making": r"\bnot mak\w* ice\b|\bno ice\b|\bice maker not (work|mak)",
+    "ice_dispensing": r"\bdispens\w* (too little |too much )?ice\b|\bice (dispenser|not dispens)",
+    "water_not_dispensing": r"\bnot dispens\w* water\b|\bwater dispenser\b|\bno water\b",
+    "too_warm": r"\btoo warm\b|\bnot cool|\bnot cold\b|\bwarm\b",
+    "too_cold": r"\btoo cold\b|\bfreezing (food|everything)\b",
+    "runs_too_long": r"\bruns? (too long|constantly|all the time|non.?stop)\b|\bnot stop running\b",
+    "not_defrosting": r"\bdefrost|\bfrost\b",
+    "door": r"\bdoor (not|pops|latch)|\blid or door\b|\blatch\b",
+    "sweating": r"\bsweat|\bcondensation\b",
+    "light_not_working": r"\blight (not|bulb|is out)\b|\bbulb\b",
+    "touchpad": r"\btouch ?pad\b|\bcontrol panel\b|\bbuttons?\b.*\bnot respond",
+    "not_heating": r"\bnot heat|\bno heat\b|\bigniter\b|\bnot light\b",
+    "not_spinning": r"\bnot (spin|agitat)|\bspins slowly\b",
+}
+_SYMPTOM_REGEXES = {key: re.compile(pattern) for key, pattern in SYMPTOM_PATTERNS.items()}
+
+# Query words -> canonical appliance type keys as stored in the appliance_types facet
+APPLIANCE_SYNONYMS: Dict[str, str] = {
+    "refrigerator": "refrigerator",
+    "fridge": "refrigerator",
+    "freezer": "freezer",
+    "dishwasher": "dishwasher",
+    "washer": "washer",
+    "washing machine": "washer",
+    "dryer": "dryer",
+    "microwave": "microwave",
+}
+
+# Query difficulty words -> stored difficulty keys they cover
+DIFFICULTY_LEVELS: Dict[str, List[str]] = {
+    "easy": ["really easy", "very easy", "easy"],
+    "moderate": ["a bit difficult"],
+    "difficult": ["a bit difficult", "difficult", "very difficult"],
+    "professional": ["very difficult"],
+}
+
+def normalize_phrase(text: str) -> str:
+    """Lower case, straight apostrophes, contractions spelled as "not", single spaces"""
+    text = text.lower().replace("’", "'")
+    text = re.sub(r"\b(won't|wont|will not|doesn't|doesnt|does not|isn't|isnt|is not|can't|cannot|stopped)\b", "not", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+def normalize_symptoms(text: str) -> List[str]:
+    """Map free text or a pipe-joined symptom list to canonical symptom keys"""
+    phrase = normalize_phrase(text)
+    return [key for key, regex in _SYMPTOM_REGEXES.items() if regex.search(phrase)]
+
+def normalize_appliance_types(value: str) -> List[str]:
+    """Split a stored list like "Refrigerator, Freezer." into ["refrigerator", "freezer"]"""
+    types = []
+    for part in value.split(","):
+        part = part.strip(" .").lower()
+        if part and part not in types:
+            types.append(part)
+    return types
+
+def normalize_brand(brand: str) -> str:
+    """Canonical brand key: lower case alphanumerics only ("GE" and "Ge" both become "ge")"""
+    return re.sub(r"[^a-z0-9]", "", brand.lower())
+
+def normalize_difficulty(difficulty: str) -> str:
+    return re.sub(r"\s+", " ", difficulty.lower()).strip()
+
+def parse_price(price: str) -> Optional[float]:
+    try:
+        return float(str(price).replace("$", "").replace(",", "").strip())
+    except ValueError:
+        return None
+
+def parse_install_minutes(install_time: str) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Parse "15 - 30 mins", "Less than 15 mins", "1- 2 hours" or "More than 2 hours"
+    into a (min, max) range in minutes; open or unknown ends are None
+    """
+    text = install_time.lower()
+    numbers = [int(n) for n in re.findall(r"\d+", text)]
+    if not numbers:
+        return None, None
+    scale = 60 if "hour" in text else 1
+    numbers = [n * scale for n in numbers]
+    if "less than" in text:
+        return 0, numbers[0]
+    if "more than" in text:
+        return numbers[0], None
+    return numbers[0], numbers[-1]
+
+def part_facets(row: Dict) -> Dict:
+    """Typed filter fields for a parts row; unknown values are left out rather than stored as placeholders"""
+    facets = {
+        "appliance_types": normalize_appliance_types(str(row['appliance_types'])),
+        "brand_key": normalize_brand(str(row['brand'])),
+        "symptom_keys": normalize_symptoms(str(row['symptoms'])),
+        "difficulty_key": normalize_difficulty(str(row['install_difficulty'])),
+    }
+    price = parse_price(row['part_price'])
+    if price is not None:
+        facets["price_value"] = price
+    minutes_min, minutes_max = parse_install_minutes(str(row['install_time']))
+    if minutes_min is not None:
+        facets["install_minutes_min"] = minutes_min
+    if minutes_max is not None:
+        facets["install_minutes_max"] = minutes_max
+    return facets
+
+def repair_facets(row: Dict) -> Dict:
+    """Typed filter fields for a repairs row"""
+    return {
+        "appliance_types": normalize_appliance_types(str(row['Product'])),
+        "symptom_keys": normalize_symptoms(str(row['symptom'])),
+        "difficulty_key": normalize_difficulty(str(row['difficulty'])),
+    }
+
+def extract_appliance_types(text: str) -> List[str]:
+    """Canonical appliance types named in a query"""
+    text = text.lower()
+    found = []
+    for word, appliance in APPLIANCE_SYNONYMS.items():
+        if re.search(rf"\b{word}s?\b", text) and appliance not in found:
+            found.append(appliance)
+    return found
+
+def extract_difficulty_keys(text: str) -> Optional[List[str]]:
+    words = text.lower().split()
+    for level, keys in DIFFICULTY_LEVELS.items():
+        if level in words:
+            return keys
+    return None
+
+def extract_price_filter(text: str) -> Optional[Dict[str, float]]:
+    """ "under $50" -> {"$lte": 50.0}, "over $100" -> {"$gte": 100.0} """
+    text = text.lower()
+    match = re.search(r"\b(under|below|less than|cheaper than|max(?:imum)?|up to)\s+\$?(\d+(?:\.\d+)?)(?!\d|\.\d|\s*(?:min|hour|hr))", text)
+    if match:
+        return {"$lte": float(match.group(2))}
+    match = re.search(r"\b(over|above|more than|at least)\s+\$(\d+(?:\.\d+)?)", text)
+    if match:
+        return {"$gte": float(match.group(2))}
+    return None
+
+def extract_install_minutes_filter(text: str) -> Optional[Dict[str, int]]:
+    """ "under 30 minutes" / "less than an hour" -> {"$lte": minutes} on install_minutes_max"""
+    text = text.lower()
+    match = re.search(r"\b(under|within|less than|in)\s+(\d+|an?|one)\s*(min|minutes?|mins|hours?|hrs?)\b", text)
+    if not match:
+        return None
+    amount = 1 if match.group(2) in ("a", "an", "one") else int(match.group(2))
+    return {"$lte": amount * (60 if match.group(3).startswith("h") else 1)}
+
+# How often a filtered search came back empty and had to be repeated without filters
+# Searches run on the search pool threads, so updates and reads hold _filter_stats_lock
+FILTER_STATS: Counter = Counter()
+_filter_stats_lock = threading.Lock()
+
+def record_filter_outcome(index_name: str, hit: bool):
+    with _filter_stats_lock:
+        FILTER_STATS[f"{index_name}_filtered"] += 1
+        if not hit:
+            FILTER_STATS[f"{index_name}_fallback"] += 1
+
+def filter_stats() -> Dict[str, int]:
+    """A consistent copy of FILTER_STATS"""
+    with _filter_stats_lock:
+        return dict(FILTER_STATS)
+
+def filter_fallback_rates() -> Dict[str, float]:
+    """Share of filtered searches per index that fell back to unfiltered search"""
+    stats = filter_stats()
+    rates = {}
+    for key, filtered in stats.items():
+        if key.endswith("_filtered") and filtered:
+            index_name = key[:-len("_filtered")]
+            rates[index_name] = stats.get(f"{index_name}_fallback", 0) / filtered
+    return rates
@@ -0,0 +1,589 @@
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .observability import get_logger
+from .pinecone_client import get_pinecone
+
+logger = get_logger("index")
+
+# "pinecone" (default) or "local"
+INDEX_BACKEND = os.environ.get("INDEX_BACKEND", "pinecone").lower()
+LOCAL_INDEX_DIR = os.environ.get(
+    "LOCAL_INDEX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "indexes")
+)
+# Approximate (IVF) search for the local backend; exact search is the default
+LOCAL_INDEX_APPROXIMATE = os.environ.get("LOCAL_INDEX_APPROXIMATE", "false").lower() == "true"
+LOCAL_INDEX_NPROBE = int(os.environ.get("LOCAL_INDEX_NPROBE", "8"))
+# Compressed vectors for the local backend: "none", "int8" (4x smaller) or "binary" (32x smaller).
+# Top-k is shortlisted on the compressed codes and the shortlist is re-ranked with the float vectors.
+LOCAL_INDEX_QUANTIZATION = os.environ.get("LOCAL_INDEX_QUANTIZATION", "none").lower()
+LOCAL_INDEX_RERANK = int(os.environ.get("LOCAL_INDEX_RERANK", "100"))
+
+# Rows decoded per block when scoring compressed vectors; small blocks stay in cache
+_QUANTIZED_BLOCK_ROWS = 256
+
+class IndexBackend(ABC):
+    """
+    Interface shared by all vector index backends
+    query() returns a dict shaped like a Pinecone query response:
+    {'matches': [{'id': str, 'score': float, 'metadata': dict}, ...]}
+    With fields set, each match's metadata is projected to just those keys
+    """
+
+    @abstractmethod
+    def query(
+        self,
+        vector: Sequence[float],
+        top_k: int,
+        include_metadata: bool = True,
+        filter: Optional[Dict] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> Dict:
+        """The top_k nearest records to vector, best first, optionally restricted by a metadata filter"""
+
+    @abstractmethod
+    def upsert(self, vectors: Sequence[Tuple[str, Sequence[float], Dict]]):
+        """Insert or replace (id, vector, metadata) records"""
+
+    @abstractmethod
+    def update_metadata(self, updates: Dict[str, Dict]):
+        """Replace the metadata of existing records without touching their vectors"""
+
+    @abstractmethod
+    def delete(self, ids: Sequence[str]):
+        """Remove records by id"""
+
+    def apply_changes(
+        self,
+        upserts: Sequence[Tuple[str, Sequence[float], Dict]] = (),
+        metadata_updates: Optional[Dict[str, Dict]] = None,
+        deletes: Sequence[str] = ()
+    ):
+        """Apply one incremental sync: upserts, then metadata-only updates, then deletes"""
+        if upserts:
+            self.upsert(upserts)
+        if metadata_updates:
+            self.update_metadata(metadata_updates)
+        if deletes:
+            self.delete(deletes)
+
+class PineconeIndexBackend(IndexBackend):
+    """Pinecone serverless index"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.index = get_pinecone().Index(name)
+
+    def query(self, vector, top_k, include_metadata=True, filter=None, fields=None):
+        if filter:
+            results = self.index.query(vector=vector, top_k=top_k, include_metadata=include_metadata, filter=filter)
+        else:
+            results = self.index.query(vector=vector, top_k=top_k, include_metadata=include_metadata)
+        if fields is None or not include_metadata:
+            return results
+        # Pinecone returns whole metadata records, so projection happens client side
+        return {"matches": [
+            {"id": match['id'], "score": match['score'], "metadata": project_metadata(match['metadata'], fields)}
+            for match in results['matches']
+        ]}
+
+    def upsert(self, vectors, batch_size: int = 100):
+        vectors = [(id_, list(map(float, vec)), meta) for id_, vec, meta in vectors]
+        for i in range(0, len(vectors), batch_size):
+            self.index.upsert(vectors=vectors[i:i + batch_size])
+
+    def update_metadata(self, updates):
+        for id_, metadata in updates.items():
+            self.index.update(id=id_, set_metadata=metadata)
+
+    def delete(self, ids, batch_size: int = 1000):
+        ids = list(ids)
+        for i in range(0, len(ids), batch_size):
+            self.index.delete(ids=ids[i:i + batch_size])
+
+def project_metadata(metadata: Dict, fields: Optional[Sequence[str]]) -> Dict:
+    """Keep only the requested metadata fields (all of them when fields is None)"""
+    if fields is None:
+        return metadata
+    return {field: metadata[field] for field in fields if field in metadata}
+
+def _vector_path(directory: str, name: str) -> str:
+    return os.path.join(directory, f"{name}.npy")
+
+def _metadata_path(directory: str, name: str) -> str:
+    return os.path.join(directory, f"{name}.meta.json")
+
+def _codes_path(directory: str, name: str, quantization: str) -> str:
+    return os.path.join(directory, f"{name}.{quantization}.npy")
+
+def _manifest_path(directory: str, name: str) -> str:
+    return os.path.join(directory, f"{name}.manifest.json")
+
+def _replace_file(path: str, write: Callable):
+    """Write to a temporary file and rename it over path, so readers with the old file memory-mapped are unaffected"""
+    tmp_path = f"{path}.tmp"
+    mode = 'w' if path.endswith('.json') else 'wb'
+    with open(tmp_path, mode, **({'encoding': 'utf-8'} if mode == 'w' else {})) as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+def read_manifest(name: str, directory: Optional[str] = None) -> Optional[Dict[str, List[str]]]:
+    """Per-record content hashes ({id: [text_hash, metadata_hash]}) from the last sync, or None"""
+    path = _manifest_path(directory or LOCAL_INDEX_DIR, name)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)["records"]
+
+def write_manifest(name: str, records: Dict[str, List[str]], directory: Optional[str] = None):
+    directory = directory or LOCAL_INDEX_DIR
+    os.makedirs(directory, exist_ok=True)
+    _replace_file(_manifest_path(directory, name), lambda f: json.dump({"records": records}, f))
+
+def _generation_path(directory: str) -> str:
+    return os.path.join(directory, "generation.json")
+
+def read_index_generation(directory: Optional[str] = None) -> int:
+    """Generation written by the last ingest run into directory, or 0 if none has written one"""
+    try:
+        with open(_generation_path(directory or LOCAL_INDEX_DIR), 'r', encoding='utf-8') as f:
+            return int(json.load(f)["generation"])
+    except (OSError, ValueError, KeyError):
+        return 0
+
+def write_index_generation(directory: Optional[str] = None) -> int:
+    """Record that the artifacts in directory changed; returns the new generation"""
+    directory = directory or LOCAL_INDEX_DIR
+    os.makedirs(directory, exist_ok=True)
+    generation = time.time_ns()
+    _replace_file(_generation_path(directory), lambda f: json.dump({"generation": generation}, f))
+    return generation
+
+def quantize_int8(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Per-dimension scalar quantization; returns (codes, offset, scale) with x ~ offset + scale * (code + 128)"""
+    offset = matrix.min(axis=0) if len(matrix) else np.zeros(matrix.shape[1], dtype=np.float32)
+    scale = (matrix.max(axis=0) - offset) / 255 if len(matrix) else np.ones(matrix.shape[1], dtype=np.float32)
+    scale = np.where(scale > 0, scale, 1.0).astype(np.float32)
+    codes = np.clip(np.rint((matrix - offset) / scale) - 128, -128, 127).astype(np.int8)
+    return codes, offset.astype(np.float32), scale
+
+def quantize_binary(matrix: np.ndarray, center: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Sign quantization around the per-dimension mean, packed 8 dimensions per byte; returns (codes, center)"""
+    if center is None:
+        center = matrix.mean(axis=0) if len(matrix) else np.zeros(matrix.shape[1], dtype=np.float32)
+    return np.packbits(matrix > center, axis=-1), center.astype(np.float32)
+
+def _quantization_params(matrix: np.ndarray) -> Tuple[Dict[str, np.ndarray], Dict[str, List[float]]]:
+    """Compressed codes for every supported quantization plus the parameters needed to encode queries"""
+    int8_codes, offset, scale = quantize_int8(matrix)
+    binary_codes, center = quantize_binary(matrix)
+    params = {"int8_offset": offset.tolist(), "int8_scale": scale.tolist(), "binary_center": center.tolist()}
+    return {"int8": int8_codes, "binary": binary_codes}, params
+
+def write_local_index_arrays(
+    name: str,
+    ids: Sequence[str],
+    matrix: np.ndarray,
+    metadata: Sequence[Dict],
+    directory: Optional[str] = None,
+    metric: str = "euclidean"
+) -> str:
+    """Write an (n, dim) float32 matrix with its ids and metadata as a LocalIndexBackend artifact"""
+    directory = directory or LOCAL_INDEX_DIR
+    os.makedirs(directory, exist_ok=True)
+
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if not (len(ids) == len(matrix) == len(metadata)):
+        raise ValueError("ids, vectors and metadata must have the same length")
+
+    _replace_file(_vector_path(directory, name), lambda f: np.save(f, matrix))
+    codes, params = _quantization_params(matrix)
+    for quantization, quantized in codes.items():
+        _replace_file(_codes_path(directory, name, quantization), lambda f, q=quantized: np.save(f, q))
+    payload = {"metric": metric, "ids": list(ids), "metadata": list(metadata), "quantization": params}
+    _replace_file(_metadata_path(directory, name), lambda f: json.dump(payload, f))
+
+    logger.info("Wrote %d vectors for '%s' to %s", len(ids), name, directory)
+    return _vector_path(directory, name)
+
+def write_local_index(
+    name: str,
+    vectors: Sequence[Tuple[str, Sequence[float], Dict]],
+    directory: Optional[str] = None,
+    metric: str = "euclidean"
+) -> str:
+    """
+    Write (id, vector, metadata) tuples - the same shape Pinecone upserts take -
+    as a .npy matrix plus a .meta.json file for LocalIndexBackend
+    """
+    return write_local_index_arrays(
+        name,
+        [id_ for id_, _, _ in vectors],
+        np.asarray([vec for _, vec, _ in vectors], dtype=np.float32),
+        [meta for _, _, meta in vectors],
+        directory=directory,
+        metric=metric
+    )
+
+def read_local_index(name: str, directory: Optional[str] = None) -> Tuple[List[str], np.ndarray, List[Dict]]:
+    """Load ids, a memory-mapped vector matrix and metadata from a local index artifact"""
+    directory = directory or LOCAL_INDEX_DIR
+    matrix = np.load(_vector_path(directory, name), mmap_mode='r')
+    with open(_metadata_path(directory, name), 'r', encoding='utf-8') as f:
+        payload = json.load(f)
+    return payload["ids"], matrix, payload["metadata"]
+
+class MetadataFilter:
+    """
+    Evaluates Pinecone-style metadata filters ($eq, $ne, $in, $nin, $gt, $gte, $lt,
+    $lte, $exists, $and, $or) over a list of metadata dicts, one per row.
+    List-valued metadata matches if any element matches.
+    """
+
+    def __init__(self, metadata: List[Dict]):
+        self.metadata = metadata
+        # Lazily built per-field lookup structures
+        self._postings: Dict[str, Dict] = {}
+        self._numeric: Dict[str, np.ndarray] = {}
+
+    def _field_postings(self, field: str) -> Dict:
+        """Map each value of a metadata field to the row numbers holding it"""
+        if field not in self._postings:
+            postings: Dict = {}
+            for row, metadata in enumerate(self.metadata):
+                value = metadata.get(field)
+                values = value if isinstance(value, list) else [value]
+                for item in values:
+                    postings.setdefault(item, []).append(row)
+            self._postings[field] = {k: np.asarray(v, dtype=np.int64) for k, v in postings.items()}
+        return self._postings[field]
+
+    def _field_numeric(self, field: str) -> np.ndarray:
+        """Numeric view of a metadata field (NaN where not a number)"""
+        if field not in self._numeric:
+            column = np.full(len(self.metadata), np.nan)
+            for row, metadata in enumerate(self.metadata):
+                value = metadata.get(field)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    column[row] = value
+            self._numeric[field] = column
+        return self._numeric[field]
+
+    def _rows_with(self, field: str, values: Iterable) -> np.ndarray:
+        mask = np.zeros(len(self.metadata), dtype=bool)
+        postings = self._field_postings(field)
+        for value in values:
+            rows = postings.get(value)
+            if rows is not None:
+                mask[rows] = True
+        return mask
+
+    def _condition_mask(self, field: str, condition) -> np.ndarray:
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+
+        mask = np.ones(len(self.metadata), dtype=bool)
+        for op, operand in condition.items():
+            if op == "$eq":
+                mask &= self._rows_with(field, [operand])
+            elif op == "$ne":
+                mask &= ~self._rows_with(field, [operand])
+            elif op == "$in":
+                mask &= self._rows_with(field, operand)
+            elif op == "$nin":
+                mask &= ~self._rows_with(field, operand)
+            elif op == "$exists":
+                present = np.array([field in m for m in self.metadata], dtype=bool)
+                mask &= present if operand else ~present
+            elif op in ("$gt", "$gte", "$lt", "$lte"):
+                column = self._field_numeric(field)
+                with np.errstate(invalid='ignore'):
+                    if op == "$gt":
+                        mask &= column > operand
+                    elif op == "$gte":
+                        mask &= column >= operand
+                    elif op == "$lt":
+                        mask &= column < operand
+                    else:
+                        mask &= column <= operand
+            else:
+                raise ValueError(f"Unsupported filter operator: {op}")
+        return mask
+
+    def mask(self, filter: Optional[Dict]) -> np.ndarray:
+        """Boolean mask of rows matching a Pinecone-style metadata filter"""
+        mask = np.ones(len(self.metadata), dtype=bool)
+        if not filter:
+            return mask
+        for key, value in filter.items():
+            if key == "$and":
+                for clause in value:
+                    mask &= self.mask(clause)
+            elif key == "$or":
+                any_mask = np.zeros(len(self.metadata), dtype=bool)
+                for clause in value:
+                    any_mask |= self.mask(clause)
+                mask &= any_mask
+            else:
+                mask &= self._condition_mask(key, value)
+        return mask
+
+class LocalIndexBackend(IndexBackend):
+    """
+    In-process NumPy index memory-mapped from a prebuilt .npy file
+    Supports exact top-k, an optional IVF approximate mode and int8/binary quantized
+    search with float re-ranking, and evaluates Pinecone-style metadata filters
+    through MetadataFilter
+
+    An instance is a read-only snapshot. upsert/update_metadata/delete rewrite the
+    artifact on disk and drop the cached get_index() instance so later queries load it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        directory: Optional[str] = None,
+        approximate: bool = LOCAL_INDEX_APPROXIMATE,
+        nprobe: int = LOCAL_INDEX_NPROBE,
+        quantization: str = LOCAL_INDEX_QUANTIZATION,
+        rerank: int = LOCAL_INDEX_RERANK
+    ):
+        directory = directory or LOCAL_INDEX_DIR
+        self.name = name
+        self.directory = directory
+        self.vectors = np.load(_vector_path(directory, name), mmap_mode='r')
+        with open(_metadata_path(directory, name), 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        self.metric = payload.get("metric", "euclidean")
+        self.ids: List[str] = payload["ids"]
+        self.metadata: List[Dict] = payload["metadata"]
+
+        if quantization not in ("none", "int8", "binary"):
+            raise ValueError(f"Unknown LOCAL_INDEX_QUANTIZATION: {quantization}")
+        self.quantization = quantization
+        self.rerank = rerank
+        if quantization == "none":
+            self.norms = np.einsum('ij,ij->i', self.vectors, self.vectors)
+        else:
+            # Only the compressed codes are read in full; float rows are paged in for re-ranking only
+            self.norms = None
+            self._load_codes(directory, payload.get("quantization"))
+
+        self._filter = MetadataFilter(self.metadata)
+
+        self.nprobe = nprobe
+        self.centroids = None
+        self.assignments = None
+        if approximate and len(self.ids) > 0:
+            self._build_ivf()
+
+    def apply_changes(self, upserts=(), metadata_updates=None, deletes=()):
+        """Apply all changes with a single rewrite of the artifact"""
+        positions = {id_: row for row, id_ in enumerate(self.ids)}
+        ids = list(self.ids)
+        metadata = list(self.metadata)
+        matrix = np.array(self.vectors)
+        new_vectors = []
+        for id_, vector, meta in upserts:
+            if id_ in positions:
+                matrix[positions[id_]] = vector
+                metadata[positions[id_]] = meta
+            else:
+                positions[id_] = len(ids)
+                ids.append(id_)
+                metadata.append(meta)
+                new_vectors.append(vector)
+        if new_vectors:
+            matrix = np.vstack([matrix, np.asarray(new_vectors, dtype=np.float32)])
+        for id_, meta in (metadata_updates or {}).items():
+            if id_ in positions:
+                metadata[positions[id_]] = meta
+        if deletes:
+            deleted = set(deletes)
+            keep = [row for row, id_ in enumerate(ids) if id_ not in deleted]
+            ids = [ids[row] for row in keep]
+            metadata = [metadata[row] for row in keep]
+            matrix = matrix[keep]
+
+        write_local_index_arrays(self.name, ids, matrix, metadata, directory=self.directory, metric=self.metric)
+        reset_index(self.name)
+
+    def upsert(self, vectors):
+        self.apply_changes(upserts=vectors)
+
+    def update_metadata(self, updates):
+        self.apply_changes(metadata_updates=updates)
+
+    def delete(self, ids):
+        self.apply_changes(deletes=ids)
+
+    def _load_codes(self, directory: str, params: Optional[Dict]):
+        path = _codes_path(directory, self.name, self.quantization)
+        if params is None or not os.path.exists(path):
+            # Artifact predates quantization: derive the codes from the float vectors once
+            logger.warning("No %s codes for '%s', quantizing in memory", self.quantization, self.name)
+            codes, params = _quantization_params(np.asarray(self.vectors))
+            self.codes = codes[self.quantization]
+        else:
+            self.codes = np.load(path)
+
+        if self.quantization == "int8":
+            self.int8_offset = np.asarray(params["int8_offset"], dtype=np.float32)
+            self.int8_scale = np.asarray(params["int8_scale"], dtype=np.float32)
+            # Squared norms of the decoded vectors, for approximate euclidean/cosine scores
+            self.code_norms = np.empty(len(self.codes), dtype=np.float32)
+            for start in range(0, len(self.codes), _QUANTIZED_BLOCK_ROWS):
+                block = self._decode_int8(self.codes[start:start + _QUANTIZED_BLOCK_ROWS])
+                self.code_norms[start:start + len(block)] = np.einsum('ij,ij->i', block, block)
+        else:
+            self.binary_center = np.asarray(params["binary_center"], dtype=np.float32)
+
+    def _decode_int8(self, codes: np.ndarray) -> np.ndarray:
+        return self.int8_offset + self.int8_scale * (codes.astype(np.float32) + 128)
+
+    def memory_bytes(self) -> int:
+        """Bytes that must stay resident to answer queries (codes + norms, or the float matrix)"""
+        if self.quantization == "none":
+            return self.vectors.nbytes + self.norms.nbytes
+        extra = self.code_norms.nbytes if self.quantization == "int8" else 0
+        return self.codes.nbytes + extra
+
+    def _approximate_order(self, query: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Rank key (lower is better) for rows computed on the compressed codes only"""
+        # Unfiltered searches cover every row; slicing avoids gathering a copy of the codes
+        codes = self.codes if len(rows) == len(self.codes) else self.codes[rows]
+        if self.quantization == "binary":
+            # Hamming distance between sign codes approximates the angle between vectors
+            query_code, _ = quantize_binary(query[None, :], self.binary_center)
+            if codes.shape[1] % 8 == 0:
+                codes, query_code = codes.view(np.uint64), query_code.view(np.uint64)
+            return np.bitwise_count(codes ^ query_code).sum(axis=1, dtype=np.int32)
+
+        # x . q = offset . q + (code + 128) . (scale * q)
+        weights = self.int8_scale * query
+        base = float(self.int8_offset @ query + 128 * weights.sum())
+        dots = np.empty(len(rows), dtype=np.float32)
+        for start in range(0, len(rows), _QUANTIZED_BLOCK_ROWS):
+            block = codes[start:start + _QUANTIZED_BLOCK_ROWS]
+            dots[start:start + len(block)] = block.astype(np.float32) @ weights
+        return self._metric_order(dots + base, self.code_norms[rows], query)
+
+    def _metric_order(self, dots: np.ndarray, norms: np.ndarray, query: np.ndarray) -> np.ndarray:
+        scores = self._metric_scores(dots, norms, query)
+        return scores if self.metric == "euclidean" else -scores
+
+    def _shortlist(self, query: np.ndarray, rows: np.ndarray, size: int) -> np.ndarray:
+        """The `size` rows that rank best on the compressed codes"""
+        order = self._approximate_order(query, rows)
+        return rows[np.argpartition(order, size - 1)[:size]]
+
+    def _build_ivf(self, iterations: int = 10, seed: int = 0):
+        """Coarse k-means partitioning used for approximate search"""
+        n = len(self.ids)
+        nlist = max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(seed)
+        data = np.asarray(self.vectors)
+        centroids = data[rng.choice(n, size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = self._nearest_centroid(data, centroids)
+            for c in range(nlist):
+                members = data[assignments == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+        self.centroids = centroids
+        self.assignments = self._nearest_centroid(data, centroids)
+
+    @staticmethod
+    def _nearest_centroid(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        distances = (
+            np.einsum('ij,ij->i', centroids, centroids)[None, :]
+            - 2 * data @ centroids.T
+        )
+        return distances.argmin(axis=1)
+
+    def filter_mask(self, filter: Optional[Dict]) -> np.ndarray:
+        """Boolean mask of rows matching a Pinecone-style metadata filter"""
+        return self._filter.mask(filter)
+
+    def _metric_scores(self, dots: np.ndarray, norms: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Pinecone-compatible scores: squared distance for euclidean, similarity otherwise"""
+        if self.metric == "euclidean":
+            return np.maximum(norms - 2 * dots + query @ query, 0.0)
+        if self.metric == "cosine":
+            return dots / (np.sqrt(norms) * np.linalg.norm(query) + 1e-12)
+        return dots
+
+    def _scores(self, query: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Exact scores from the float vectors"""
+        if self.norms is None:
+            # Quantized mode: gather only the shortlisted rows from the memory map
+            vectors = np.asarray(self.vectors[rows])
+            return self._metric_scores(vectors @ query, np.einsum('ij,ij->i', vectors, vectors), query)
+        if len(rows) * 4 >= len(self.ids):
+            # Scoring every row is cheaper than gathering a large subset from the memory map
+            dots = (self.vectors @ query)[rows]
+        else:
+            dots = self.vectors[rows] @ query
+        return self._metric_scores(dots, self.norms[rows], query)
+
+    def _candidate_rows(self, query: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        if self.centroids is None:
+            return np.flatnonzero(mask)
+        distances = np.einsum('ij,ij->i', self.centroids, self.centroids) - 2 * self.centroids @ query
+        probe = np.argsort(distances)[:self.nprobe]
+        in_probe = np.isin(self.assignments, probe)
+        rows = np.flatnonzero(mask & in_probe)
+        # Fall back to exact search if the probed lists cannot fill the request
+        return rows if len(rows) else np.flatnonzero(mask)
+
+    def query(self, vector, top_k, include_metadata=True, filter=None, fields=None):
+        query = np.asarray(vector, dtype=np.float32)
+        mask = self.filter_mask(filter)
+        rows = self._candidate_rows(query, mask)
+        if len(rows) == 0:
+            return {"matches": []}
+        if self.quantization != "none" and len(rows) > max(self.rerank, top_k):
+            rows = self._shortlist(query, rows, max(self.rerank, top_k))
+
+        scores = self._scores(query, rows)
+        k = min(top_k, len(rows))
+        # Lower is better for euclidean distance, higher for similarity metrics
+        order = scores if self.metric == "euclidean" else -scores
+        best = np.argpartition(order, k - 1)[:k]
+        best = best[np.argsort(order[best])]
+
+        matches = []
+        for position in best:
+            row = int(rows[position])
+            match = {"id": self.ids[row], "score": float(scores[position])}
+            if include_metadata:
+                match["metadata"] = project_metadata(self.metadata[row], fields)
+            matches.append(match)
+        return {"matches": matches}
+
+_indexes: Dict[str, IndexBackend] = {}
+_indexes_lock = threading.Lock()
+
+def get_index(name: str) -> IndexBackend:
+    """Return the configured backend for an index, creating it once per process"""
+    if name not in _indexes:
+        with _indexes_lock:
+            if name not in _indexes:
+                if INDEX_BACKEND == "local":
+                    _indexes[name] = LocalIndexBackend(name)
+                elif INDEX_BACKEND == "pinecone":
+                    _indexes[name] = PineconeIndexBackend(name)
+                else:
+                    raise ValueError(f"Unknown INDEX_BACKEND: {INDEX_BACKEND}")
+    return _indexes[name]
+
+def reset_index(name: str):
+    """Forget the cached backend for an index so the next get_index() reloads it"""
+    with _indexes_lock:
+        _indexes.pop(name, None)
@@ -0,0 +1,61 @@
+import os
+import threading
+import time
+from typing import Optional
+from .cache import invalidate_caches
+from .index_backend import read_index_generation, reset_index, write_index_generation
+from .lexical import reset_lexical_indexes
+from .observability import get_logger
+from .record_store import reset_record_store
+
+logger = get_logger("index_generation")
+
+# Ingest runs (python -m RAG.vectorize, ...) are separate processes, so resetting caches there does
+# not reach the API. Each run writes a new generation next to the local index artifacts; the API
+# checks it at most every INDEX_GENERATION_CHECK_INTERVAL seconds, keys cached tool results on it
+# and drops its indexes, BM25 indexes and record stores when it changes.
+INDEX_GENERATION_CHECK_INTERVAL = float(os.environ.get("INDEX_GENERATION_CHECK_INTERVAL", "1"))
+INDEX_NAMES = ("parts", "repairs", "policy")
+
+def reload_index_stores():
+    """Drop everything loaded from the index artifacts so the next query reads the current ones"""
+    for name in INDEX_NAMES:
+        reset_index(name)
+        reset_record_store(name)
+    reset_lexical_indexes()
+    invalidate_caches()
+
+def publish_index_update(directory: Optional[str] = None):
+    """Called by ingest once its artifacts are written: bump the generation and reload in this process too"""
+    generation = write_index_generation(directory)
+    reload_index_stores()
+    logger.info("Published index generation %d", generation)
+
+class IndexGenerationWatcher:
+    """Tracks the generation the running process has loaded and reloads when ingest publishes a new one"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self.generation: Optional[int] = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def current(self) -> int:
+        # Unlocked fast path between checks; the check is repeated under the lock
+        if self.generation is not None and time.monotonic() < self._next_check:
+            return self.generation
+        with self._lock:
+            if self.generation is None or time.monotonic() >= self._next_check:
+                self._next_check = time.monotonic() + INDEX_GENERATION_CHECK_INTERVAL
+                generation = read_index_generation(self.directory)
+                if self.generation is not None and generation != self.generation:
+                    logger.info("Index generation changed (%d -> %d), reloading index stores", self.generation, generation)
+                    reload_index_stores()
+                self.generation = generation
+            return self.generation
+
+_watcher = IndexGenerationWatcher()
+
+def index_generation() -> int:
+    """The current index generation, reloading the index stores first if ingest published a new one"""
+    return _watcher.current()
@@ -0,0 +1,145 @@
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .index_backend import IndexBackend, MetadataFilter, project_metadata
+from .observability import get_logger
+
+logger = get_logger("lexical")
+
+# Hybrid retrieval: BM25 over the same searchable text that is embedded, fused with the
+# vector ranking by weighted reciprocal rank fusion.
+# HYBRID_LEXICAL_WEIGHT is the lexical share of the fused score: 0 is pure vector, 1 is pure BM25.
+HYBRID_LEXICAL_WEIGHT = float(os.environ.get("HYBRID_LEXICAL_WEIGHT", "0.5"))
+HYBRID_RRF_K = int(os.environ.get("HYBRID_RRF_K", "60"))
+# Candidates taken from each index before fusion
+HYBRID_CANDIDATES = int(os.environ.get("HYBRID_CANDIDATES", "20"))
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from",
+    "how", "i", "in", "is", "it", "me", "my", "of", "on", "or", "the", "this", "to",
+    "what", "which", "with", "you", "your",
+}
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case alphanumeric tokens without stopwords; part numbers stay whole"""
+    return [token for token in re.findall(r'[a-z0-9]+', text.lower()) if token not in STOPWORDS]
+
+class BM25Index:
+    """In-memory Okapi BM25 index with the same match format and filters as the vector backends"""
+
+    def __init__(self, ids: List[str], texts: List[str], metadata: List[Dict], k1: float = 1.2, b: float = 0.75):
+        self.ids = ids
+        self.metadata = metadata
+        self._filter = MetadataFilter(metadata)
+
+        doc_terms = [Counter(tokenize(text)) for text in texts]
+        lengths = np.array([sum(terms.values()) for terms in doc_terms], dtype=np.float32)
+        avg_length = float(lengths.mean()) if len(lengths) else 0.0
+
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        for row, terms in enumerate(doc_terms):
+            for term, tf in terms.items():
+                postings.setdefault(term, []).append((row, tf))
+
+        # Each posting stores its final BM25 weight, so a query is only a few scatter-adds
+        n = len(ids)
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for term, entries in postings.items():
+            rows = np.array([row for row, _ in entries], dtype=np.int64)
+            tf = np.array([tf for _, tf in entries], dtype=np.float32)
+            idf = math.log(1 + (n - len(entries) + 0.5) / (len(entries) + 0.5))
+            norm = k1 * (1 - b + b * lengths[rows] / max(avg_length, 1e-9))
+            self.postings[term] = (rows, (idf * tf * (k1 + 1) / (tf + norm)).astype(np.float32))
+
+    def search(self, query: str, top_k: int, filter: Optional[Dict] = None, fields: Optional[Sequence[str]] = None) -> Dict:
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is not None:
+                rows, weights = posting
+                scores[rows] += weights
+        if filter:
+            scores[~self._filter.mask(filter)] = 0.0
+
+        rows = np.flatnonzero(scores > 0)
+        if len(rows) == 0:
+            return {"matches": []}
+        k = min(top_k, len(rows))
+        best = rows[np.argpartition(-scores[rows], k - 1)[:k]]
+        best = best[np.argsort(-scores[best])]
+        return {"matches": [
+            {"id": self.ids[row], "score": float(scores[row]), "metadata": project_metadata(self.metadata[row], fields)}
+            for row in best
+        ]}
+
+def reciprocal_rank_fusion(
+    vector_matches: List[Dict],
+    lexical_matches: List[Dict],
+    top_k: int,
+    lexical_weight: float = HYBRID_LEXICAL_WEIGHT,
+    k: int = HYBRID_RRF_K
+) -> List[Dict]:
+    """
+    Weighted RRF over two ranked match lists, keyed by match id
+    Scores are scaled so a document ranked first by both lists scores 1.0
+    """
+    fused: Dict[str, List] = {}
+    for weight, matches in ((1 - lexical_weight, vector_matches), (lexical_weight, lexical_matches)):
+        for rank, match in enumerate(matches):
+            entry = fused.setdefault(match["id"], [0.0, match])
+            entry[0] += weight / (k + rank + 1)
+
+    ranked = sorted(fused.values(), key=lambda entry: entry[0], reverse=True)[:top_k]
+    return [dict(match, score=score * (k + 1)) for score, match in ranked]
+
+def hybrid_query(
+    index: IndexBackend,
+    lexical: "BM25Index",
+    query: str,
+    query_vector: Optional[List[float]],
+    top_k: int,
+    filter: Optional[Dict] = None,
+    lexical_weight: Optional[float] = None,
+    fields: Optional[Sequence[str]] = None
+) -> Dict:
+    """Query the vector and BM25 indexes with the same filter and return the fused candidates"""
+    lexical_weight = HYBRID_LEXICAL_WEIGHT if lexical_weight is None else lexical_weight
+    depth = max(HYBRID_CANDIDATES, top_k)
+
+    vector_matches: List[Dict] = []
+    if lexical_weight < 1 and query_vector is not None:
+        vector_matches = index.query(vector=query_vector, top_k=depth, include_metadata=True, filter=filter, fields=fields)['matches']
+    lexical_matches: List[Dict] = []
+    if lexical_weight > 0:
+        lexical_matches = lexical.search(query, depth, filter=filter, fields=fields)['matches']
+
+    return {"matches": reciprocal_rank_fusion(vector_matches, lexical_matches, top_k, lexical_weight)}
+
+_lexical_indexes: Dict[str, BM25Index] = {}
+_lexical_lock = threading.Lock()
+
+def get_lexical_index(name: str, load_corpus: Callable[[], Tuple[List[str], List[str], List[Dict]]]) -> BM25Index:
+    """Return the BM25 index for a corpus, building it from load_corpus() once per process"""
+    if name not in _lexical_indexes:
+        with _lexical_lock:
+            if name not in _lexical_indexes:
+                start = time.perf_counter()
+                ids, texts, metadata = load_corpus()
+                _lexical_indexes[name] = BM25Index(ids, texts, metadata)
+                logger.info(
+                    "Built BM25 index for '%s': %d documents, %d terms in %.2fs",
+                    name, len(ids), len(_lexical_indexes[name].postings), time.perf_counter() - start
+                )
+    return _lexical_indexes[name]
+
+def reset_lexical_indexes():
+    """Drop built BM25 indexes so the next query rebuilds them from the current data"""
+    with _lexical_lock:
+        _lexical_indexes.clear()
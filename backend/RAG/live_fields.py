@@ -0,0 +1,133 @@
+import csv
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+from .observability import get_logger
+from .part_catalog import get_part_catalog
+
+logger = get_logger("live_fields")
+
+# Price and stock change hourly, so they are not embedded. This store holds the current
+# values keyed by part_id and parts_info joins them in when it formats results.
+# LIVE_FIELDS_FEED points at a CSV or JSON feed that is reloaded whenever its mtime changes;
+# writers should replace the file atomically (write elsewhere, then rename).
+LIVE_FIELDS_FEED = os.environ.get("LIVE_FIELDS_FEED")
+LIVE_FIELDS_CHECK_INTERVAL = float(os.environ.get("LIVE_FIELDS_CHECK_INTERVAL", "1"))
+
+LIVE_FIELDS = ("price", "availability")
+# Feed column names accepted for each live field
+_FEED_COLUMNS = {"price": ("price", "part_price"), "availability": ("availability", "stock")}
+
+def _normalize_entry(entry: Dict) -> Dict[str, str]:
+    fields = {}
+    for field, columns in _FEED_COLUMNS.items():
+        for column in columns:
+            value = entry.get(column)
+            if value not in (None, ""):
+                fields[field] = str(value).strip().lstrip("$")
+                break
+    return fields
+
+def read_feed(path: str) -> Dict[str, Dict[str, str]]:
+    """
+    Parse a feed into {part_id: {"price": ..., "availability": ...}}
+    CSV: a part_id column plus price/part_price and/or availability/stock columns
+    JSON: a list of such objects, or an object mapping part_id to its fields
+    """
+    if path.lower().endswith(".json"):
+        with open(path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        entries = payload.items() if isinstance(payload, dict) else ((e.get("part_id"), e) for e in payload)
+    else:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            entries = [(row.get("part_id"), row) for row in csv.DictReader(f)]
+    updates = {}
+    for part_id, entry in entries:
+        fields = _normalize_entry(entry)
+        if part_id and fields:
+            updates[str(part_id).strip().upper()] = fields
+    return updates
+
+class LiveFieldStore:
+    """
+    Copy-on-write map of part_id -> live fields
+    Readers use whatever snapshot is current; updates build a new map and swap it in,
+    so a bulk update is atomic and never blocks reads
+    """
+
+    def __init__(self, baseline: Dict[str, Dict[str, str]], feed_path: Optional[str] = None):
+        self._baseline = baseline
+        self._fields = baseline
+        self._lock = threading.Lock()
+        self.version = 0
+        self.feed_path = feed_path
+        self._feed_mtime: Optional[float] = None
+        self._next_check = 0.0
+        self.maybe_reload()
+
+    def get(self, part_id: str) -> Dict[str, str]:
+        self.maybe_reload()
+        return self._fields.get(part_id.upper(), {})
+
+    @staticmethod
+    def _merge(fields: Dict[str, Dict[str, str]], updates: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, str]]:
+        merged = dict(fields)
+        for part_id, values in updates.items():
+            merged[part_id.upper()] = {**merged.get(part_id.upper(), {}), **values}
+        return merged
+
+    def apply_updates(self, updates: Dict[str, Dict[str, str]]):
+        """Merge a bulk update into the current values and publish it in one swap"""
+        start = time.perf_counter()
+        with self._lock:
+            self._fields = self._merge(self._fields, updates)
+            self.version += 1
+        logger.info("Applied %d updates in %.1f ms", len(updates), (time.perf_counter() - start) * 1000)
+
+    def maybe_reload(self):
+        """Reload the feed if its file changed; checked at most every LIVE_FIELDS_CHECK_INTERVAL seconds"""
+        # Unlocked fast path for the common case; the check is repeated under the lock
+        if not self.feed_path or time.monotonic() < self._next_check:
+            return
+        with self._lock:
+            if time.monotonic() < self._next_check:
+                return
+            self._next_check = time.monotonic() + LIVE_FIELDS_CHECK_INTERVAL
+            try:
+                mtime = os.stat(self.feed_path).st_mtime
+            except OSError:
+                return
+            if mtime == self._feed_mtime:
+                return
+            self._feed_mtime = mtime
+
+        start = time.perf_counter()
+        # The feed is a full snapshot on top of the catalog values, not a delta on the last one,
+        # so the merged map is built off-lock and replaces the current one in a single swap
+        updates = read_feed(self.feed_path)
+        fields = self._merge(self._baseline, updates)
+        with self._lock:
+            # A newer feed file seen by another thread meanwhile wins
+            if self._feed_mtime != mtime:
+                return
+            self._fields = fields
+            self.version += 1
+        logger.info("Reloaded %d feed updates in %.1f ms", len(updates), (time.perf_counter() - start) * 1000)
+
+_store: Optional[LiveFieldStore] = None
+_store_lock = threading.Lock()
+
+def get_live_fields() -> LiveFieldStore:
+    """Return the shared store, seeded from the catalog CSV and then the feed"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                baseline = {
+                    part_id: {"price": row['part_price'], "availability": row['availability']}
+                    for part_id, row in get_part_catalog().by_part_id.items()
+                }
+                _store = LiveFieldStore(baseline, LIVE_FIELDS_FEED)
+    return _store
@@ -0,0 +1,174 @@
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Tuple
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# Logging for the whole backend goes through the "partselect" logger. Per-query detail is
+# logged at DEBUG with lazy %-style arguments, so with LOG_LEVEL=INFO (the default) those
+# calls return after a level check and never format anything.
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+
+_root_logger = logging.getLogger("partselect")
+if not _root_logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    _root_logger.addHandler(_handler)
+    _root_logger.setLevel(LOG_LEVEL)
+    _root_logger.propagate = False
+
+def get_logger(name: str) -> logging.Logger:
+    return _root_logger.getChild(name)
+
+logger = get_logger("trace")
+
+STAGE_SECONDS = Histogram(
+    "partselect_stage_seconds",
+    "Time spent in each chat pipeline stage",
+    ["stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0),
+)
+STAGE_ERRORS = Counter("partselect_stage_errors_total", "Pipeline stages that raised", ["stage"])
+LLM_TOKENS = Counter("partselect_llm_tokens_total", "Tokens reported by the LLM API", ["stage", "kind"])
+
+# Spans recorded during the current request, so one line can show where a turn's time went.
+# Worker threads only see it when the task is submitted through copy_context().run.
+_current_trace: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "partselect_trace", default=None
+)
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time a block: observed in partselect_stage_seconds and added to the request's trace"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.labels(stage).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        spans = _current_trace.get()
+        if spans is not None:
+            spans.append((stage, elapsed * 1000))
+
+def timed(stage: str) -> Callable:
+    """Decorator form of span for sync and async functions"""
+    def decorator(fn: Callable) -> Callable:
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(stage):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+@contextmanager
+def trace(name: str) -> Iterator[None]:
+    """
+    Collect the spans of one request and log them as a single JSON line at INFO, e.g.
+    {"trace": "chat", "total_ms": 6120.4, "spans": [["content_filter", 35.2], ...]}
+    """
+    spans: List[Tuple[str, float]] = []
+    token = _current_trace.set(spans)
+    start = time.perf_counter()
+    try:
+        with span(name):
+            yield
+    finally:
+        _current_trace.reset(token)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                "trace": name,
+                "total_ms": round((time.perf_counter() - start) * 1000, 1),
+                "spans": [[stage, round(ms, 1)] for stage, ms in spans],
+            }))
+
+def run_in_context(fn: Callable, *args) -> Callable[[], object]:
+    """Bind fn to the caller's context so spans recorded on a worker thread join the request's trace"""
+    context = contextvars.copy_context()
+    return lambda: context.run(fn, *args)
+
+def record_llm_usage(stage: str, usage) -> None:
+    """Count prompt and completion tokens from an API response's usage block"""
+    if usage is None:
+        return
+    # Streamed chunks carry usage as a plain dict: the pinned client's chunk model has no usage field
+    if isinstance(usage, dict):
+        prompt_tokens, completion_tokens = usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+    else:
+        prompt_tokens, completion_tokens = usage.prompt_tokens, usage.completion_tokens
+    LLM_TOKENS.labels(stage, "prompt").inc(prompt_tokens)
+    LLM_TOKENS.labels(stage, "completion").inc(completion_tokens)
+    get_logger("llm").debug("%s: prompt=%d, completion=%d", stage, prompt_tokens, completion_tokens)
+
+class PipelineStatsCollector:
+    """
+    Exposes the counters the pipeline already keeps (caches, filter fallbacks, validation,
+    tool result sizes) at scrape time instead of mirroring every update into Prometheus
+    """
+
+    def describe(self):
+        # Without describe() the registry would call collect() at registration, during import
+        return []
+
+    def collect(self):
+        # Imported here: these modules log through this one, so importing them at the top would be circular
+        from .cache import cache_stats
+        from .facets import filter_stats
+        from .response_validator import validation_stats
+        from .tool_format import tool_token_counts
+
+        hits = CounterMetricFamily("partselect_cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("partselect_cache_misses", "Cache misses", labels=["cache"])
+        size = GaugeMetricFamily("partselect_cache_entries", "Entries in each cache", labels=["cache"])
+        hit_rate = GaugeMetricFamily("partselect_cache_hit_rate", "Cache hit rate since start", labels=["cache"])
+        for cache, stats in cache_stats().items():
+            hits.add_metric([cache], stats["hits"])
+            misses.add_metric([cache], stats["misses"])
+            size.add_metric([cache], stats["size"])
+            hit_rate.add_metric([cache], stats["hit_rate"])
+        yield from (hits, misses, size, hit_rate)
+
+        filtered = CounterMetricFamily("partselect_filtered_searches", "Searches run with metadata filters", labels=["index"])
+        fallback = CounterMetricFamily(
+            "partselect_filter_fallbacks", "Filtered searches that returned nothing and were rerun unfiltered", labels=["index"]
+        )
+        for key, count in filter_stats().items():
+            index_name, _, outcome = key.rpartition("_")
+            (filtered if outcome == "filtered" else fallback).add_metric([index_name], count)
+        yield from (filtered, fallback)
+
+        validation = CounterMetricFamily("partselect_validations", "Response validation outcomes", labels=["outcome"])
+        for outcome, count in validation_stats().items():
+            validation.add_metric([outcome], count)
+        yield validation
+
+        tool_results = CounterMetricFamily("partselect_tool_results", "Tool results formatted", labels=["tool"])
+        tool_tokens = CounterMetricFamily("partselect_tool_result_tokens", "Estimated tokens in tool results", labels=["tool"])
+        tool_dropped = CounterMetricFamily("partselect_tool_dropped_matches", "Matches dropped by tool token budgets", labels=["tool"])
+        families = {"results": tool_results, "tokens": tool_tokens, "dropped": tool_dropped}
+        for key, count in tool_token_counts().items():
+            tool, _, kind = key.rpartition("_")
+            families[kind].add_metric([tool], count)
+        yield from families.values()
+
+REGISTRY.register(PipelineStatsCollector())
+
+def metrics_payload() -> Tuple[bytes, str]:
+    """Prometheus text exposition of every metric in this process, with its content type"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
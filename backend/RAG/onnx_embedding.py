@@ -0,0 +1,194 @@
+import json
+import os
+import time
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .observability import get_logger
+
+logger = get_logger("embedding.onnx")
+
+# Export directory holding model.int8.onnx, tokenizer.json and embedding_config.json
+ONNX_MODEL_DIR = os.environ.get(
+    "ONNX_MODEL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "all-MiniLM-L6-v2-onnx")
+)
+ONNX_MODEL_FILE = os.environ.get("ONNX_MODEL_FILE", "model.int8.onnx")
+# 0 lets ONNX Runtime pick one thread per physical core
+ONNX_THREADS = int(os.environ.get("ONNX_THREADS", "0"))
+# Lowest cosine similarity to the torch embeddings an export may show on the check texts
+ONNX_MIN_COSINE = float(os.environ.get("ONNX_MIN_COSINE", "0.97"))
+
+_CONFIG_FILE = "embedding_config.json"
+
+class OnnxEncoder:
+    """
+    all-MiniLM-L6-v2 run through ONNX Runtime, exposing the encode() calls the backend makes
+    on a SentenceTransformer. Reproduces its Transformer -> mean Pooling -> Normalize stack, so
+    vectors are interchangeable with the torch model's within the export's checked tolerance.
+    """
+
+    def __init__(self, model_dir: str = ONNX_MODEL_DIR, model_file: str = ONNX_MODEL_FILE, threads: int = ONNX_THREADS):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_dir, _CONFIG_FILE), 'r', encoding='utf-8') as f:
+            self.config = json.load(f)
+        self.model_path = os.path.join(model_dir, model_file)
+        self.max_seq_length = self.config["max_seq_length"]
+        self.normalize = self.config.get("normalize", True)
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        self.tokenizer.enable_padding(pad_id=self.config.get("pad_id", 0), pad_token=self.config.get("pad_token", "[PAD]"))
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.config["dimension"]
+
+    def model_bytes(self) -> int:
+        return os.path.getsize(self.model_path)
+
+    def _encode_batch(self, texts: Sequence[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(list(texts))
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        feeds = {
+            "input_ids": np.array([encoding.ids for encoding in encodings], dtype=np.int64),
+            "attention_mask": attention_mask,
+            "token_type_ids": np.array([encoding.type_ids for encoding in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {name: value for name, value in feeds.items() if name in self.input_names})[0]
+
+        # Mean over real tokens only, as sentence-transformers' Pooling does
+        mask = attention_mask[..., None].astype(np.float32)
+        vectors = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors.astype(np.float32)
+
+    def encode(self, texts: Union[str, Sequence[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        """A 1-D vector for a string, an (n, dim) array for a list; other SentenceTransformer options are ignored"""
+        if isinstance(texts, str):
+            return self._encode_batch([texts])[0]
+        if len(texts) == 0:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+        # Sorting by length keeps padding per batch small, as sentence-transformers does
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        vectors = np.empty((len(texts), self.get_sentence_embedding_dimension()), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            vectors[rows] = self._encode_batch([texts[row] for row in rows])
+        return vectors
+
+def cosine_agreement(reference: np.ndarray, candidate: np.ndarray) -> Dict[str, float]:
+    """Row-wise cosine similarity between two embeddings of the same texts"""
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    candidate = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+    cosines = np.einsum('ij,ij->i', reference, candidate)
+    return {
+        "texts": int(len(cosines)),
+        "min": float(cosines.min()),
+        "p01": float(np.percentile(cosines, 1)),
+        "mean": float(cosines.mean()),
+    }
+
+def check_texts(sample: int = 500, seed: int = 0) -> List[str]:
+    """Texts to compare backends on: the content filter examples plus a sample of indexed part texts"""
+    from .content_filter import OFF_TOPIC_EXAMPLES, ON_TOPIC_EXAMPLES
+    from .part_catalog import get_part_catalog
+    from .vectorize import create_searchable_text
+
+    rows = list(get_part_catalog().by_part_id.values())
+    rng = np.random.default_rng(seed)
+    picked = rng.choice(len(rows), size=min(sample, len(rows)), replace=False)
+    return ON_TOPIC_EXAMPLES + OFF_TOPIC_EXAMPLES + [create_searchable_text(rows[i]) for i in picked]
+
+def export_onnx(output_dir: str = ONNX_MODEL_DIR, opset: int = 14, min_cosine: float = ONNX_MIN_COSINE) -> Dict:
+    """
+    Export the sentence transformer to ONNX, quantize its weights to int8 (dynamic
+    quantization) and check the result against the torch model on check_texts().
+    Raises ValueError when the lowest cosine similarity is below min_cosine.
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+    from .embedding import MODEL_NAME
+
+    os.makedirs(output_dir, exist_ok=True)
+    model = SentenceTransformer(MODEL_NAME, device="cpu")
+    transformer = model[0]
+    tokenizer = transformer.tokenizer
+
+    class HiddenStates(torch.nn.Module):
+        """The transformer without its output dict, so the graph has a single named output"""
+
+        def __init__(self, auto_model):
+            super().__init__()
+            self.auto_model = auto_model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.auto_model(
+                input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids, return_dict=False
+            )[0]
+
+    start = time.perf_counter()
+    sample = tokenizer(["warm up"], return_tensors="pt")
+    inputs = ["input_ids", "attention_mask", "token_type_ids"]
+    fp32_path = os.path.join(output_dir, "model.fp32.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            HiddenStates(transformer.auto_model.eval()),
+            tuple(sample[name] for name in inputs),
+            fp32_path,
+            input_names=inputs,
+            output_names=["last_hidden_state"],
+            dynamic_axes={name: {0: "batch", 1: "sequence"} for name in inputs + ["last_hidden_state"]},
+            opset_version=opset,
+        )
+    quantize_dynamic(fp32_path, os.path.join(output_dir, "model.int8.onnx"), weight_type=QuantType.QInt8)
+    tokenizer.save_pretrained(output_dir)
+
+    config = {
+        "model": MODEL_NAME,
+        "dimension": model.get_sentence_embedding_dimension(),
+        "max_seq_length": model.max_seq_length,
+        "normalize": any(type(module).__name__ == "Normalize" for module in model),
+        "pad_id": tokenizer.pad_token_id,
+        "pad_token": tokenizer.pad_token,
+    }
+    with open(os.path.join(output_dir, _CONFIG_FILE), 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=2)
+    logger.info("Exported %s to %s in %.1fs", MODEL_NAME, output_dir, time.perf_counter() - start)
+
+    texts = check_texts()
+    reference = model.encode(texts, convert_to_numpy=True)
+    report = {"config": config, "files_mb": {}, "agreement": {}}
+    for model_file in ("model.fp32.onnx", "model.int8.onnx"):
+        report["files_mb"][model_file] = os.path.getsize(os.path.join(output_dir, model_file)) / 1e6
+        report["agreement"][model_file] = cosine_agreement(reference, OnnxEncoder(output_dir, model_file).encode(texts))
+    with open(os.path.join(output_dir, "agreement.json"), 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    agreement = report["agreement"]["model.int8.onnx"]
+    logger.info(
+        "int8 model: %.1f MB, cosine to torch over %d texts: min %.4f, mean %.4f",
+        report["files_mb"]["model.int8.onnx"], agreement["texts"], agreement["min"], agreement["mean"]
+    )
+    if agreement["min"] < min_cosine:
+        raise ValueError(f"int8 export disagrees with the torch model: min cosine {agreement['min']:.4f} < {min_cosine}")
+    return report
+
+if __name__ == "__main__":
+    # python -m RAG.onnx_embedding [--output DIR] [--opset 14] [--min-cosine 0.97]
+    import argparse
+    parser = argparse.ArgumentParser(description="Export all-MiniLM-L6-v2 to int8 ONNX for EMBEDDING_BACKEND=onnx")
+    parser.add_argument("--output", default=ONNX_MODEL_DIR)
+    parser.add_argument("--opset", type=int, default=14)
+    parser.add_argument("--min-cosine", type=float, default=ONNX_MIN_COSINE)
+    args = parser.parse_args()
+    export_onnx(args.output, args.opset, args.min_cosine)
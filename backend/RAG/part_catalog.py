@@ -0,0 +1,140 @@
+import csv
+import os
+import re
+import threading
+from typing import Collection, Dict, List, Optional
+from .facets import normalize_brand
+from .observability import get_logger
+
+logger = get_logger("catalog")
+
+PARTS_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'all_parts.csv')
+
+# Defaults for missing CSV values - shared with vectorize_parts so lookups and index metadata agree
+PART_DEFAULTS = {
+    'part_name': 'Unknown Part',
+    'part_id': 'NO_ID',
+    'mpn_id': 'NO_MPN',
+    'part_price': '0.00',
+    'brand': 'Unknown Brand',
+    'appliance_types': 'General Appliance',
+    'availability': 'Unknown',
+    'product_url': '#',
+    'install_difficulty': 'Not Specified',
+    'install_time': 'Not Specified',
+    'symptoms': 'No symptoms listed',
+    'replace_parts': 'No related parts listed',
+    'install_video_url': 'No video available'
+}
+
+# One word of letters, digits and dashes; part numbers always carry at least one digit
+_PART_NUMBER_PATTERN = re.compile(r'^[A-Z0-9-]{4,}$')
+
+def looks_like_part_number(token: str) -> bool:
+    return bool(_PART_NUMBER_PATTERN.match(token)) and any(c.isdigit() for c in token)
+
+def parse_cross_references(replace_parts: str) -> List[str]:
+    """
+    Split a replace_parts cell like "AP6012281, 8268961, WP8268961VP ... Show more" into numbers
+    Some cells also hold scraped review text; pieces that are not part-number shaped are skipped
+    """
+    if replace_parts == PART_DEFAULTS['replace_parts']:
+        return []
+    numbers = []
+    for number in replace_parts.replace('... Show more', '').split(','):
+        number = number.strip().upper()
+        if looks_like_part_number(number):
+            numbers.append(number)
+    return numbers
+
+def is_plausible_cross_reference(token: str) -> bool:
+    return looks_like_part_number(token) and (len(token) >= 5 or any(c.isalpha() for c in token))
+
+class PartCatalog:
+    """In-memory hash indexes over part_id, mpn_id and replace_parts cross-references built from all_parts.csv"""
+
+    def __init__(self, csv_path: str = PARTS_CSV):
+        self.by_part_id: Dict[str, Dict] = {}
+        self.by_mpn: Dict[str, str] = {}
+        # Alternate and superseded numbers from replace_parts -> canonical part IDs
+        self.by_cross_reference: Dict[str, List[str]] = {}
+        # Brand names as written in the catalog (lower case) -> canonical brand key
+        self.brands: Dict[str, str] = {}
+
+        with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+            for raw in csv.DictReader(f):
+                if not raw.get('part_id'):
+                    continue
+                row = {key: (value.strip() if value and value.strip() else PART_DEFAULTS.get(key, ''))
+                       for key, value in raw.items()}
+                part_id = row['part_id'].upper()
+                # The CSV lists some parts once per brand variant; the first row is canonical
+                # and later rows only fill in fields it is missing
+                canonical = self.by_part_id.setdefault(part_id, row)
+                for key, value in row.items():
+                    if canonical[key] == PART_DEFAULTS.get(key) and value != PART_DEFAULTS.get(key):
+                        canonical[key] = value
+                if row['mpn_id'] != PART_DEFAULTS['mpn_id']:
+                    self.by_mpn.setdefault(row['mpn_id'].upper(), part_id)
+                if row['brand'] != PART_DEFAULTS['brand']:
+                    self.brands.setdefault(row['brand'].lower(), normalize_brand(row['brand']))
+                for number in parse_cross_references(row['replace_parts']):
+                    part_ids = self.by_cross_reference.setdefault(number, [])
+                    if part_id not in part_ids:
+                        part_ids.append(part_id)
+
+        logger.info(
+            "Indexed %d part IDs, %d MPNs and %d cross-reference numbers",
+            len(self.by_part_id), len(self.by_mpn), len(self.by_cross_reference)
+        )
+
+    def get_by_part_id(self, part_id: str) -> Optional[Dict]:
+        return self.by_part_id.get(part_id.upper())
+
+    def get_by_mpn(self, mpn: str) -> Optional[Dict]:
+        part_id = self.by_mpn.get(mpn.upper())
+        return self.by_part_id[part_id] if part_id else None
+
+    def get_by_cross_reference(self, number: str) -> List[Dict]:
+        """Parts that list this number as an alternate or superseded part number"""
+        return [self.by_part_id[part_id] for part_id in self.by_cross_reference.get(number.upper(), [])]
+
+    def lookup(self, identifier: str, explicit: bool = False) -> List[Dict]:
+        """
+        Resolve a token that may be a PartSelect ID, an MPN or a cross-reference number
+        Tokens without a digit are only resolved when explicit (labelled in the query, as in
+        "MPN MWF"): a few MPNs are plain words that would otherwise match ordinary prose.
+        Short all-digit tokens are not treated as cross-references since they are usually
+        years or quantities rather than part numbers
+        """
+        if not explicit and not any(c.isdigit() for c in identifier):
+            return []
+        row = self.get_by_part_id(identifier) or self.get_by_mpn(identifier)
+        if row:
+            return [row]
+        if is_plausible_cross_reference(identifier):
+            return self.get_by_cross_reference(identifier)
+        return []
+
+    def lookup_all(self, identifiers: List[str], explicit: Collection[str] = ()) -> List[Dict]:
+        """Resolve identifiers in order, dropping unknown ones and duplicates; explicit as in lookup()"""
+        rows = []
+        seen = set()
+        for identifier in identifiers:
+            for row in self.lookup(identifier, identifier in explicit):
+                if row['part_id'] not in seen:
+                    seen.add(row['part_id'])
+                    rows.append(row)
+        return rows
+
+_catalog: Optional[PartCatalog] = None
+_catalog_lock = threading.Lock()
+
+def get_part_catalog() -> PartCatalog:
+    """Return the shared catalog, building it on first use"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = PartCatalog()
+    return _catalog
@@ -0,0 +1,22 @@
+import os
+import threading
+
+# Single Pinecone client shared by all indexes
+_client = None
+_client_lock = threading.Lock()
+
+def get_pinecone():
+    """Return the shared Pinecone client, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from pinecone import Pinecone
+                _client = Pinecone(api_key=os.environ.get("PINECONE_API_KEY"))
+    return _client
+
+def serverless_spec():
+    """Spec every index is created with; pinecone is only imported when an index is created"""
+    from pinecone import ServerlessSpec
+
+    return ServerlessSpec(cloud='aws', region='us-east-1')
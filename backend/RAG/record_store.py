@@ -0,0 +1,78 @@
+import os
+import threading
+from typing import Dict, List, Optional, Sequence
+from .index_backend import LOCAL_INDEX_DIR
+from .observability import get_logger
+
+logger = get_logger("records")
+
+# Full source records (every CSV field plus the embedded text) live in a Parquet file per
+# corpus next to the local index artifacts. Index metadata only carries what the formatters
+# and filters need; anything else is loaded from here by ID when it is actually asked for.
+
+def _records_path(directory: str, name: str) -> str:
+    return os.path.join(directory, f"{name}.records.parquet")
+
+def write_records(name: str, ids: Sequence[str], records: Sequence[Dict], directory: Optional[str] = None) -> str:
+    """Write full records for a corpus as a Parquet file keyed by vector ID"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    directory = directory or LOCAL_INDEX_DIR
+    os.makedirs(directory, exist_ok=True)
+    columns = sorted({key for record in records for key in record})
+    table = pa.table({
+        "id": list(ids),
+        # Values are stored as strings so mixed CSV/JSON sources share one schema
+        **{column: [_to_text(record.get(column)) for record in records] for column in columns},
+    })
+    path = _records_path(directory, name)
+    pq.write_table(table, f"{path}.tmp", compression="zstd")
+    os.replace(f"{path}.tmp", path)
+    logger.info("Wrote %d records for '%s' to %s", len(ids), name, path)
+    return path
+
+def _to_text(value) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(item) for item in value)
+    return str(value)
+
+class RecordStore:
+    """Read side of a corpus' Parquet records, memory-mapped and looked up by ID on demand"""
+
+    def __init__(self, name: str, directory: Optional[str] = None):
+        import pyarrow.parquet as pq
+
+        self.name = name
+        self.table = pq.read_table(_records_path(directory or LOCAL_INDEX_DIR, name), memory_map=True)
+        self._rows = {id_: row for row, id_ in enumerate(self.table.column("id").to_pylist())}
+
+    def get_many(self, ids: Sequence[str], columns: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """Full records for the given IDs (unknown IDs are skipped), optionally limited to some columns"""
+        rows = [self._rows[id_] for id_ in ids if id_ in self._rows]
+        if not rows:
+            return {}
+        table = self.table.take(rows)
+        if columns:
+            table = table.select(["id"] + [c for c in columns if c in table.column_names and c != "id"])
+        return {record.pop("id"): record for record in table.to_pylist()}
+
+    def get(self, id_: str) -> Optional[Dict]:
+        return self.get_many([id_]).get(id_)
+
+_stores: Dict[str, RecordStore] = {}
+_stores_lock = threading.Lock()
+
+def get_record_store(name: str) -> RecordStore:
+    """Return the record store for a corpus, opening it once per process"""
+    if name not in _stores:
+        with _stores_lock:
+            if name not in _stores:
+                _stores[name] = RecordStore(name)
+    return _stores[name]
+
+def reset_record_store(name: str):
+    with _stores_lock:
+        _stores.pop(name, None)
@@ -1,21 +1,42 @@
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 from openai import AsyncOpenAI
 import os
-from dotenv import load_dotenv
 import json
 import httpx
 import re
+import random
+import asyncio
+import threading
+from collections import Counter
+from .observability import get_logger, timed
 
-load_dotenv()
+logger = get_logger("validation")
 
 # Initialize client for validation
 async_client = httpx.AsyncClient()
 client = AsyncOpenAI(
     api_key=os.environ.get("DEEPSEEK_API_KEY"),
-    base_url="https://api.deepseek.com",
+    base_url=os.environ.get("DEEPSEEK_BASE_URL", "https://api.deepseek.com"),
     http_client=async_client
 )
 
+# Validation policy: "always", "sampled", "heuristic", "async" or "off"
+# - sampled: validate VALIDATION_SAMPLE_RATE of responses
+# - heuristic: validate only when find_unsupported_facts flags the response
+# - async: validate after the response is returned; verdicts only feed VALIDATION_STATS
+VALIDATION_MODES = ("always", "sampled", "heuristic", "async", "off")
+VALIDATION_MODE = os.environ.get("VALIDATION_MODE", "always").lower()
+if VALIDATION_MODE not in VALIDATION_MODES:
+    logger.warning("Unknown VALIDATION_MODE %r (expected one of %s), using 'always'", VALIDATION_MODE, ", ".join(VALIDATION_MODES))
+    VALIDATION_MODE = "always"
+VALIDATION_SAMPLE_RATE = float(os.environ.get("VALIDATION_SAMPLE_RATE", "0.1"))
+
+# Counters for how often validation ran, was skipped, flagged risk or failed
+# Updated from request handlers and background validation tasks, so guarded by _stats_lock
+VALIDATION_STATS: Counter = Counter()
+_stats_lock = threading.Lock()
+_background_validations: Set[asyncio.Task] = set()
+
 VALIDATION_PROMPT = """Validate this customer service response. Focus on:
 1. ACCURACY (A): Facts match search results
 2. COMPLETENESS (C): All questions answered
@@ -90,6 +111,7 @@ def format_search_results(search_results: List[Dict]) -> str:
         )
     return "\n".join(formatted) if formatted else "No results"
 
+@timed("validation")
 async def validate_response(
     query: str,
     response: str,
@@ -149,5 +171,88 @@ async def validate_response(
             return True, None, None
             
     except Exception as e:
-        print(f"[Validation Error] {str(e)}")
-        return True, None, None 
\ No newline at end of file
+        logger.warning("Validation failed: %s", e)
+        return True, None, None 
+
+def _normalize_price(amount: str) -> str:
+    return f"{float(amount.replace(',', '')):.2f}"
+
+def find_unsupported_facts(response: str, search_results: List[Dict]) -> List[str]:
+    """
+    Cheap deterministic check for facts in the response that no tool result supports:
+    prices, PartSelect part IDs and video links
+    """
+    source = "\n".join(result['result'] for result in search_results)
+    issues = []
+    
+    price_pattern = r'\$\s?(\d{1,3}(?:,\d{3})*(?:\.\d{1,2})?|\d+(?:\.\d{1,2})?)'
+    source_prices = {_normalize_price(p) for p in re.findall(price_pattern, source)}
+    for price in re.findall(price_pattern, response):
+        if _normalize_price(price) not in source_prices:
+            issues.append(f"Price ${price} does not appear in the search results")
+    
+    source_part_ids = set(re.findall(r'\bPS\d+\b', source.upper()))
+    for part_id in set(re.findall(r'\bPS\d+\b', response.upper())):
+        if part_id not in source_part_ids:
+            issues.append(f"Part {part_id} does not appear in the search results")
+    
+    for url in set(re.findall(r'https?://(?:www\.)?(?:youtube\.com|youtu\.be)/[^\s)\]]+', response)):
+        url = url.rstrip('.,;:!?')
+        if url not in source:
+            issues.append(f"Video link {url} does not appear in the search results")
+    
+    return issues
+
+def _count(outcome: str):
+    with _stats_lock:
+        VALIDATION_STATS[outcome] += 1
+
+def validation_stats() -> Dict[str, int]:
+    """A consistent copy of VALIDATION_STATS"""
+    with _stats_lock:
+        return dict(VALIDATION_STATS)
+
+async def _validate_in_background(query: str, response: str, search_results: List[Dict]):
+    is_satisfactory, _, _ = await validate_response(query, response, search_results)
+    _count("validated")
+    if not is_satisfactory:
+        _count("unsatisfactory")
+
+async def validate_with_policy(
+    query: str,
+    response: str,
+    search_results: List[Dict],
+    mode: Optional[str] = None
+) -> Tuple[bool, Optional[Dict], Optional[List[str]]]:
+    """Validate according to VALIDATION_MODE; skipped validations count as satisfactory"""
+    mode = (mode or VALIDATION_MODE).lower()
+    skipped = (True, None, None)
+    
+    if mode == "off":
+        _count("skipped")
+        return skipped
+    
+    if mode == "sampled" and random.random() >= VALIDATION_SAMPLE_RATE:
+        _count("skipped")
+        return skipped
+    
+    if mode == "heuristic":
+        issues = find_unsupported_facts(response, search_results)
+        if not issues:
+            _count("skipped")
+            return skipped
+        _count("flagged")
+        logger.info("Heuristic flagged response: %s", issues)
+    
+    if mode == "async":
+        task = asyncio.create_task(_validate_in_background(query, response, search_results))
+        _background_validations.add(task)
+        task.add_done_callback(_background_validations.discard)
+        _count("deferred")
+        return skipped
+    
+    result = await validate_response(query, response, search_results)
+    _count("validated")
+    if not result[0]:
+        _count("unsatisfactory")
+    return result
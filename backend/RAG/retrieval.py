@@ -0,0 +1,113 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from .embedding import encode_async
+from .index_generation import index_generation
+from .observability import run_in_context, span
+from .record_store import get_record_store
+from .vectorize import find_exact_parts, is_identifier_query, query_parts
+from .vectorize_repairs import query_repairs
+from .vectorize_support import query_support
+
+# Index queries are blocking HTTP calls; run them on a bounded pool so they never stall the event loop
+SEARCH_WORKERS = int(os.environ.get("SEARCH_WORKERS", "8"))
+search_executor = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="search")
+
+# Metadata each formatter reads; queries project matches down to these fields
+REPAIR_FIELDS = [
+    "symptom", "appliance_type", "description", "frequency", "difficulty",
+    "parts_needed", "repair_video", "symptom_url",
+]
+PART_FIELDS = [
+    "part_name", "part_id", "mpn", "price", "brand", "appliance_type", "install_difficulty",
+    "install_time", "symptoms", "replace_parts", "availability", "install_video_url", "url",
+]
+POLICY_FIELDS = ["title", "content"]
+
+# Corpus name -> (query function, default top_k, metadata fields). Every query function takes
+# (query, top_k=..., query_vector=..., fields=...) and returns {"matches": [...]}.
+CORPORA: Dict[str, tuple] = {
+    "parts": (query_parts, 3, PART_FIELDS),
+    "repairs": (query_repairs, 3, REPAIR_FIELDS),
+    "policy": (query_support, 2, POLICY_FIELDS),
+}
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
+async def embed_query(query: str, corpora: List[str]) -> Tuple[Optional[List[float]], Optional[List[Dict]]]:
+    """
+    Encode the query once for all corpora. When parts are searched, known identifiers are
+    resolved first (on the search pool, since the catalog may still have to load) and returned
+    for query_parts; a parts-only query made up of identifiers that resolve needs no vector.
+    """
+    exact_parts = None
+    if "parts" in corpora:
+        loop = asyncio.get_running_loop()
+        exact_parts = await loop.run_in_executor(search_executor, run_in_context(find_exact_parts, query))
+        if exact_parts and corpora == ["parts"] and is_identifier_query(query):
+            return None, exact_parts
+    return await encode_async(query), exact_parts
+
+async def search_corpus(
+    corpus: str,
+    query: str,
+    query_vector: Optional[List[float]],
+    top_k: Optional[int] = None,
+    include_records: bool = False,
+    exact_parts: Optional[List[Dict]] = None
+) -> Dict:
+    """Run one corpus query on the search pool and time it, optionally attaching full records"""
+    query_fn, default_top_k, fields = CORPORA[corpus]
+    # Parts matches already resolved by embed_query are handed over instead of looked up again
+    extra = {"exact_parts": exact_parts} if corpus == "parts" and exact_parts is not None else {}
+    start = time.perf_counter()
+    loop = asyncio.get_running_loop()
+
+    def run() -> List[Dict]:
+        matches = query_fn(query, top_k=top_k or default_top_k, query_vector=query_vector, fields=fields, **extra)["matches"]
+        if include_records:
+            records = get_record_store(corpus).get_many([match["id"] for match in matches])
+            matches = [dict(match, record=records.get(match["id"])) for match in matches]
+        return matches
+
+    try:
+        matches = await loop.run_in_executor(search_executor, run_in_context(run))
+        return {"matches": matches, "ms": _elapsed_ms(start)}
+    except Exception as e:
+        return {"matches": [], "error": str(e), "ms": _elapsed_ms(start)}
+
+async def retrieve(
+    query: str,
+    corpora: Optional[List[str]] = None,
+    top_k: Optional[int] = None,
+    include_records: bool = False
+) -> Dict:
+    """
+    Encode the query once and search the requested corpora in parallel
+    Returns per-corpus matches and timings; a failing corpus reports its error
+    without failing the others. include_records adds each match's full Parquet record.
+    """
+    corpora = corpora or list(CORPORA)
+    unknown = [corpus for corpus in corpora if corpus not in CORPORA]
+    if unknown:
+        raise ValueError(f"Unknown corpora: {', '.join(unknown)}")
+
+    start = time.perf_counter()
+    # Picks up a reindex published by an ingest process before any index is queried
+    index_generation()
+    with span("embedding"):
+        query_vector, exact_parts = await embed_query(query, corpora)
+    embedding_ms = _elapsed_ms(start)
+
+    results = await asyncio.gather(*(
+        search_corpus(corpus, query, query_vector, top_k, include_records, exact_parts) for corpus in corpora
+    ))
+    return {
+        "query": query,
+        "embedding_ms": embedding_ms,
+        "total_ms": _elapsed_ms(start),
+        "results": dict(zip(corpora, results)),
+    }
@@ -1,96 +1,186 @@
-from .vectorize import query_parts
-from .vectorize_repairs import query_repairs
+import asyncio
+import json
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+from .cache import normalize_query, result_cache
+from .embedding import encode_async
+from .index_generation import index_generation
+from .live_fields import get_live_fields
+from .observability import run_in_context, span
+from .tool_format import format_part, format_policy, format_repair, is_compact, join_within_budget
+from .retrieval import PART_FIELDS, POLICY_FIELDS, REPAIR_FIELDS, search_executor
+from .vectorize import create_search_filters, find_exact_parts, is_identifier_query, query_parts
+from .vectorize_repairs import create_repair_filters, query_repairs
 from .vectorize_support import query_support
 
-def repair_info(query: str) -> str:
-    """Format repair search results into a readable string"""
+def result_cache_key(tool: str, query: str, filters: Dict, top_k: int) -> tuple:
+    """
+    Key for the formatted-result cache: (tool, normalized query, filters, top_k, index generation)
+    The generation changes when an ingest run publishes new index contents
+    """
+    return (tool, normalize_query(query), json.dumps(filters, sort_keys=True), top_k, index_generation())
+
+class ToolRequest(NamedTuple):
+    """What a tool resolves from the query text alone, before any embedding"""
+    cache_key: tuple
+    filters: Dict
+    exact_parts: Optional[List[Dict]] = None
+
+def repair_request(query: str, compact: bool) -> ToolRequest:
+    filters = create_repair_filters(query)
+    return ToolRequest(result_cache_key("repair_info", query, filters, 3) + (compact,), filters)
+
+def parts_request(query: str, compact: bool) -> ToolRequest:
+    filters = create_search_filters(query)
+    live_fields = get_live_fields()
+    live_fields.maybe_reload()
+    # Formatted output embeds live prices, so a live field update must miss the cache
+    cache_key = result_cache_key("parts_info", query, filters, 3) + (live_fields.version, compact)
+    return ToolRequest(cache_key, filters, find_exact_parts(query))
+
+def support_request(query: str, compact: bool) -> ToolRequest:
+    filters: Dict = {}
+    return ToolRequest(result_cache_key("support_info", query, filters, 2) + (compact,), filters)
+
+def repair_info(
+    query: str,
+    query_vector: Optional[List[float]] = None,
+    result_format: Optional[str] = None,
+    request: Optional[ToolRequest] = None
+) -> str:
+    """
+    Format repair search results into a compact (or verbose) string within the tool's token budget
+    request is passed by the async path once it has missed the result cache
+    """
     try:
-        results = query_repairs(query, top_k=3)
+        compact = is_compact(result_format)
+        if request is None:
+            request = repair_request(query, compact)
+            cached = result_cache.get(request.cache_key)
+            if cached is not None:
+                return cached
+        
+        results = query_repairs(query, top_k=3, query_vector=query_vector, filters=request.filters, fields=REPAIR_FIELDS)
         
         if not results['matches']:
             return "No matching parts found."
             
-        output = []
-        for match in results['matches']:
-            metadata = match['metadata']
-            output.append(
-                f"Problem: {metadata['symptom']}\n"
-                f"Appliance: {metadata['appliance_type']}\n"
-                f"Description: {metadata['description']}\n"
-                f"Frequency: This affects {metadata['frequency']}% of {metadata['appliance_type']}s\n"
-                f"Difficulty: {metadata['difficulty']}\n"
-                f"Required Parts: {', '.join(metadata['parts_needed'])}\n"
-                f"Repair Video: {metadata['repair_video']}\n"
-                f"More Info: {metadata['symptom_url']}\n"
-                f"Relevance Score: {match['score']:.2f}\n"
-                "---"
-            )
+        output = [format_repair(match['metadata'], match['score'], compact) for match in results['matches']]
         
-        return "\n".join(output)
+        formatted = join_within_budget("repair_info", output, compact)
+        result_cache.set(request.cache_key, formatted)
+        return formatted
     except Exception as e:
         return f"Error searching for parts: {str(e)}"
 
-def parts_info(query: str) -> str:
+def parts_info(
+    query: str,
+    query_vector: Optional[List[float]] = None,
+    result_format: Optional[str] = None,
+    request: Optional[ToolRequest] = None
+) -> str:
     """
     Tool for AI to search for parts information
     Returns a formatted string with the search results
     """
     try:
-        results = query_parts(query, top_k=3)
+        compact = is_compact(result_format)
+        if request is None:
+            request = parts_request(query, compact)
+            cached = result_cache.get(request.cache_key)
+            if cached is not None:
+                return cached
+        live_fields = get_live_fields()
+        
+        results = query_parts(
+            query, top_k=3, query_vector=query_vector, filters=request.filters, fields=PART_FIELDS,
+            exact_parts=request.exact_parts
+        )
         
         if not results['matches']:
             return "No matching parts found."
             
-        output = []
-        for match in results['matches']:
-            metadata = match['metadata']
-            # Add installation video URL to output if available
-            video_info = f"Installation Video: {metadata['install_video_url']}\n" if metadata.get('install_video_url') and metadata['install_video_url'] != 'No video available' else "Installation Video: Not available\n"
-            
-            output.append(
-                f"Part: {metadata['part_name']}\n"
-                f"ID: {metadata['part_id']}\n"
-                f"MPN: {metadata['mpn']}\n"
-                f"Price: ${metadata['price']}\n"
-                f"Brand: {metadata['brand']}\n"
-                f"Type: {metadata['appliance_type']}\n"
-                f"Installation Difficulty: {metadata['install_difficulty']}\n"
-                f"Installation Time: {metadata['install_time']}\n"
-                f"Common Symptoms: {metadata['symptoms']}\n"
-                f"Related Parts: {metadata['replace_parts']}\n"
-                f"Availability: {metadata['availability']}\n"
-                f"{video_info}"
-                f"URL: {metadata['url']}\n"
-                f"Relevance Score: {match['score']:.2f}\n"
-                "---"
-            )
+        output = [
+            format_part(match['metadata'], live_fields.get(match['metadata']['part_id']), match['score'], compact)
+            for match in results['matches']
+        ]
             
-        return "\n".join(output)
+        formatted = join_within_budget("parts_info", output, compact)
+        result_cache.set(request.cache_key, formatted)
+        return formatted
         
     except Exception as e:
         return f"Error searching for parts: {str(e)}"
 
-def support_info(query: str) -> str:
+def support_info(
+    query: str,
+    query_vector: Optional[List[float]] = None,
+    result_format: Optional[str] = None,
+    request: Optional[ToolRequest] = None
+) -> str:
     """Format support and policy information search results into a readable string"""
     try:
-        results = query_support(query, top_k=2)
+        compact = is_compact(result_format)
+        if request is None:
+            request = support_request(query, compact)
+            cached = result_cache.get(request.cache_key)
+            if cached is not None:
+                return cached
+        
+        results = query_support(query, top_k=2, query_vector=query_vector, fields=POLICY_FIELDS)
         
         if not results['matches']:
             return "No matching information found."
             
-        output = []
-        for match in results['matches']:
-            metadata = match['metadata']
-            
-            section = [
-                f"Policy: {metadata['title']}",
-                f"{metadata['content']}\n",
-                f"Relevance Score: {match['score']:.2f}",
-                "---"
-            ]
-            
-            output.append("\n".join(section))
+        output = [format_policy(match['metadata'], match['score'], compact) for match in results['matches']]
         
-        return "\n".join(output)
+        formatted = join_within_budget("support_info", output, compact)
+        result_cache.set(request.cache_key, formatted)
+        return formatted
     except Exception as e:
-        return f"Error searching support information: {str(e)}" 
\ No newline at end of file
+        return f"Error searching support information: {str(e)}" 
+
+def _lookup(prepare: Callable[[str, bool], ToolRequest], query: str) -> Tuple[ToolRequest, Optional[str]]:
+    request = prepare(query, is_compact(None))
+    return request, result_cache.get(request.cache_key)
+
+async def _run_tool(tool: Callable[..., str], prepare: Callable[[str, bool], ToolRequest], query: str) -> str:
+    """
+    Resolve the query and check the result cache on the search pool, embed only on a miss,
+    then run the index query and formatting on the search pool
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        request, cached = await loop.run_in_executor(search_executor, run_in_context(_lookup, prepare, query))
+    except Exception:
+        # The tool builds the request again and reports the error in its usual form
+        request, cached = None, None
+    if cached is not None:
+        return cached
+
+    query_vector = None
+    # Queries made up of known part identifiers are answered from the catalog and need no vector
+    if request is None or not (request.exact_parts and is_identifier_query(query)):
+        try:
+            with span("embedding"):
+                query_vector = await encode_async(query)
+        except Exception as e:
+            return f"Error creating query embedding: {str(e)}"
+    return await loop.run_in_executor(search_executor, run_in_context(tool, query, query_vector, None, request))
+
+async def parts_info_async(query: str) -> str:
+    """Async version of parts_info that does not block the event loop"""
+    return await _run_tool(parts_info, parts_request, query)
+
+async def repair_info_async(query: str) -> str:
+    """Async version of repair_info that does not block the event loop"""
+    return await _run_tool(repair_info, repair_request, query)
+
+async def support_info_async(query: str) -> str:
+    """Async version of support_info that does not block the event loop"""
+    return await _run_tool(support_info, support_request, query)
+
+ASYNC_TOOLS: Dict[str, Callable[[str], Awaitable[str]]] = {
+    "parts_info": parts_info_async,
+    "repair_info": repair_info_async,
+    "support_info": support_info_async,
+}
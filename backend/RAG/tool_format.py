@@ -0,0 +1,176 @@
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+from .part_catalog import PART_DEFAULTS
+
+# Tool results are appended to the conversation as tool messages and re-sent on every later
+# turn, so their size is paid for repeatedly. "compact" renders one terse line per match with
+# only the fields answers use; "verbose" is the original multi-line block format.
+TOOL_RESULT_FORMAT = os.environ.get("TOOL_RESULT_FORMAT", "compact").lower()
+
+# Per-tool budget in (estimated) tokens; matches that do not fit are dropped, and the first
+# match is cut to fit. TOOL_TOKEN_BUDGET_<TOOL> overrides a single tool.
+DEFAULT_TOOL_TOKEN_BUDGETS = {"parts_info": 360, "repair_info": 300, "support_info": 400}
+TOOL_TOKEN_BUDGETS = {
+    tool: int(os.environ.get(f"TOOL_TOKEN_BUDGET_{tool.upper()}", budget))
+    for tool, budget in DEFAULT_TOOL_TOKEN_BUDGETS.items()
+}
+# Long free-text fields are clipped before the budget is applied so one match cannot crowd out the rest
+COMPACT_TEXT_CHARS = int(os.environ.get("COMPACT_TEXT_CHARS", "240"))
+
+# Per tool: results formatted, estimated tokens returned and matches dropped by the budget
+# Formatting runs on the search pool threads, so updates and reads hold _stats_lock
+TOOL_TOKEN_STATS: Counter = Counter()
+_stats_lock = threading.Lock()
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough BPE token count: words and punctuation marks, or a quarter of the characters for
+    text with long unbroken runs (URLs, IDs), whichever is larger. Good enough for budgets
+    and before/after comparisons; the API's usage numbers are the exact figures.
+    """
+    return max(len(_TOKEN_PATTERN.findall(text)), len(text) // 4)
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """Cut text at the last word boundary that keeps it within the token budget"""
+    if estimate_tokens(text) <= budget:
+        return text
+    ends = [match.end() for match in _TOKEN_PATTERN.finditer(text)]
+    cut = ends[min(budget, len(ends)) - 1] if ends and budget > 0 else 0
+    cut = min(cut, budget * 4)
+    return text[:cut].rstrip() + "..."
+
+def clip(text: str, limit: Optional[int] = None) -> str:
+    limit = COMPACT_TEXT_CHARS if limit is None else limit
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + "..."
+
+def _has_video(url: Optional[str]) -> bool:
+    return bool(url) and url != 'No video available'
+
+def format_part(metadata: Dict, live: Dict, score: float, compact: bool) -> str:
+    price = live.get('price', metadata['price'])
+    availability = live.get('availability', metadata['availability'])
+    video_url = metadata.get('install_video_url')
+    if compact:
+        fields = [
+            f"{metadata['part_id']} {metadata['part_name']} (MPN {metadata['mpn']})",
+            clip(f"{metadata['brand']} {metadata['appliance_type']}").rstrip('.'),
+            f"${price}, {availability}",
+        ]
+        # Catalog placeholders ("Not Specified", "No symptoms listed") carry no information
+        install = [clip(metadata[key]) for key in ('install_difficulty', 'install_time') if metadata[key] != PART_DEFAULTS[key]]
+        if install:
+            fields.append(f"install {', '.join(install)}")
+        if metadata.get('symptoms') and metadata['symptoms'] != PART_DEFAULTS['symptoms']:
+            fields.append(f"fixes: {clip(metadata['symptoms'], 120)}")
+        if _has_video(video_url):
+            fields.append(f"video: {video_url}")
+        fields.append(f"url: {metadata['url']}")
+        return " | ".join(fields)
+    video_info = f"Installation Video: {video_url}\n" if _has_video(video_url) else "Installation Video: Not available\n"
+    return (
+        f"Part: {metadata['part_name']}\n"
+        f"ID: {metadata['part_id']}\n"
+        f"MPN: {metadata['mpn']}\n"
+        f"Price: ${price}\n"
+        f"Brand: {metadata['brand']}\n"
+        f"Type: {metadata['appliance_type']}\n"
+        f"Installation Difficulty: {metadata['install_difficulty']}\n"
+        f"Installation Time: {metadata['install_time']}\n"
+        f"Common Symptoms: {metadata['symptoms']}\n"
+        f"Related Parts: {metadata['replace_parts']}\n"
+        f"Availability: {availability}\n"
+        f"{video_info}"
+        f"URL: {metadata['url']}\n"
+        f"Relevance Score: {score:.2f}\n"
+        "---"
+    )
+
+def format_repair(metadata: Dict, score: float, compact: bool) -> str:
+    if compact:
+        return " | ".join([
+            f"{metadata['appliance_type']} {metadata['symptom']} ({metadata['frequency']}% of cases, {metadata['difficulty']})",
+            f"parts: {', '.join(metadata['parts_needed'])}",
+            f"video: {metadata['repair_video']}",
+            f"info: {metadata['symptom_url']}",
+            clip(metadata['description']),
+        ])
+    return (
+        f"Problem: {metadata['symptom']}\n"
+        f"Appliance: {metadata['appliance_type']}\n"
+        f"Description: {metadata['description']}\n"
+        f"Frequency: This affects {metadata['frequency']}% of {metadata['appliance_type']}s\n"
+        f"Difficulty: {metadata['difficulty']}\n"
+        f"Required Parts: {', '.join(metadata['parts_needed'])}\n"
+        f"Repair Video: {metadata['repair_video']}\n"
+        f"More Info: {metadata['symptom_url']}\n"
+        f"Relevance Score: {score:.2f}\n"
+        "---"
+    )
+
+def format_policy(metadata: Dict, score: float, compact: bool) -> str:
+    if compact:
+        # Policy text is the answer itself, so it is only bounded by the tool budget
+        return f"{metadata['title']}: {clip(metadata['content'], 10_000)}"
+    return "\n".join([
+        f"Policy: {metadata['title']}",
+        f"{metadata['content']}\n",
+        f"Relevance Score: {score:.2f}",
+        "---"
+    ])
+
+def is_compact(result_format: Optional[str] = None) -> bool:
+    return (result_format or TOOL_RESULT_FORMAT).lower() == "compact"
+
+def join_within_budget(tool: str, entries: List[str], compact: bool) -> str:
+    """
+    Join formatted matches, keeping whole matches (best first) while they fit the tool's
+    budget. Verbose output is returned unchanged so it stays comparable with the original.
+    """
+    dropped = 0
+    if not compact:
+        formatted = "\n".join(entries)
+    else:
+        budget = TOOL_TOKEN_BUDGETS.get(tool, 400)
+        kept, used = [], 0
+        for entry in entries:
+            tokens = estimate_tokens(entry) + 1
+            if used + tokens > budget:
+                if not kept:
+                    kept.append(truncate_to_tokens(entry, budget))
+                dropped = len(entries) - len(kept)
+                break
+            kept.append(entry)
+            used += tokens
+        formatted = "\n".join(kept)
+    tokens = estimate_tokens(formatted)
+    with _stats_lock:
+        TOOL_TOKEN_STATS[f"{tool}_results"] += 1
+        TOOL_TOKEN_STATS[f"{tool}_tokens"] += tokens
+        if dropped:
+            TOOL_TOKEN_STATS[f"{tool}_dropped"] += dropped
+    return formatted
+
+def tool_token_counts() -> Dict[str, int]:
+    """A consistent copy of TOOL_TOKEN_STATS"""
+    with _stats_lock:
+        return dict(TOOL_TOKEN_STATS)
+
+def tool_token_stats() -> Dict[str, float]:
+    """Average estimated tokens per result and matches dropped, per tool"""
+    counts = Counter(tool_token_counts())
+    stats = {}
+    for tool in TOOL_TOKEN_BUDGETS:
+        results = counts[f"{tool}_results"]
+        stats[tool] = {
+            "results": results,
+            "avg_tokens": counts[f"{tool}_tokens"] / results if results else 0.0,
+            "dropped_matches": counts[f"{tool}_dropped"],
+            "budget": TOOL_TOKEN_BUDGETS[tool],
+        }
+    return stats
@@ -1,21 +1,38 @@
-import pandas as pd
-from sentence_transformers import SentenceTransformer
-from pinecone import Pinecone, ServerlessSpec
 import os
-from dotenv import load_dotenv
 import re
-from typing import Dict, List, Optional, Union
+import hashlib
+import json
+import time
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 import numpy as np
+from .embedding import encode, encode_batch, start_encode_pool, stop_encode_pool
+from .pinecone_client import get_pinecone, serverless_spec
+from .index_backend import (
+    LocalIndexBackend, PineconeIndexBackend, get_index, project_metadata, read_manifest,
+    write_local_index_arrays, write_manifest
+)
+from .part_catalog import PARTS_CSV, PART_DEFAULTS, get_part_catalog
+from .index_generation import publish_index_update
+from .record_store import write_records
+from .facets import (
+    extract_appliance_types, extract_difficulty_keys, extract_install_minutes_filter,
+    extract_price_filter, normalize_symptoms, part_facets, record_filter_outcome
+)
+from .lexical import get_lexical_index, hybrid_query
+from .observability import get_logger, timed
 
-load_dotenv()
+logger = get_logger("parts")
 
 def create_searchable_text(row: Dict) -> str:
-    """Create rich text representation with multiple search patterns"""
+    """
+    Create rich text representation with multiple search patterns
+    Price and availability are left out on purpose: they change hourly and are joined in
+    from the live field store when results are formatted
+    """
     return f"""
     Product: {row['part_name']}
     Part ID: {row['part_id']}
     MPN: {row['mpn_id']}
-    Price: ${row['part_price']}
     Brand: {row['brand']}
     Type: {row['appliance_types']}
     Installation:
@@ -24,13 +41,11 @@ def create_searchable_text(row: Dict) -> str:
     - Video Guide: {row['install_video_url']}
     Common Symptoms: {row['symptoms']}
     Related Parts: {row['replace_parts']}
-    Status: {row['availability']}
     """
 
 def create_part_metadata(row: Dict) -> Dict:
     """Create metadata structure for part entries"""
     return {
-        "text": str(row['text']),
         "url": str(row['product_url']),
         "part_id": str(row['part_id']),
         "mpn": str(row['mpn_id']),
@@ -43,7 +58,9 @@ def create_part_metadata(row: Dict) -> Dict:
         "install_time": str(row['install_time']),
         "symptoms": str(row['symptoms']),
         "replace_parts": str(row['replace_parts']),
-        "install_video_url": str(row['install_video_url'])
+        "install_video_url": str(row['install_video_url']),
+        # Normalized, typed copies of the fields above for metadata filtering
+        **part_facets(row)
     }
 
 class IdentifierExtractor:
@@ -57,168 +74,356 @@ class IdentifierExtractor:
     
     @staticmethod
     def extract_mpn(text: str) -> Optional[str]:
-        """Extract Manufacturer Part Numbers (typically alphanumeric)"""
-        matches = re.findall(r'(?:MPN|Part Number|Part|#)[\s:]+([A-Z0-9-]+)', text, re.IGNORECASE)
-        return matches[0].upper() if matches else None
+        """
+        Extract Manufacturer Part Numbers (typically alphanumeric)
+        After "part" the token needs a digit ("part was pulled" names no part); after "MPN" or "#" it does not
+        """
+        for label, token in re.findall(r'(MPN|Part Number|Part|#)[\s:]+([A-Z0-9-]+)', text, re.IGNORECASE):
+            if label.upper() in ('MPN', '#') or any(c.isdigit() for c in token):
+                return token.upper()
+        return None
+    
+    @staticmethod
+    def extract_identifier_tokens(text: str) -> List[str]:
+        """Extract every token shaped like a part ID or MPN (alphanumeric, 3+ characters, at least one digit)"""
+        return [
+            token.upper() for token in re.findall(r'[A-Za-z0-9][A-Za-z0-9-]{2,}', text)
+            if any(c.isdigit() for c in token)
+        ]
     
     @staticmethod
     def extract_brand(text: str) -> Optional[str]:
-        """Extract brand names"""
-        brands = ['whirlpool', 'ge', 'samsung', 'lg', 'maytag']  # Example brands
-        words = text.lower().split()
-        for brand in brands:
-            if brand in words:
-                return brand.title()
+        """Extract any brand in the catalog's brand vocabulary as its canonical brand key"""
+        text = text.lower()
+        for brand, brand_key in get_part_catalog().brands.items():
+            if re.search(rf'\b{re.escape(brand)}\b', text):
+                return brand_key
         return None
     
     @staticmethod
-    def extract_appliance_type(text: str) -> Optional[str]:
-        """Extract appliance types"""
-        types = ['refrigerator', 'dishwasher', 'washer', 'dryer']  # Example types
-        words = text.lower().split()
-        for type_ in types:
-            if type_ in words:
-                return type_.title()
-        return None
+    def extract_appliance_type(text: str) -> Optional[List[str]]:
+        """Extract canonical appliance types (fridge -> refrigerator)"""
+        return extract_appliance_types(text) or None
     
     @staticmethod
-    def extract_difficulty(text: str) -> Optional[str]:
-        """Extract installation difficulty level"""
-        difficulties = ['easy', 'moderate', 'difficult', 'professional']
-        words = text.lower().split()
-        for diff in difficulties:
-            if diff in words:
-                return diff.title()
-        return None
+    def extract_difficulty(text: str) -> Optional[List[str]]:
+        """Extract installation difficulty as the stored difficulty keys it covers"""
+        return extract_difficulty_keys(text)
     
     @staticmethod
     def extract_symptoms(text: str) -> Optional[List[str]]:
-        """Extract symptoms from text"""
-        symptom_indicators = ['not', 'broken', 'leaking', 'noisy', 'won\'t', 'doesn\'t']
-        words = text.lower().split()
-        found_symptoms = []
-        for indicator in symptom_indicators:
-            if indicator in words:
-                found_symptoms.append(indicator)
-        return found_symptoms if found_symptoms else None
+        """Extract canonical symptom keys from text"""
+        return normalize_symptoms(text) or None
 
-def create_search_filters(query: str) -> Dict[str, Union[str, List[str]]]:
-    """Create search filters based on identified query parameters"""
-    print("\n[Search Strategy] Analyzing query for specific identifiers and filters...")
+def create_search_filters(query: str) -> Dict[str, Union[str, Dict]]:
+    """Create search filters on the normalized facet fields based on identified query parameters"""
     extractor = IdentifierExtractor()
     filters = {}
     
-    # Try all possible identifiers
-    part_id = extractor.extract_part_id(query)
-    mpn = extractor.extract_mpn(query)
+    # Part IDs and MPNs are not used as filters: known ones are answered by the catalog
+    # before any vector search, and unknown ones cannot match anything in the index
     brand = extractor.extract_brand(query)
     appliance_type = extractor.extract_appliance_type(query)
     difficulty = extractor.extract_difficulty(query)
     symptoms = extractor.extract_symptoms(query)
+    price = extract_price_filter(query)
+    install_minutes = extract_install_minutes_filter(query)
     
-    # Build filter dictionary and log what was found
-    if part_id:
-        print(f"[Filter Found] Part ID: {part_id}")
-        filters["part_id"] = part_id
-    if mpn:
-        print(f"[Filter Found] MPN: {mpn}")
-        filters["mpn"] = mpn
+    # Build filter dictionary
     if brand:
-        print(f"[Filter Found] Brand: {brand}")
-        filters["brand"] = brand
+        filters["brand_key"] = brand
     if appliance_type:
-        print(f"[Filter Found] Appliance Type: {appliance_type}")
-        filters["appliance_type"] = appliance_type
+        filters["appliance_types"] = {"$in": appliance_type}
     if difficulty:
-        print(f"[Filter Found] Installation Difficulty: {difficulty}")
-        filters["install_difficulty"] = difficulty
+        filters["difficulty_key"] = {"$in": difficulty}
     if symptoms:
-        print(f"[Filter Found] Symptoms: {symptoms}")
-        filters["symptoms"] = {"$in": symptoms}
-    
-    if not filters:
-        print("[Search Strategy] No specific filters found - will use semantic search only")
-    else:
-        print(f"[Search Strategy] Found {len(filters)} filters to narrow search")
+        filters["symptom_keys"] = {"$in": symptoms}
+    if price:
+        filters["price_value"] = price
+    if install_minutes:
+        filters["install_minutes_max"] = install_minutes
     
+    logger.debug("Parts filters for %r: %s", query, filters or "none")
     return filters
 
-# Initialize Pinecone client and model
-pc = Pinecone(api_key=os.environ.get("PINECONE_API_KEY"))
-model = SentenceTransformer('all-MiniLM-L6-v2')
+def _query_identifiers(query: str) -> Tuple[List[str], List[str]]:
+    """(explicit identifiers, all identifier candidates) in the query"""
+    extractor = IdentifierExtractor()
+    explicit = [c for c in (extractor.extract_part_id(query), extractor.extract_mpn(query)) if c]
+    return explicit, explicit + extractor.extract_identifier_tokens(query)
 
-def vectorize_parts():
-    """Vectorize parts data and upload to Pinecone"""
-    # Read and prepare parts data
-    df = pd.read_csv('case-study/backend/RAG/all_parts.csv')
-    
-    # Fill NaN values with appropriate defaults
-    df = df.fillna({
-        'part_name': 'Unknown Part',
-        'part_id': 'NO_ID',
-        'mpn_id': 'NO_MPN',
-        'part_price': '0.00',
-        'brand': 'Unknown Brand',
-        'appliance_types': 'General Appliance',
-        'availability': 'Unknown',
-        'product_url': '#',
-        'install_difficulty': 'Not Specified',
-        'install_time': 'Not Specified',
-        'symptoms': 'No symptoms listed',
-        'replace_parts': 'No related parts listed',
-        'install_video_url': 'No video available'
-    })
-    
+def find_exact_parts(query: str) -> List[Dict]:
+    """
+    Resolve part IDs, MPNs and cross-reference numbers in the query with O(1) catalog lookups
+    Returns catalog rows for known identifiers, or an empty list if none are known
+    """
+    explicit, candidates = _query_identifiers(query)
+    return get_part_catalog().lookup_all(candidates, explicit=explicit)
+
+# Words that only frame a question about an identifier ("is PS11752778 in stock?", "how much does part X cost")
+_FRAMING_WORDS = {
+    "a", "an", "the", "is", "are", "was", "do", "does", "did", "can", "could", "will", "would", "i", "me",
+    "my", "this", "that", "it", "of", "for", "to", "in", "on", "with", "and", "or", "what", "how", "much",
+    "which", "where", "when", "part", "parts", "number", "mpn", "model", "price", "cost", "stock",
+    "available", "availability", "install", "replace", "compatible", "need", "find", "buy", "order",
+    "have", "has", "you", "your", "please", "about", "tell", "show", "get", "there", "any",
+}
+
+def is_identifier_query(query: str) -> bool:
+    """
+    True when identifiers make up at least half of the query's words once question framing is
+    dropped, so catalog matches answer it alone; otherwise they are ranked ahead of a normal search
+    """
+    _, candidates = _query_identifiers(query)
+    identifiers = set(candidates)
+    if not identifiers:
+        return False
+    words = [
+        word.upper() for word in re.findall(r'[A-Za-z0-9][A-Za-z0-9-]*', query)
+        if word.lower() not in _FRAMING_WORDS
+    ]
+    return sum(word in identifiers for word in words) * 2 >= len(words)
+
+def catalog_match(row: Dict, fields: Optional[Sequence[str]] = None) -> Dict:
+    """Shape a catalog row like an index match so the formatters can use it unchanged"""
+    return {"id": part_record_id(row), "score": 1.0, "metadata": project_metadata(create_part_metadata(row), fields)}
+
+def _sha1(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def part_record_id(row: Dict) -> str:
+    """
+    Stable vector ID: the PartSelect ID plus a short hash of the part name, since the CSV
+    lists some parts once per brand variant under the same part_id
+    """
+    return f"{row['part_id']}#{_sha1(str(row['part_name']))[:8]}"
+
+def part_content_hashes(row: Dict, metadata: Dict) -> List[str]:
+    """[text_hash, metadata_hash]: the first changes only when the record must be re-embedded"""
+    return [_sha1(row['text']), _sha1(json.dumps(metadata, sort_keys=True))]
+
+def prepare_part_rows(
+    rows: List[Dict],
+    seen: Optional[Dict[str, Dict]] = None
+) -> Tuple[List[str], List[str], List[Dict], List[List[str]], List[Dict]]:
+    """
+    Build (ids, searchable texts, metadata, content hashes, full records) for CSV rows
+    seen maps stable IDs already prepared to their rows; later rows with the same ID are skipped,
+    with a warning when their content differs from the row that was kept
+    """
+    seen = {} if seen is None else seen
+    ids, texts, metadata, hashes, records = [], [], [], [], []
+    for row in rows:
+        record_id = part_record_id(row)
+        if record_id in seen:
+            kept = seen[record_id]
+            differing = sorted(key for key, value in row.items() if key != 'text' and kept.get(key) != value)
+            if differing:
+                logger.warning(
+                    "Skipped a row for %s that repeats its part ID and name but differs in %s; kept the first one",
+                    record_id, ", ".join(differing)
+                )
+            continue
+        seen[record_id] = row
+        row['text'] = create_searchable_text(row)
+        row_metadata = create_part_metadata(row)
+        ids.append(record_id)
+        texts.append(row['text'])
+        metadata.append(row_metadata)
+        hashes.append(part_content_hashes(row, row_metadata))
+        records.append(row)
+    return ids, texts, metadata, hashes, records
+
+def load_parts_corpus(csv_path: str = PARTS_CSV) -> Tuple[List[str], List[str], List[Dict]]:
+    """The parts corpus as indexed by vectorize_parts, used to build the BM25 index"""
+    import pandas as pd
+
+    rows = pd.read_csv(csv_path, dtype=str).fillna(PART_DEFAULTS).to_dict('records')
+    ids, texts, metadata, _, _ = prepare_part_rows(rows)
+    return ids, texts, metadata
+
+def upload_to_pinecone(
+    index_name: str,
+    ids: List[str],
+    vectors: np.ndarray,
+    metadata: List[Dict],
+    batch_size: int = 100,
+    replace_all: bool = False
+):
+    """
+    Create the Pinecone index if needed and upsert vectors in batches
+    With replace_all=True existing vectors are deleted first, for full rebuilds
+    """
     # Create index if it doesn't exist
-    index_name = "parts"
-    if index_name not in pc.list_indexes().names():
+    pc = get_pinecone()
+    if replace_all and index_name in pc.list_indexes().names():
+        pc.Index(index_name).delete(delete_all=True)
+    elif index_name not in pc.list_indexes().names():
         pc.create_index(
             name=index_name,
-            dimension=384,
+            dimension=vectors.shape[1],
             metric='euclidean',
-            spec=ServerlessSpec(
-                cloud='aws',
-                region='us-east-1'
-            )
+            spec=serverless_spec()
         )
     
     index = pc.Index(index_name)
     
-    # Create searchable text and embeddings
-    df['text'] = df.apply(create_searchable_text, axis=1)
-    df['embedding'] = df['text'].apply(lambda x: model.encode(x).tolist())
-    
-    # Prepare vectors for upload
-    to_upsert = []
-    for i in range(len(df)):
-        row = df.iloc[i]
-        metadata = create_part_metadata(row)
-        
-        # Convert embedding to list if it's numpy array
-        embedding = row['embedding']
-        if isinstance(embedding, np.ndarray):
-            embedding = embedding.tolist()
-        
-        to_upsert.append((str(i), embedding, metadata))
-    
     # Upload in batches
-    batch_size = 100
-    for i in range(0, len(to_upsert), batch_size):
-        batch = to_upsert[i:i+batch_size]
+    total_batches = (len(ids) + batch_size - 1) // batch_size
+    for i in range(0, len(ids), batch_size):
+        batch = [
+            (ids[j], vectors[j].tolist(), metadata[j])
+            for j in range(i, min(i + batch_size, len(ids)))
+        ]
         try:
             index.upsert(vectors=batch)
-            print(f"Uploaded batch {i//batch_size + 1} of {len(to_upsert)//batch_size + 1}")
+            logger.info("Uploaded batch %d of %d", i//batch_size + 1, total_batches)
         except Exception as e:
-            print(f"Error uploading batch {i//batch_size + 1}: {str(e)}")
-            # Print problematic records for debugging
+            logger.error("Error uploading batch %d: %s", i//batch_size + 1, e)
+            # Log problematic records for debugging
             for j, (id_, vec, meta) in enumerate(batch):
                 try:
                     index.upsert(vectors=[(id_, vec, meta)])
                 except Exception as e2:
-                    print(f"Problem with record {i+j}: {str(e2)}")
-                    print(f"Metadata: {meta}")
+                    logger.error("Problem with record %d: %s (metadata: %s)", i+j, e2, meta)
+
+def vectorize_parts(
+    local: bool = False,
+    batch_size: int = 256,
+    processes: Optional[int] = None,
+    chunksize: int = 2000,
+    csv_path: str = PARTS_CSV,
+    output_dir: Optional[str] = None
+):
+    """
+    Vectorize parts data and upload to Pinecone
+    
+    The CSV is streamed in chunks of `chunksize` rows and each chunk is encoded in
+    batches of `batch_size`. With processes > 1 encoding is spread across that many
+    worker processes. Embeddings and metadata are always written to the local index
+    artifact (parts.npy + parts.meta.json in output_dir), which LocalIndexBackend
+    serves directly; with local=False the artifact is also uploaded to Pinecone.
+    """
+    import pandas as pd
+
+    index_name = "parts"
+    start = time.perf_counter()
+    pool = start_encode_pool(processes) if processes and processes > 1 else None
+    
+    ids: List[str] = []
+    metadata: List[Dict] = []
+    hashes: List[List[str]] = []
+    records: List[Dict] = []
+    seen: Dict[str, Dict] = {}
+    rows_read = 0
+    chunks: List[np.ndarray] = []
+    encode_seconds = 0.0
+    try:
+        # Read and prepare parts data one chunk at a time
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize, dtype=str):
+            # Fill NaN values with appropriate defaults
+            rows = chunk.fillna(PART_DEFAULTS).to_dict('records')
+            
+            rows_read += len(rows)
+            chunk_ids, texts, chunk_metadata, chunk_hashes, chunk_records = prepare_part_rows(rows, seen)
+            ids.extend(chunk_ids)
+            metadata.extend(chunk_metadata)
+            hashes.extend(chunk_hashes)
+            records.extend(chunk_records)
+            
+            encode_start = time.perf_counter()
+            chunks.append(np.asarray(encode_batch(texts, batch_size=batch_size, pool=pool), dtype=np.float32))
+            encode_seconds += time.perf_counter() - encode_start
+            logger.info("Encoded %d rows (%.0f rows/sec)", len(ids), len(texts) / max(time.perf_counter() - encode_start, 1e-9))
+    finally:
+        if pool is not None:
+            stop_encode_pool(pool)
+    
+    vectors = np.concatenate(chunks) if chunks else np.zeros((0, 384), dtype=np.float32)
+    write_local_index_arrays(index_name, ids, vectors, metadata, directory=output_dir)
+    write_records(index_name, ids, records, directory=output_dir)
+    
+    if not local:
+        upload_to_pinecone(index_name, ids, vectors, metadata, replace_all=True)
+    
+    # Content hashes let sync_parts re-embed only what changes from here on
+    write_manifest(index_name, dict(zip(ids, hashes)), directory=output_dir)
+    if rows_read > len(ids):
+        logger.info("Skipped %d repeated rows with an existing part ID and name", rows_read - len(ids))
+    
+    elapsed = time.perf_counter() - start
+    logger.info(
+        "%d parts in %.1fs - encoding %.0f rows/sec, end to end %.0f rows/sec",
+        len(ids), elapsed, len(ids) / max(encode_seconds, 1e-9), len(ids) / max(elapsed, 1e-9)
+    )
+    
+    # Cached tool results and loaded indexes may reference the old contents; running API
+    # processes pick the change up from the published generation
+    publish_index_update(output_dir)
 
-def query_parts(query: str, top_k: int = 3) -> Dict:
+def sync_parts(
+    local: bool = False,
+    batch_size: int = 256,
+    csv_path: str = PARTS_CSV,
+    output_dir: Optional[str] = None
+):
+    """
+    Bring the parts index in line with the CSV, touching only what changed since the last run
+    - new rows, or rows whose searchable text changed, are re-embedded and upserted
+    - rows where only price/availability/metadata changed get a metadata update
+    - rows that disappeared from the CSV are deleted
+    Falls back to a full vectorize_parts when no manifest from a previous run exists
+    """
+    index_name = "parts"
+    manifest = read_manifest(index_name, directory=output_dir)
+    if manifest is None:
+        logger.info("No manifest from a previous run, rebuilding the parts index from scratch")
+        return vectorize_parts(local=local, batch_size=batch_size, csv_path=csv_path, output_dir=output_dir)
+    
+    import pandas as pd
+
+    start = time.perf_counter()
+    rows = pd.read_csv(csv_path, dtype=str).fillna(PART_DEFAULTS).to_dict('records')
+    ids, texts, metadata, hashes, records = prepare_part_rows(rows)
+    
+    to_embed = [i for i, id_ in enumerate(ids) if id_ not in manifest or manifest[id_][0] != hashes[i][0]]
+    metadata_updates = {
+        id_: metadata[i] for i, id_ in enumerate(ids)
+        if id_ in manifest and manifest[id_][0] == hashes[i][0] and manifest[id_][1] != hashes[i][1]
+    }
+    current = set(ids)
+    deletes = [id_ for id_ in manifest if id_ not in current]
+    logger.info(
+        "Sync of %d parts: %d to embed, %d metadata updates, %d deletes",
+        len(ids), len(to_embed), len(metadata_updates), len(deletes)
+    )
+    if not (to_embed or metadata_updates or deletes):
+        logger.info("Parts index is up to date")
+        return
+    
+    vectors = np.asarray(encode_batch([texts[i] for i in to_embed], batch_size=batch_size), dtype=np.float32)
+    upserts = [(ids[i], vectors[j], metadata[i]) for j, i in enumerate(to_embed)]
+    
+    LocalIndexBackend(index_name, directory=output_dir).apply_changes(upserts, metadata_updates, deletes)
+    if not local:
+        PineconeIndexBackend(index_name).apply_changes(upserts, metadata_updates, deletes)
+    write_manifest(index_name, dict(zip(ids, hashes)), directory=output_dir)
+    write_records(index_name, ids, records, directory=output_dir)
+    logger.info("Sync done in %.1fs", time.perf_counter() - start)
+    
+    # Cached tool results and loaded indexes may reference the old contents; running API
+    # processes pick the change up from the published generation
+    publish_index_update(output_dir)
+
+@timed("query.parts")
+def query_parts(
+    query: str,
+    top_k: int = 3,
+    query_vector: Optional[List[float]] = None,
+    filters: Optional[Dict] = None,
+    fields: Optional[Sequence[str]] = None,
+    exact_parts: Optional[List[Dict]] = None
+) -> Dict:
     """
     Query parts with multi-strategy search
     Handles various types of queries:
@@ -226,50 +431,83 @@ def query_parts(query: str, top_k: int = 3) -> Dict:
     - Installation-related queries
     - Symptom-based searches
     - Brand/appliance type filters
+    Candidates come from both the vector index and the BM25 index and are fused by rank
+    fields limits each match's metadata to the keys the caller reads
+    exact_parts takes the caller's find_exact_parts(query) result so the lookup is not repeated
     """
-    print(f"\n[Query] Processing search: '{query}'")
+    # Known part IDs, MPNs and superseded/alternate numbers are answered from the in-memory catalog;
+    # vector search is skipped when the query is mostly identifiers
+    if exact_parts is None:
+        exact_parts = find_exact_parts(query)
+    catalog_matches = [catalog_match(row, fields) for row in exact_parts[:max(top_k, 1)]]
+    if catalog_matches:
+        logger.debug("Found %d exact identifier matches in catalog for %r", len(catalog_matches), query)
+        if is_identifier_query(query):
+            return {"matches": catalog_matches}
     
+    results = _search_parts(query, top_k, query_vector, filters, fields)
+    if not catalog_matches:
+        return results
+    # Catalog matches rank first; the search fills the remaining slots
+    seen = {match["id"] for match in catalog_matches}
+    extra = [match for match in results["matches"] if match["id"] not in seen]
+    return {"matches": (catalog_matches + extra)[:max(top_k, 1)]}
+
+def _search_parts(
+    query: str,
+    top_k: int,
+    query_vector: Optional[List[float]],
+    filters: Optional[Dict],
+    fields: Optional[Sequence[str]]
+) -> Dict:
+    """Hybrid vector + BM25 parts search, filtered first when the query implies filters"""
     # Extract search filters
-    filters = create_search_filters(query)
+    if filters is None:
+        filters = create_search_filters(query)
     
-    # Create vector from query
-    print("[Embedding] Creating vector embedding for query...")
-    query_vector = model.encode(query).tolist()
+    # Create vector from query unless the caller already embedded it
+    if query_vector is None:
+        query_vector = encode(query)
     
-    index = pc.Index("parts")
+    index = get_index("parts")
+    lexical = get_lexical_index("parts", load_parts_corpus)
     
     # Adjust top_k for symptom searches
     original_top_k = top_k
-    if "symptoms" in filters:
+    if "symptom_keys" in filters:
         top_k = max(top_k, 5)
         if top_k != original_top_k:
-            print(f"[Search Strategy] Increased results count to {top_k} for symptom search")
+            logger.debug("Increased results count to %d for symptom search", top_k)
     
     # If we have filters, try filtered search first
     if filters:
-        print("[Search Strategy] Attempting filtered vector search first...")
-        results = index.query(
-            vector=query_vector,
-            top_k=top_k,
-            include_metadata=True,
-            filter=filters
-        )
+        results = hybrid_query(index, lexical, query, query_vector, top_k, filter=filters, fields=fields)
         
+        record_filter_outcome("parts", bool(results['matches']))
         if results['matches']:
-            print(f"[Results] Found {len(results['matches'])} matches using filters")
+            logger.debug("Found %d parts matches using filters", len(results['matches']))
             return results
-        else:
-            print("[Search Strategy] No results found with filters, falling back to semantic search")
+        logger.debug("No parts results with filters, falling back to unfiltered search")
     
-    # Fall back to semantic search
-    print("[Search Strategy] Performing pure semantic search...")
-    results = index.query(
-        vector=query_vector,
-        top_k=top_k,
-        include_metadata=True
-    )
-    print(f"[Results] Found {len(results['matches'])} matches using semantic search")
+    # Fall back to unfiltered search
+    results = hybrid_query(index, lexical, query, query_vector, top_k, fields=fields)
+    logger.debug("Found %d parts matches using unfiltered hybrid search", len(results['matches']))
     return results
 
-# Uncomment to run vectorization
-# vectorize_parts()
+if __name__ == "__main__":
+    # python -m RAG.vectorize [--local] [--sync] [--processes N] [--batch-size N] [--chunksize N]
+    import argparse
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Embed all_parts.csv into the parts index")
+    parser.add_argument("--local", action="store_true", help="only write the local index artifact")
+    parser.add_argument("--sync", action="store_true", help="only apply rows changed since the last run")
+    parser.add_argument("--processes", type=int, default=None, help="encoding worker processes")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--chunksize", type=int, default=2000)
+    args = parser.parse_args()
+    if args.sync:
+        sync_parts(local=args.local, batch_size=args.batch_size)
+    else:
+        vectorize_parts(local=args.local, batch_size=args.batch_size, processes=args.processes, chunksize=args.chunksize)
@@ -1,13 +1,19 @@
-import pandas as pd
-from sentence_transformers import SentenceTransformer
-from pinecone import Pinecone, ServerlessSpec
 import os
-from dotenv import load_dotenv
 import re
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 import numpy as np
+from .embedding import encode
+from .pinecone_client import get_pinecone, serverless_spec
+from .index_backend import get_index, write_local_index
+from .index_generation import publish_index_update
+from .record_store import write_records
+from .lexical import get_lexical_index, hybrid_query
+from .facets import extract_appliance_types, extract_difficulty_keys, normalize_symptoms, record_filter_outcome, repair_facets
+from .observability import get_logger, timed
 
-load_dotenv()
+logger = get_logger("repairs")
+
+REPAIRS_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'repairs.csv')
 
 def create_searchable_text(row: Dict) -> str:
     """Create rich text representation for repair data"""
@@ -34,66 +40,30 @@ def create_repair_metadata(row: Dict) -> Dict:
         "symptom_url": str(row['symptom_detail_url']),
         "difficulty": str(row['difficulty']),
         "repair_video": str(row['repair_video_url']),
-        "searchable_text": create_searchable_text(row)
+        # Normalized, typed copies of the fields above for metadata filtering
+        **repair_facets(row)
     }
 
 class RepairSymptomExtractor:
     """Extracts repair-related information from query text"""
     
     @staticmethod
-    def extract_appliance_type(text: str) -> Optional[str]:
-        """Extract appliance type"""
-        types = ['refrigerator', 'dishwasher', 'washer', 'dryer']
-        words = text.lower().split()
-        for type_ in types:
-            if type_ in words:
-                return type_.title()
-        return None
+    def extract_appliance_type(text: str) -> Optional[List[str]]:
+        """Extract canonical appliance types (fridge -> refrigerator)"""
+        return extract_appliance_types(text) or None
     
     @staticmethod
     def extract_symptoms(text: str) -> Optional[List[str]]:
-        """Extract common appliance symptoms"""
-        symptoms = [
-            'noisy', 'leaking', 'not starting', 'not making ice',
-            'too warm', 'not dispensing', 'sweating', 'not working',
-            'too cold', 'runs too long', 'not cleaning', 'not draining',
-            'not filling', 'not dispensing detergent', 'not drying'
-        ]
-        
-        found_symptoms = []
-        text_lower = text.lower()
-        
-        # Check for direct symptom matches
-        for symptom in symptoms:
-            if symptom in text_lower:
-                found_symptoms.append(symptom)
-        
-        # Check for negative constructions
-        negatives = ['won\'t', 'not', 'doesn\'t', 'isn\'t', 'stopped']
-        actions = ['start', 'run', 'work', 'clean', 'drain', 'fill', 'dry', 'dispense']
-        
-        words = text_lower.split()
-        for neg in negatives:
-            if neg in words:
-                idx = words.index(neg)
-                if idx + 1 < len(words) and words[idx + 1] in actions:
-                    found_symptoms.append(f"not {words[idx + 1]}")
-        
-        return found_symptoms if found_symptoms else None
+        """Extract canonical symptom keys, the same ones stored on each repair guide"""
+        return normalize_symptoms(text) or None
     
     @staticmethod
-    def extract_difficulty(text: str) -> Optional[str]:
-        """Extract repair difficulty level"""
-        difficulties = ['REALLY EASY', 'EASY', 'MODERATE', 'DIFFICULT']
-        words = text.upper().split()
-        for diff in difficulties:
-            if diff in words:
-                return diff
-        return None
+    def extract_difficulty(text: str) -> Optional[List[str]]:
+        """Extract repair difficulty as the stored difficulty keys it covers"""
+        return extract_difficulty_keys(text)
 
-def create_repair_filters(query: str) -> Dict[str, Union[str, List[str]]]:
-    """Create search filters for repair queries"""
-    print("\n[Search Strategy] Analyzing repair query for filters...")
+def create_repair_filters(query: str) -> Dict[str, Union[str, Dict]]:
+    """Create search filters on the normalized facet fields for repair queries"""
     extractor = RepairSymptomExtractor()
     filters = {}
     
@@ -104,75 +74,97 @@ def create_repair_filters(query: str) -> Dict[str, Union[str, List[str]]]:
     
     # Build filter dictionary
     if appliance_type:
-        print(f"[Filter Found] Appliance Type: {appliance_type}")
-        filters["appliance_type"] = appliance_type
+        filters["appliance_types"] = {"$in": appliance_type}
     if symptoms:
-        print(f"[Filter Found] Symptoms: {symptoms}")
-        filters["symptom"] = {"$in": symptoms}
+        filters["symptom_keys"] = {"$in": symptoms}
     if difficulty:
-        print(f"[Filter Found] Difficulty: {difficulty}")
-        filters["difficulty"] = difficulty
-    
-    if not filters:
-        print("[Search Strategy] No specific filters found - will use semantic search only")
-    else:
-        print(f"[Search Strategy] Found {len(filters)} filters to narrow search")
+        filters["difficulty_key"] = {"$in": difficulty}
     
+    logger.debug("Repair filters for %r: %s", query, filters or "none")
     return filters
 
-# Initialize Pinecone client
-pc = Pinecone(api_key=os.environ.get("PINECONE_API_KEY"))
-model = SentenceTransformer('all-MiniLM-L6-v2')
+def vectorize_repairs(local: bool = False):
+    """
+    Vectorize repair data and upload to Pinecone
+    With local=True the vectors are written to the local index directory instead
+    """
+    import pandas as pd
 
-def vectorize_repairs():
-    """Vectorize repair data and upload to Pinecone"""
     # Read and prepare repair data
-    df = pd.read_csv('case-study/backend/RAG/repairs.csv')
+    df = pd.read_csv(REPAIRS_CSV)
+    
+    # Prepare vectors for upload
+    to_upsert = []
+    records = []
+    for i, row in df.iterrows():
+        # Create metadata
+        metadata = create_repair_metadata(row)
+        
+        # Create and encode searchable text
+        text = create_searchable_text(row)
+        embedding = encode(text, use_cache=False)
+        
+        to_upsert.append((str(i), embedding, metadata))
+        records.append(dict(row, searchable_text=text))
     
-    # Create index if it doesn't exist
     index_name = "repairs"
+    write_records(index_name, [id_ for id_, _, _ in to_upsert], records)
+    if local:
+        write_local_index(index_name, to_upsert)
+        publish_index_update()
+        return
+    
+    # Create index if it doesn't exist
+    pc = get_pinecone()
     if index_name not in pc.list_indexes().names():
         pc.create_index(
             name=index_name,
             dimension=384,
             metric='euclidean',
-            spec=ServerlessSpec(
-                cloud='aws',
-                region='us-east-1'
-            )
+            spec=serverless_spec()
         )
     
     index = pc.Index(index_name)
     
-    # Prepare vectors for upload
-    # to_upsert = []
-    # for i, row in df.iterrows():
-    #     # Create metadata
-    #     metadata = create_repair_metadata(row)
-        
-    #     # Create and encode searchable text
-    #     text = metadata['searchable_text']
-    #     embedding = model.encode(text).tolist()
-        
-    #     to_upsert.append((str(i), embedding, metadata))
-    
-    # # Upload in batches
-    # batch_size = 10  # Smaller batch size for repairs as there are fewer entries
-    # for i in range(0, len(to_upsert), batch_size):
-    #     batch = to_upsert[i:i+batch_size]
-    #     try:
-    #         index.upsert(vectors=batch)
-    #         print(f"Uploaded repair batch {i//batch_size + 1} of {len(to_upsert)//batch_size + 1}")
-    #     except Exception as e:
-    #         print(f"Error uploading batch {i//batch_size + 1}: {str(e)}")
-    #         for j, (id_, vec, meta) in enumerate(batch):
-    #             try:
-    #                 index.upsert(vectors=[(id_, vec, meta)])
-    #             except Exception as e2:
-    #                 print(f"Problem with record {i+j}: {str(e2)}")
-    #                 print(f"Metadata: {meta}")
+    # Upload in batches
+    batch_size = 10  # Smaller batch size for repairs as there are fewer entries
+    for i in range(0, len(to_upsert), batch_size):
+        batch = to_upsert[i:i+batch_size]
+        try:
+            index.upsert(vectors=batch)
+            logger.info("Uploaded repair batch %d of %d", i//batch_size + 1, len(to_upsert)//batch_size + 1)
+        except Exception as e:
+            logger.error("Error uploading batch %d: %s", i//batch_size + 1, e)
+            for j, (id_, vec, meta) in enumerate(batch):
+                try:
+                    index.upsert(vectors=[(id_, vec, meta)])
+                except Exception as e2:
+                    logger.error("Problem with record %d: %s (metadata: %s)", i+j, e2, meta)
+    
+    # Cached tool results and loaded indexes may reference the old contents; running API
+    # processes pick the change up from the published generation
+    publish_index_update()
+
+def load_repairs_corpus(csv_path: str = REPAIRS_CSV) -> Tuple[List[str], List[str], List[Dict]]:
+    """The repairs corpus as indexed by vectorize_repairs, used to build the BM25 index"""
+    import pandas as pd
+
+    ids, texts, metadata = [], [], []
+    for i, row in pd.read_csv(csv_path).iterrows():
+        row_metadata = create_repair_metadata(row)
+        ids.append(str(i))
+        texts.append(create_searchable_text(row))
+        metadata.append(row_metadata)
+    return ids, texts, metadata
 
-def query_repairs(query: str, top_k: int = 3) -> Dict:
+@timed("query.repairs")
+def query_repairs(
+    query: str,
+    top_k: int = 3,
+    query_vector: Optional[List[float]] = None,
+    filters: Optional[Dict] = None,
+    fields: Optional[Sequence[str]] = None
+) -> Dict:
     """
     Query repair information
     Handles various types of queries:
@@ -180,41 +172,30 @@ def query_repairs(query: str, top_k: int = 3) -> Dict:
     - Appliance-specific searches
     - Difficulty-based filtering
     """
-    print(f"\n[Query] Processing repair search: '{query}'")
-    
     # Extract search filters
-    filters = create_repair_filters(query)
+    if filters is None:
+        filters = create_repair_filters(query)
     
-    # Create vector from query
-    print("[Embedding] Creating vector embedding for repair query...")
-    query_vector = model.encode(query).tolist()
+    # Create vector from query unless the caller already embedded it
+    if query_vector is None:
+        query_vector = encode(query)
     
-    index = pc.Index("repairs")
+    index = get_index("repairs")
+    lexical = get_lexical_index("repairs", load_repairs_corpus)
     
     # If we have filters, try filtered search first
     if filters:
-        print("[Search Strategy] Attempting filtered repair search...")
-        results = index.query(
-            vector=query_vector,
-            top_k=top_k,
-            include_metadata=True,
-            filter=filters
-        )
+        results = hybrid_query(index, lexical, query, query_vector, top_k, filter=filters, fields=fields)
         
+        record_filter_outcome("repairs", bool(results['matches']))
         if results['matches']:
-            print(f"[Results] Found {len(results['matches'])} repair matches using filters")
+            logger.debug("Found %d repair matches using filters", len(results['matches']))
             return results
-        else:
-            print("[Search Strategy] No repair results with filters, falling back to semantic search")
-    
-    # Fall back to semantic search
-    print("[Search Strategy] Performing pure semantic repair search...")
-    results = index.query(
-        vector=query_vector,
-        top_k=top_k,
-        include_metadata=True
-    )
-    print(f"[Results] Found {len(results['matches'])} repair matches using semantic search")
+        logger.debug("No repair results with filters, falling back to unfiltered search")
+    
+    # Fall back to unfiltered search
+    results = hybrid_query(index, lexical, query, query_vector, top_k, fields=fields)
+    logger.debug("Found %d repair matches using unfiltered hybrid search", len(results['matches']))
     return results
 
 #vectorize_repairs() 
\ No newline at end of file
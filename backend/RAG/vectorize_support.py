@@ -1,11 +1,16 @@
 import json
 import os
-from typing import Dict
-from sentence_transformers import SentenceTransformer
-from pinecone import Pinecone, ServerlessSpec
-from dotenv import load_dotenv
+from typing import Dict, List, Optional, Sequence
+from .embedding import encode
+from .pinecone_client import get_pinecone, serverless_spec
+from .index_backend import get_index, write_local_index
+from .index_generation import publish_index_update
+from .record_store import write_records
+from .observability import get_logger, timed
 
-load_dotenv()
+logger = get_logger("policy")
+
+SUPPORT_JSON = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'support_info.json')
 
 def create_searchable_text(policy: Dict) -> str:
     """Create rich text representation for policy data"""
@@ -18,48 +23,53 @@ def create_policy_metadata(policy: Dict) -> Dict:
     """Create metadata structure for policy entries"""
     return {
         "title": policy['title'],
-        "content": policy['content'],
-        "searchable_text": create_searchable_text(policy)
+        "content": policy['content']
     }
 
-pc = Pinecone(api_key=os.environ.get("PINECONE_API_KEY"))
-model = SentenceTransformer('all-MiniLM-L6-v2')
-
-def vectorize_support():
-    """Vectorize support information and upload to Pinecone"""
+def vectorize_support(local: bool = False):
+    """
+    Vectorize support information and upload to Pinecone
+    With local=True the vectors are written to the local index directory instead
+    """
     # Read and prepare support data
-    with open('case-study/backend/RAG/support_info.json', 'r', encoding='utf-8') as f:
+    with open(SUPPORT_JSON, 'r', encoding='utf-8') as f:
         support_data = json.load(f)
     
-    # Create index if it doesn't exist
-    index_name = "policy"
-    if index_name not in pc.list_indexes().names():
-        pc.create_index(
-            name=index_name,
-            dimension=384,
-            metric='euclidean',
-            spec=ServerlessSpec(
-                cloud='aws',
-                region='us-east-1'
-            )
-        )
-    
-    index = pc.Index(index_name)
-    
     # Prepare vectors for upload
     to_upsert = []
+    records = []
     for i, policy in enumerate(support_data['policies']):
         # Create metadata
         metadata = create_policy_metadata(policy)
         
         # Create and encode searchable text
-        text = metadata['searchable_text']
-        embedding = model.encode(text).tolist()
+        text = create_searchable_text(policy)
+        embedding = encode(text, use_cache=False)
         
         # Generate a unique ID based on the policy title
         policy_id = f"support_{policy['title'].lower().replace(' ', '_')}"
         
         to_upsert.append((policy_id, embedding, metadata))
+        records.append(dict(policy, searchable_text=text))
+    
+    index_name = "policy"
+    write_records(index_name, [id_ for id_, _, _ in to_upsert], records)
+    if local:
+        write_local_index(index_name, to_upsert)
+        publish_index_update()
+        return
+    
+    # Create index if it doesn't exist
+    pc = get_pinecone()
+    if index_name not in pc.list_indexes().names():
+        pc.create_index(
+            name=index_name,
+            dimension=384,
+            metric='euclidean',
+            spec=serverless_spec()
+        )
+    
+    index = pc.Index(index_name)
     
     # Upload in batches
     batch_size = 10
@@ -67,37 +77,44 @@ def vectorize_support():
         batch = to_upsert[i:i+batch_size]
         try:
             index.upsert(vectors=batch)
-            print(f"Uploaded policy batch {i//batch_size + 1} of {len(to_upsert)//batch_size + 1}")
+            logger.info("Uploaded policy batch %d of %d", i//batch_size + 1, len(to_upsert)//batch_size + 1)
         except Exception as e:
-            print(f"Error uploading batch {i//batch_size + 1}: {str(e)}")
+            logger.error("Error uploading batch %d: %s", i//batch_size + 1, e)
             for j, (id_, vec, meta) in enumerate(batch):
                 try:
                     index.upsert(vectors=[(id_, vec, meta)])
                 except Exception as e2:
-                    print(f"Problem with record {i+j}: {str(e2)}")
-                    print(f"Metadata: {meta}")
+                    logger.error("Problem with record %d: %s (metadata: %s)", i+j, e2, meta)
+    
+    # Cached tool results and loaded indexes may reference the old contents; running API
+    # processes pick the change up from the published generation
+    publish_index_update()
 
-def query_support(query: str, top_k: int = 3) -> Dict:
+@timed("query.policy")
+def query_support(
+    query: str,
+    top_k: int = 3,
+    query_vector: Optional[List[float]] = None,
+    fields: Optional[Sequence[str]] = None
+) -> Dict:
     """
     Query support information
     Returns dictionary with matches containing metadata and scores
     """
-    print(f"\n[Query] Processing support search: '{query}'")
-    
-    # Create vector from query
-    print("[Embedding] Creating vector embedding for support query...")
-    query_vector = model.encode(query).tolist()
+    # Create vector from query unless the caller already embedded it
+    if query_vector is None:
+        query_vector = encode(query)
     
-    index = pc.Index("policy")
+    index = get_index("policy")
     
-    print("[Search Strategy] Performing semantic support search...")
     results = index.query(
         vector=query_vector,
         top_k=top_k,
         include_metadata=True,
+        fields=fields
     )
     
-    print(f"[Results] Found {len(results['matches'])} support matches")
+    logger.debug("Found %d support matches for %r", len(results['matches']), query)
     return results
 
 
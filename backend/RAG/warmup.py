@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from .observability import get_logger, span
+
+logger = get_logger("warmup")
+
+# "background" (default): serve right away and warm up in a worker thread, /ready turns 200 when done
+# "blocking": finish warming up before the server accepts requests
+# "off": load everything lazily on first use, as before
+WARMUP_MODE = os.environ.get("WARMUP", "background").lower()
+
+def _warm_model():
+    from .embedding import encode
+
+    # Loads the model and runs one forward pass, so the first request does not pay for either
+    encode("warm up", use_cache=False)
+
+def _warm_content_filter():
+    from .content_filter import local_content_filter
+    from .embedding import encode
+
+    local_content_filter.classify(encode("my dishwasher is not draining", use_cache=False))
+
+def _warm_indexes():
+    from .index_backend import get_index
+
+    for name in ("parts", "repairs", "policy"):
+        get_index(name)
+
+def _warm_lexical_indexes():
+    from .lexical import get_lexical_index
+    from .vectorize import load_parts_corpus
+    from .vectorize_repairs import load_repairs_corpus
+
+    get_lexical_index("parts", load_parts_corpus)
+    get_lexical_index("repairs", load_repairs_corpus)
+
+def _warm_catalog():
+    from .live_fields import get_live_fields
+    from .part_catalog import get_part_catalog
+
+    get_part_catalog()
+    get_live_fields()
+
+# Run in order; each step only triggers the lazy loader the request path would otherwise hit
+WARMUP_STEPS: List[Tuple[str, Callable[[], None]]] = [
+    ("model", _warm_model),
+    ("content_filter", _warm_content_filter),
+    ("indexes", _warm_indexes),
+    ("lexical", _warm_lexical_indexes),
+    ("catalog", _warm_catalog),
+]
+
+class WarmupState:
+    """Progress of the startup warm-up as reported by /ready"""
+
+    def __init__(self):
+        self.status = "pending"
+        self.steps: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self.seconds: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.status in ("ready", "skipped")
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "status": self.status,
+                "steps_ms": dict(self.steps),
+                "errors": dict(self.errors),
+                "seconds": self.seconds,
+            }
+
+warmup_state = WarmupState()
+
+def run_warmup(state: WarmupState = warmup_state) -> WarmupState:
+    """
+    Run every warm-up step, timing each as a warmup.<step> span. A failing step is logged and
+    recorded but does not stop the others; the state ends as "ready" or "failed".
+    """
+    with state._lock:
+        if state.status != "pending":
+            return state
+        state.status = "warming"
+    start = time.perf_counter()
+    for name, step in WARMUP_STEPS:
+        step_start = time.perf_counter()
+        try:
+            with span(f"warmup.{name}"):
+                step()
+        except Exception as e:
+            logger.exception("Warm-up step %s failed", name)
+            with state._lock:
+                state.errors[name] = f"{type(e).__name__}: {e}"
+        with state._lock:
+            state.steps[name] = round((time.perf_counter() - step_start) * 1000, 1)
+
+    with state._lock:
+        state.seconds = round(time.perf_counter() - start, 3)
+        state.status = "failed" if state.errors else "ready"
+    logger.info("Warm-up %s in %.2fs: %s", state.status, state.seconds, state.steps)
+    return state
+
+def skip_warmup(state: WarmupState = warmup_state):
+    with state._lock:
+        state.status = "skipped"
@@ -0,0 +1,317 @@
+"""
+Offline end-to-end load test of the FastAPI app in main.py
+
+Runs the real app in-process against the fake OpenAI-compatible server from
+benchmarks.fake_llm and the local index backend, both with injected latency, replays a
+mix of realistic queries at a fixed concurrency and reports latency percentiles,
+throughput, RSS and the mean time per pipeline stage. Run from backend/:
+
+    python -m benchmarks.e2e --requests 200 --concurrency 8 --output runs/base.json
+    python -m benchmarks.e2e --requests 200 --concurrency 8 --compare runs/base.json
+
+Queries: part-ID questions sampled from all_parts.csv, symptom questions built from
+repairs.csv and a fixed set of policy questions (mix set by --mix). Embeddings come from a
+hashing encoder unless --real-embeddings is given, and the local index artifacts are built
+with it on the first run (or with --rebuild). With --compare the exit status is 1 when any
+metric regressed by more than --threshold.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+POLICY_QUESTIONS = [
+    "What is your return policy?",
+    "How long does shipping usually take?",
+    "Do parts come with a warranty?",
+    "Can I order by phone?",
+    "What are your customer service hours?",
+    "When will my order be delivered?",
+]
+PART_TEMPLATES = [
+    "How much does {part_id} cost?",
+    "Is {part_id} in stock?",
+    "How do I install part {part_id}?",
+    "Do you have an installation video for {part_id}?",
+]
+REPAIR_TEMPLATES = [
+    "My {appliance} is {symptom}, what should I check?",
+    "{appliance} {symptom} - which parts do I need?",
+]
+
+# Metric -> direction that counts as worse
+COMPARED_METRICS = {
+    "p50_ms": "higher", "p95_ms": "higher", "p99_ms": "higher", "mean_ms": "higher",
+    "throughput_rps": "lower", "error_rate": "higher", "rss_peak_mb": "higher",
+}
+
+def build_queries(count: int, mix: Dict[str, float], seed: int) -> List[Tuple[str, str]]:
+    """(kind, message) pairs drawn from the catalog, repair guides and policy questions"""
+    from RAG.part_catalog import PARTS_CSV
+    from RAG.vectorize_repairs import REPAIRS_CSV
+
+    rng = random.Random(seed)
+    part_ids = pd.read_csv(PARTS_CSV, usecols=["part_id"], dtype=str)["part_id"].dropna().unique().tolist()
+    repairs = pd.read_csv(REPAIRS_CSV, usecols=["Product", "symptom"]).to_dict("records")
+    kinds, weights = zip(*mix.items())
+
+    queries = []
+    for _ in range(count):
+        kind = rng.choices(kinds, weights)[0]
+        if kind == "parts":
+            message = rng.choice(PART_TEMPLATES).format(part_id=rng.choice(part_ids))
+        elif kind == "repairs":
+            repair = rng.choice(repairs)
+            message = rng.choice(REPAIR_TEMPLATES).format(
+                appliance=str(repair["Product"]).lower(), symptom=str(repair["symptom"]).lower()
+            )
+        else:
+            message = rng.choice(POLICY_QUESTIONS)
+        queries.append((kind, message))
+    return queries
+
+def rss_mb() -> float:
+    with open("/proc/self/statm", "r") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def stage_totals() -> Dict[str, Tuple[float, float]]:
+    """stage -> (count, seconds) from the partselect_stage_seconds histogram"""
+    from prometheus_client import REGISTRY
+
+    totals: Dict[str, List[float]] = {}
+    for metric in REGISTRY.collect():
+        if metric.name != "partselect_stage_seconds":
+            continue
+        for sample in metric.samples:
+            if sample.name.endswith("_count") or sample.name.endswith("_sum"):
+                entry = totals.setdefault(sample.labels["stage"], [0.0, 0.0])
+                entry[0 if sample.name.endswith("_count") else 1] = sample.value
+    return {stage: (count, seconds) for stage, (count, seconds) in totals.items()}
+
+def start_fake_llm(port: int, latency_ms: float, jitter_ms: float, token_ms: float, seed: int):
+    """Serve benchmarks.fake_llm on a background thread and wait until it accepts requests"""
+    import uvicorn
+    from benchmarks.fake_llm import LatencyProfile, create_app
+
+    app = create_app(LatencyProfile(latency_ms, jitter_ms, token_ms), seed=seed)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("fake LLM server did not start")
+        time.sleep(0.05)
+    return server, thread
+
+def request_for(endpoint: str, message: str, conversation_id: str) -> Tuple[str, Dict]:
+    if endpoint == "search":
+        return "/search", {"query": message}
+    path = "/chat/stream" if endpoint == "stream" else "/chat"
+    return path, {"message": message, "conversation_id": conversation_id}
+
+def is_error(endpoint: str, status: int, body: str) -> bool:
+    if status != 200:
+        return True
+    if endpoint == "stream":
+        return "event: error" in body
+    if endpoint == "chat":
+        from main import ERROR_MESSAGE
+        return ERROR_MESSAGE in body
+    return False
+
+async def replay(app, endpoint: str, queries: List[Tuple[str, str]], concurrency: int, conversations: int) -> Dict:
+    """Send every query with `concurrency` requests in flight; returns per-request latencies"""
+    import httpx
+
+    latencies: List[float] = []
+    errors: List[str] = []
+    queue: "asyncio.Queue[Tuple[int, str]]" = asyncio.Queue()
+    for i, (_, message) in enumerate(queries):
+        queue.put_nowait((i, message))
+    peak = [rss_mb()]
+
+    async def sample_rss():
+        while True:
+            peak[0] = max(peak[0], rss_mb())
+            await asyncio.sleep(0.1)
+
+    async def worker(client: "httpx.AsyncClient"):
+        while not queue.empty():
+            i, message = queue.get_nowait()
+            path, payload = request_for(endpoint, message, f"bench-{i % conversations}")
+            start = time.perf_counter()
+            try:
+                response = await client.post(path, json=payload)
+                failed = is_error(endpoint, response.status_code, response.text)
+            except Exception:
+                failed = True
+            latencies.append((time.perf_counter() - start) * 1000)
+            if failed:
+                errors.append(message)
+
+    transport = httpx.ASGITransport(app=app)
+    sampler = asyncio.create_task(sample_rss())
+    start = time.perf_counter()
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=120) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    sampler.cancel()
+    return {"latencies": latencies, "errors": errors, "elapsed": elapsed, "rss_peak": peak[0]}
+
+def summarize(result: Dict, stages_before: Dict, stages_after: Dict, config: Dict) -> Dict:
+    latencies = np.asarray(result["latencies"])
+    stages = {}
+    for stage, (count, seconds) in stages_after.items():
+        prev_count, prev_seconds = stages_before.get(stage, (0.0, 0.0))
+        if count > prev_count:
+            stages[stage] = {
+                "count": int(count - prev_count),
+                "mean_ms": round((seconds - prev_seconds) / (count - prev_count) * 1000, 2),
+            }
+    return {
+        "config": config,
+        "requests": int(len(latencies)),
+        "errors": len(result["errors"]),
+        "error_rate": len(result["errors"]) / max(len(latencies), 1),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "mean_ms": float(latencies.mean()),
+        "throughput_rps": len(latencies) / result["elapsed"],
+        "rss_peak_mb": max(result["rss_peak"], rss_mb()),
+        "rss_end_mb": rss_mb(),
+        "max_rss_mb": peak_rss_mb(),
+        "stages": stages,
+    }
+
+def print_report(report: Dict):
+    print(
+        f"{report['requests']} requests, {report['errors']} errors | "
+        f"p50 {report['p50_ms']:.1f} ms  p95 {report['p95_ms']:.1f} ms  p99 {report['p99_ms']:.1f} ms | "
+        f"{report['throughput_rps']:.2f} req/s | RSS peak {report['rss_peak_mb']:.0f} MB"
+    )
+    print(f"{'stage':<28}{'count':>8}{'mean ms':>10}")
+    for stage, stats in sorted(report["stages"].items(), key=lambda item: -item[1]["mean_ms"]):
+        print(f"{stage:<28}{stats['count']:>8}{stats['mean_ms']:>10.2f}")
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> List[str]:
+    """Print metric deltas against a baseline run; returns the metrics that regressed"""
+    regressions = []
+    print(f"{'metric':<16}{'baseline':>12}{'current':>12}{'change':>9}")
+    for metric, worse in COMPARED_METRICS.items():
+        before, after = baseline.get(metric), current.get(metric)
+        if before is None or after is None:
+            continue
+        change = (after - before) / before if before else (0.0 if after == before else float("inf"))
+        regressed = (change > threshold) if worse == "higher" else (change < -threshold)
+        if metric == "error_rate":
+            # Rates near zero make relative change meaningless
+            regressed = after - before > 0.01
+        if regressed:
+            regressions.append(metric)
+        print(f"{metric:<16}{before:>12.2f}{after:>12.2f}{change:>+9.1%}{'  REGRESSED' if regressed else ''}")
+    return regressions
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        kind, _, weight = part.partition("=")
+        mix[kind.strip()] = float(weight)
+    unknown = set(mix) - {"parts", "repairs", "policy"}
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown query kinds: {', '.join(sorted(unknown))}")
+    return mix
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoint", choices=["chat", "stream", "search"], default="chat")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=5, help="requests sent before measuring")
+    parser.add_argument("--conversations", type=int, default=20, help="distinct conversation ids to spread turns over")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("parts=0.5,repairs=0.3,policy=0.2"))
+    parser.add_argument("--llm-latency-ms", type=float, default=400.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=100.0)
+    parser.add_argument("--llm-token-ms", type=float, default=10.0)
+    parser.add_argument("--index-latency-ms", type=float, default=30.0)
+    parser.add_argument("--index-jitter-ms", type=float, default=10.0)
+    parser.add_argument("--llm-port", type=int, default=8765)
+    parser.add_argument("--index-dir", default=os.path.join(tempfile.gettempdir(), "partselect-bench-index"))
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the local index artifacts")
+    parser.add_argument("--real-embeddings", action="store_true", help="use the sentence transformer instead of hashing")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="write the report as JSON")
+    parser.add_argument("--compare", default=None, help="baseline report JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change that counts as a regression")
+    args = parser.parse_args(argv)
+
+    # The RAG modules and main read these at import time
+    os.environ["INDEX_BACKEND"] = "local"
+    os.environ["LOCAL_INDEX_DIR"] = args.index_dir
+    os.environ["DEEPSEEK_BASE_URL"] = f"http://127.0.0.1:{args.llm_port}"
+    os.environ.setdefault("DEEPSEEK_API_KEY", "benchmark")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # Warm up inside the lifespan before the first request, as a deployment behind /ready would
+    os.environ.setdefault("WARMUP", "blocking")
+
+    from benchmarks.stub_index import build_stub_indexes, install_index_latency, use_hashing_encoder
+
+    if not args.real_embeddings:
+        use_hashing_encoder()
+    if args.rebuild or not os.path.exists(os.path.join(args.index_dir, "policy.npy")):
+        os.makedirs(args.index_dir, exist_ok=True)
+        build_stub_indexes(args.index_dir)
+    install_index_latency(args.index_latency_ms, args.index_jitter_ms)
+
+    server, thread = start_fake_llm(args.llm_port, args.llm_latency_ms, args.llm_jitter_ms, args.llm_token_ms, args.seed)
+    import main as backend
+
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "compare")}
+    queries = build_queries(args.warmup + args.requests, args.mix, args.seed)
+
+    async def measure() -> Dict:
+        if args.warmup:
+            await replay(backend.app, args.endpoint, queries[:args.warmup], args.concurrency, args.conversations)
+        stages_before = stage_totals()
+        result = await replay(backend.app, args.endpoint, queries[args.warmup:], args.concurrency, args.conversations)
+        return summarize(result, stages_before, stage_totals(), config)
+
+    async def run() -> Dict:
+        # One event loop for warmup and measurement: the app's HTTP clients bind to the loop they first run on
+        async with backend.app.router.lifespan_context(backend.app):
+            return await measure()
+
+    try:
+        report = asyncio.run(run())
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+
+    print_report(report)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        if regressions:
+            print(f"Regressed: {', '.join(regressions)}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
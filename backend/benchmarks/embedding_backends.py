@@ -0,0 +1,148 @@
+"""
+Torch vs ONNX Runtime int8 query embedding: latency, throughput, memory and agreement
+
+Export the int8 model first (python -m RAG.onnx_embedding), then run from backend/:
+
+    python -m benchmarks.embedding_backends
+    python -m benchmarks.embedding_backends --queries 300 --documents 1000 --output runs/embedding.json
+
+Each backend runs in a fresh interpreter with EMBEDDING_BACKEND set, so load time and RSS
+are not skewed by the other one. Queries come from the retrieval eval set and are encoded one
+at a time without the cache, as the request path does; documents are indexed part texts
+encoded with encode_batch, as ingestion does. Every backend's vectors are compared with the
+first backend's (torch by default); the exit status is 1 when the lowest cosine similarity is
+below --min-cosine.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def worker(texts_path: str, vectors_path: str) -> Dict:
+    """Runs inside the child process: load the configured backend and time it"""
+    from RAG.embedding import EMBEDDING_BACKEND, _rss_mb, encode, encode_batch, get_model
+
+    with open(texts_path, "r", encoding="utf-8") as f:
+        texts = json.load(f)
+    rss_start = _rss_mb()
+    start = time.perf_counter()
+    get_model()
+    load_seconds = time.perf_counter() - start
+    rss_loaded = _rss_mb()
+
+    # First calls pay for lazy allocations and graph setup
+    for query in texts["queries"][:5]:
+        encode(query, use_cache=False)
+
+    latencies, query_vectors = [], []
+    for query in texts["queries"]:
+        start = time.perf_counter()
+        query_vectors.append(encode(query, use_cache=False))
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    document_vectors = np.asarray(encode_batch(texts["documents"]), dtype=np.float32)
+    batch_seconds = time.perf_counter() - start
+
+    np.save(vectors_path, np.vstack([np.asarray(query_vectors, dtype=np.float32), document_vectors]))
+    return {
+        "backend": EMBEDDING_BACKEND,
+        "load_seconds": load_seconds,
+        "query_p50_ms": float(np.percentile(latencies, 50)),
+        "query_p95_ms": float(np.percentile(latencies, 95)),
+        "query_mean_ms": float(np.mean(latencies)),
+        "batch_texts_per_second": len(texts["documents"]) / batch_seconds,
+        "rss_model_mb": rss_loaded - rss_start,
+        "rss_end_mb": _rss_mb(),
+    }
+
+def run_backend(backend: str, texts_path: str, directory: str) -> Dict:
+    vectors_path = os.path.join(directory, f"{backend}.npy")
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.embedding_backends", "--worker", texts_path, vectors_path],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+        env=dict(os.environ, EMBEDDING_BACKEND=backend, LOG_LEVEL="WARNING"),
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"{backend} backend failed:\n{completed.stderr[-2000:]}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["vectors"] = np.load(vectors_path)
+    return result
+
+def build_texts(queries: int, documents: int, seed: int) -> Dict[str, List[str]]:
+    from benchmarks.retrieval_eval import build_eval_set
+    from RAG.onnx_embedding import check_texts
+
+    cases = build_eval_set(part_sample=queries, seed=seed)["cases"]
+    rng = np.random.default_rng(seed)
+    picked = rng.choice(len(cases), size=min(queries, len(cases)), replace=False)
+    return {
+        "queries": [cases[i]["query"] for i in picked],
+        "documents": check_texts(sample=documents, seed=seed),
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", choices=["torch", "onnx"], default=["torch", "onnx"])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--documents", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-cosine", type=float, default=None, help="default ONNX_MIN_COSINE")
+    parser.add_argument("--output", default=None, help="write the report as JSON")
+    parser.add_argument("--worker", nargs=2, metavar=("TEXTS", "VECTORS"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(worker(*args.worker)))
+        return 0
+
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    from RAG.onnx_embedding import ONNX_MIN_COSINE, cosine_agreement
+
+    min_cosine = ONNX_MIN_COSINE if args.min_cosine is None else args.min_cosine
+    texts = build_texts(args.queries, args.documents, args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        texts_path = os.path.join(directory, "texts.json")
+        with open(texts_path, "w", encoding="utf-8") as f:
+            json.dump(texts, f)
+        results = [run_backend(backend, texts_path, directory) for backend in args.backends]
+
+    reference = results[0]["vectors"]
+    split = len(texts["queries"])
+    for result in results:
+        vectors = result.pop("vectors")
+        result["agreement_queries"] = cosine_agreement(reference[:split], vectors[:split])
+        result["agreement_documents"] = cosine_agreement(reference[split:], vectors[split:])
+
+    print(f"{len(texts['queries'])} queries, {len(texts['documents'])} documents; agreement is cosine to {results[0]['backend']}")
+    print(f"{'backend':<8}{'load s':>8}{'p50 ms':>9}{'p95 ms':>9}{'batch/s':>10}{'model MB':>10}{'min cos':>9}{'mean cos':>10}")
+    failed = []
+    for result in results:
+        lowest = min(result["agreement_queries"]["min"], result["agreement_documents"]["min"])
+        mean = result["agreement_queries"]["mean"]
+        if lowest < min_cosine:
+            failed.append(result["backend"])
+        print(
+            f"{result['backend']:<8}{result['load_seconds']:>8.2f}{result['query_p50_ms']:>9.2f}{result['query_p95_ms']:>9.2f}"
+            f"{result['batch_texts_per_second']:>10.1f}{result['rss_model_mb']:>10.0f}{lowest:>9.4f}{mean:>10.4f}"
+        )
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"queries": len(texts["queries"]), "documents": len(texts["documents"]), "min_cosine": min_cosine, "backends": results}, f, indent=2)
+    if failed:
+        print(f"Below min cosine {min_cosine}: {', '.join(failed)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,167 @@
+"""
+OpenAI-compatible stand-in for the DeepSeek API, for offline load tests
+
+Serves POST /chat/completions, plain and streamed, with injected latency. Replies are
+shaped like the real pipeline expects: the content filter gets an ALLOW verdict, the
+validator a passing JSON report, a tool-enabled request a single tool call chosen from the
+user message, and anything else a short answer built from the tool results.
+
+    python -m benchmarks.fake_llm --port 8001 --latency-ms 400 --token-ms 10
+
+then start the backend with DEEPSEEK_BASE_URL=http://127.0.0.1:8001 (benchmarks.e2e does
+both in one process).
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+POLICY_WORDS = re.compile(r"\b(return|refund|ship|shipping|deliver|delivery|warranty|order|phone|hours|contact)\w*", re.IGNORECASE)
+
+PASSING_VALIDATION = json.dumps({
+    "is_satisfactory": True,
+    "analysis": {
+        aspect: {"score": 9, "issues": None, "suggestions": None}
+        for aspect in ("accuracy", "completeness", "relevance", "clarity")
+    },
+    "retry_needed": False,
+    "retry_suggestions": None,
+})
+
+@dataclass
+class LatencyProfile:
+    """Time to the first token is latency_ms +/- jitter_ms; each further streamed chunk adds token_ms"""
+    latency_ms: float = 400.0
+    jitter_ms: float = 100.0
+    token_ms: float = 10.0
+
+    def first_token_seconds(self, rng: random.Random) -> float:
+        return max(self.latency_ms + rng.uniform(-self.jitter_ms, self.jitter_ms), 0.0) / 1000
+
+def choose_tool(message: str) -> str:
+    if re.search(r"\bPS\d+\b", message, re.IGNORECASE):
+        return "parts_info"
+    if POLICY_WORDS.search(message):
+        return "support_info"
+    return "repair_info"
+
+def plan_reply(messages: List[Dict], tools_enabled: bool) -> Dict:
+    """{"content": ..., "tool_calls": [...] or None} for a request, decided by which caller sent it"""
+    system = (messages[0].get("content") or "").lower() if messages and messages[0].get("role") == "system" else ""
+    last = messages[-1] if messages else {}
+    if "content filter" in system:
+        return {"content": "Score: 95\nDecision: ALLOW", "tool_calls": None}
+    if "validator" in system:
+        return {"content": PASSING_VALIDATION, "tool_calls": None}
+    if tools_enabled and last.get("role") == "user":
+        arguments = json.dumps({"query": last.get("content") or ""})
+        return {"content": None, "tool_calls": [{
+            "id": f"call_{uuid.uuid4().hex[:12]}",
+            "type": "function",
+            "function": {"name": choose_tool(last.get("content") or ""), "arguments": arguments},
+        }]}
+
+    results = [m.get("content") or "" for m in messages if m.get("role") == "tool"]
+    found = results[-1].splitlines()[0][:300] if results and results[-1] else "nothing specific"
+    return {
+        "content": f"Here is what I found: {found}. Would you like more details about any of these?",
+        "tool_calls": None,
+    }
+
+def _usage(messages: List[Dict], reply: Dict) -> Dict[str, int]:
+    prompt = sum(len(m.get("content") or "") for m in messages) // 4
+    completion = len(reply["content"] or json.dumps(reply["tool_calls"])) // 4
+    return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+def _completion(completion_id: str, model: str, reply: Dict, usage: Dict) -> Dict:
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", **reply},
+            "finish_reason": "tool_calls" if reply["tool_calls"] else "stop",
+        }],
+        "usage": usage,
+    }
+
+def _chunks(reply: Dict) -> Iterator[Dict]:
+    """Deltas as the API streams them: role first, then content pieces or one tool call"""
+    yield {"role": "assistant", "content": ""}
+    if reply["tool_calls"]:
+        yield {"tool_calls": [dict(tool_call, index=i) for i, tool_call in enumerate(reply["tool_calls"])]}
+        return
+    words = reply["content"].split(" ")
+    for i in range(0, len(words), 4):
+        yield {"content": " ".join(words[i:i + 4]) + (" " if i + 4 < len(words) else "")}
+
+async def _stream(completion_id: str, model: str, reply: Dict, usage: Dict, profile: LatencyProfile, include_usage: bool):
+    def event(delta: Optional[Dict], finish_reason: Optional[str] = None, **extra) -> str:
+        choices = [] if delta is None else [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        payload = {
+            "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+            "model": model, "choices": choices, **extra,
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    for i, delta in enumerate(_chunks(reply)):
+        if i > 1:
+            await asyncio.sleep(profile.token_ms / 1000)
+        yield event(delta)
+    yield event({}, "tool_calls" if reply["tool_calls"] else "stop")
+    if include_usage:
+        yield event(None, usage=usage)
+    yield "data: [DONE]\n\n"
+
+def create_app(profile: Optional[LatencyProfile] = None, seed: int = 0) -> FastAPI:
+    profile = profile or LatencyProfile()
+    rng = random.Random(seed)
+    app = FastAPI()
+    app.state.requests = 0
+
+    @app.post("/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        messages = body.get("messages") or []
+        model = body.get("model", "deepseek-chat")
+        reply = plan_reply(messages, bool(body.get("tools")))
+        usage = _usage(messages, reply)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:16]}"
+
+        await asyncio.sleep(profile.first_token_seconds(rng))
+        if body.get("stream"):
+            include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+            return StreamingResponse(
+                _stream(completion_id, model, reply, usage, profile, include_usage),
+                media_type="text/event-stream",
+            )
+        return JSONResponse(_completion(completion_id, model, reply, usage))
+
+    return app
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=400.0)
+    parser.add_argument("--jitter-ms", type=float, default=100.0)
+    parser.add_argument("--token-ms", type=float, default=10.0)
+    args = parser.parse_args()
+    app = create_app(LatencyProfile(args.latency_ms, args.jitter_ms, args.token_ms))
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
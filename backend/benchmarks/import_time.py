@@ -0,0 +1,133 @@
+"""
+Import-time breakdown of the backend, and optionally the cost of the startup warm-up
+
+Imports a module (main by default) in a fresh interpreter under `python -X importtime`,
+repeats it --runs times and keeps the fastest run per module, then reports the total, the
+direct imports of the module by cumulative time and the heaviest top-level packages by self
+time. Run from backend/:
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --module RAG.search_tool --top 15 --output runs/imports.json
+    python -m benchmarks.import_time --warmup --hashing
+
+With --warmup the RAG.warmup steps are then run in this process and timed one by one
+(--hashing swaps in the hashing encoder from benchmarks.stub_index for the model).
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+def import_profile(module: str) -> Dict:
+    """One fresh-interpreter import: wall time plus self/cumulative microseconds and nesting depth per module"""
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, env=dict(os.environ, LOG_LEVEL="WARNING"),
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+
+    modules: Dict[str, Dict] = {}
+    for line in completed.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules[name] = {"self_us": int(self_us), "cumulative_us": int(cumulative_us), "depth": len(indent) // 2}
+    return {"wall_ms": wall_ms, "modules": modules}
+
+def fastest(profiles: List[Dict]) -> Dict:
+    """Per-module minimum over runs, which filters out disk cache and scheduler noise"""
+    modules: Dict[str, Dict] = {}
+    for profile in profiles:
+        for name, stats in profile["modules"].items():
+            best = modules.setdefault(name, dict(stats))
+            best["self_us"] = min(best["self_us"], stats["self_us"])
+            best["cumulative_us"] = min(best["cumulative_us"], stats["cumulative_us"])
+    return {"wall_ms": min(profile["wall_ms"] for profile in profiles), "modules": modules}
+
+def breakdown(profile: Dict, module: str, top: int) -> Dict:
+    modules = profile["modules"]
+    target = modules.get(module, {"cumulative_us": 0, "depth": 0})
+    # -X importtime lists a module's imports before the module itself, one level deeper
+    direct = {}
+    names = list(modules)
+    end = names.index(module) if module in modules else len(names)
+    for name in names[:end]:
+        if modules[name]["depth"] == target["depth"] + 1:
+            direct[name] = modules[name]["cumulative_us"] / 1000
+
+    packages: Dict[str, float] = {}
+    for name, stats in modules.items():
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0.0) + stats["self_us"] / 1000
+
+    return {
+        "module": module,
+        "wall_ms": round(profile["wall_ms"], 1),
+        "import_ms": round(target["cumulative_us"] / 1000, 1),
+        "modules_imported": len(modules),
+        "direct_imports_ms": dict(sorted(((k, round(v, 1)) for k, v in direct.items()), key=lambda item: -item[1])[:top]),
+        "packages_ms": dict(sorted(((k, round(v, 1)) for k, v in packages.items()), key=lambda item: -item[1])[:top]),
+    }
+
+def time_warmup(hashing: bool) -> Dict:
+    sys.path.insert(0, BACKEND_DIR)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    if hashing:
+        from benchmarks.stub_index import use_hashing_encoder
+        use_hashing_encoder()
+    from RAG.warmup import run_warmup
+
+    state = run_warmup()
+    return state.snapshot()
+
+def print_report(report: Dict):
+    print(
+        f"import {report['module']}: {report['import_ms']:.0f} ms "
+        f"({report['modules_imported']} modules, {report['wall_ms']:.0f} ms wall incl. interpreter start)"
+    )
+    print(f"\n{'direct import':<40}{'cumulative ms':>14}")
+    for name, ms in report["direct_imports_ms"].items():
+        print(f"{name:<40}{ms:>14.1f}")
+    print(f"\n{'package':<40}{'self ms':>14}")
+    for name, ms in report["packages_ms"].items():
+        print(f"{name:<40}{ms:>14.1f}")
+    if "warmup" in report:
+        warmup = report["warmup"]
+        print(f"\nwarm-up {warmup['status']} in {warmup['seconds']:.2f}s")
+        for step, ms in warmup["steps_ms"].items():
+            print(f"{step:<40}{ms:>14.1f}{'  ' + warmup['errors'][step] if step in warmup['errors'] else ''}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--warmup", action="store_true", help="also time each warm-up step")
+    parser.add_argument("--hashing", action="store_true", help="warm up with the hashing encoder instead of the model")
+    parser.add_argument("--output", default=None, help="write the report as JSON")
+    args = parser.parse_args(argv)
+
+    profile = fastest([import_profile(args.module) for _ in range(args.runs)])
+    report = breakdown(profile, args.module, args.top)
+    if args.warmup:
+        report["warmup"] = time_warmup(args.hashing)
+
+    print_report(report)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
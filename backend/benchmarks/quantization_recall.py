@@ -0,0 +1,88 @@
+"""
+Recall@k and latency of quantized local index search against exact float search
+
+Build the parts artifact first (python -m RAG.vectorize --local), then run from backend/:
+    python -m benchmarks.quantization_recall [--queries 200] [--k 3 10] [--rerank 50 100 200]
+    python -m benchmarks.quantization_recall --query-file queries.txt
+
+By default the queries are stored part vectors with a little noise added; with
+--query-file each line is embedded with the production model instead.
+"""
+import argparse
+import json
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from RAG.index_backend import LOCAL_INDEX_DIR, LocalIndexBackend
+
+def load_queries(index: LocalIndexBackend, count: int, noise: float, query_file: str, seed: int) -> np.ndarray:
+    if query_file:
+        from RAG.embedding import encode_batch
+        with open(query_file, 'r', encoding='utf-8') as f:
+            texts = [line.strip() for line in f if line.strip()]
+        return np.asarray(encode_batch(texts), dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(index.ids), size=min(count, len(index.ids)), replace=False)
+    queries = np.asarray(index.vectors[rows], dtype=np.float32)
+    return queries + noise * rng.standard_normal(queries.shape).astype(np.float32)
+
+def run(index: LocalIndexBackend, queries: np.ndarray, k: int) -> Dict:
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        matches = index.query(query, top_k=k, include_metadata=False)['matches']
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([match['id'] for match in matches])
+    return {"ids": results, "p50_ms": float(np.percentile(latencies, 50)), "p95_ms": float(np.percentile(latencies, 95))}
+
+def recall(truth: List[List[str]], found: List[List[str]]) -> float:
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return hits / max(sum(len(t) for t in truth), 1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index", default="parts")
+    parser.add_argument("--directory", default=LOCAL_INDEX_DIR)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.05)
+    parser.add_argument("--query-file", default=None)
+    parser.add_argument("--k", type=int, nargs="+", default=[3, 10])
+    parser.add_argument("--rerank", type=int, nargs="+", default=[20, 50, 100, 200])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="also write the report as JSON")
+    args = parser.parse_args()
+
+    exact = LocalIndexBackend(args.index, directory=args.directory, quantization="none")
+    queries = load_queries(exact, args.queries, args.noise, args.query_file, args.seed)
+    print(f"{args.index}: {len(exact.ids)} vectors, {len(queries)} queries, float32 {exact.memory_bytes() / 1e6:.2f} MB")
+
+    report = []
+    for k in args.k:
+        truth = run(exact, queries, k)
+        report.append({"mode": "none", "k": k, "rerank": None, "recall": 1.0, "memory_mb": exact.memory_bytes() / 1e6,
+                       "p50_ms": truth["p50_ms"], "p95_ms": truth["p95_ms"]})
+        for quantization in ("int8", "binary"):
+            for rerank in args.rerank:
+                index = LocalIndexBackend(args.index, directory=args.directory, quantization=quantization, rerank=rerank)
+                result = run(index, queries, k)
+                report.append({
+                    "mode": quantization, "k": k, "rerank": rerank,
+                    "recall": recall(truth["ids"], result["ids"]),
+                    "memory_mb": index.memory_bytes() / 1e6,
+                    "p50_ms": result["p50_ms"], "p95_ms": result["p95_ms"],
+                })
+
+    print(f"{'mode':<8}{'k':>4}{'rerank':>8}{'recall@k':>10}{'memory MB':>11}{'p50 ms':>9}{'p95 ms':>9}")
+    for row in report:
+        print(
+            f"{row['mode']:<8}{row['k']:>4}{str(row['rerank'] or '-'):>8}{row['recall']:>10.3f}"
+            f"{row['memory_mb']:>11.2f}{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}"
+        )
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+"""
+Retrieval quality and latency regression suite for query_parts, query_repairs and query_support
+
+Builds a labeled evaluation set from the catalog data, runs every query against one or more
+index configurations and reports recall@k, MRR and per-query latency. Run from backend/:
+
+    python -m benchmarks.retrieval_eval --configs exact int8 binary --output runs/eval.json
+    python -m benchmarks.retrieval_eval --configs exact --compare runs/eval.json
+    python -m benchmarks.retrieval_eval --write-set runs/eval_set.json   # freeze the labels
+    python -m benchmarks.retrieval_eval --eval-set runs/eval_set.json --configs "ivf16:approximate=true,nprobe=16"
+
+Labeled cases (sampled with --seed, so a seed always yields the same set):
+- parts: for each sampled part, its part ID, MPN and one cross-reference number, its name,
+  and "<appliance> <symptom> <part type>" for parts that list symptoms. A case counts every
+  part sharing that identifier, name or symptom as relevant.
+- repairs: two phrasings of each appliance/symptom guide in repairs.csv.
+- policy: hand-written questions, each labeled with the policy titles that answer it.
+
+A configuration is a preset name (see PRESETS) or "name:key=value,...", with keys backend
+(local|pinecone), quantization, rerank, approximate, nprobe and lexical_weight. Query
+vectors are embedded once up front, so latencies cover retrieval only. Embeddings come from
+the sentence transformer unless --hashing is given; hashed embeddings only make sense with
+indexes built by them (benchmarks.e2e builds such a set). With --compare the exit status is
+1 when recall@k or MRR dropped by more than --threshold for any config and corpus.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+KS = [1, 3, 5, 10]
+
+POLICY_QUESTIONS = [
+    ("How long is the warranty on a replacement part?", ["One-Year Warranty"]),
+    ("Are your parts covered by a guarantee?", ["One-Year Warranty"]),
+    ("If I order today, will it ship today?", ["Same Day Shipping"]),
+    ("What is the cutoff time for same day shipping?", ["Same Day Shipping"]),
+    ("How can I reach customer service?", ["Contact/Support"]),
+    ("What is your support phone number or email?", ["Contact/Support", "Order by Phone"]),
+    ("Can I cancel my order?", ["Returns and Cancellations"]),
+    ("Can I place an order over the phone?", ["Order by Phone"]),
+    ("Where is my package?", ["Order Inquiry/Package Tracking"]),
+    ("How do I track my order?", ["Order Inquiry/Package Tracking"]),
+    ("What is your return policy?", ["Return Policy", "Returns and Cancellations"]),
+    ("Can I return a part I no longer need?", ["Return Policy", "Returns and Cancellations"]),
+    ("Is it safe to use my credit card on your site?", ["Secure Shopping"]),
+    ("When will my order arrive?", ["Estimated Delivery Date"]),
+    ("How many days does delivery take?", ["Estimated Delivery Date", "Same Day Shipping"]),
+]
+REPAIR_TEMPLATES = [
+    "my {appliance} {symptom}",
+    "{symptom} {appliance}, how do I fix it?",
+]
+PART_TEMPLATES = {
+    "part_id": "Is {value} in stock?",
+    "mpn": "I need part {value}",
+    "cross_reference": "What replaces {value}?",
+}
+
+# Index configuration presets; keys left out keep the LOCAL_INDEX_* / HYBRID_* environment defaults
+PRESETS: Dict[str, Dict] = {
+    "exact": {"quantization": "none", "approximate": False},
+    "int8": {"quantization": "int8"},
+    "binary": {"quantization": "binary"},
+    "ivf": {"approximate": True},
+    "vector-only": {"lexical_weight": 0.0},
+    "lexical-only": {"lexical_weight": 1.0},
+    "pinecone": {"backend": "pinecone"},
+}
+CONFIG_TYPES: Dict[str, Callable[[str], object]] = {
+    "backend": str,
+    "quantization": str,
+    "rerank": int,
+    "approximate": lambda value: value.lower() in ("1", "true", "yes"),
+    "nprobe": int,
+    "lexical_weight": float,
+}
+
+# The label a match is judged by in each corpus
+RELEVANCE_KEYS: Dict[str, Callable[[Dict], str]] = {
+    "parts": lambda metadata: str(metadata.get("part_id", "")).upper(),
+    "repairs": lambda metadata: f"{metadata.get('appliance_type')}/{metadata.get('symptom')}",
+    "policy": lambda metadata: str(metadata.get("title", "")),
+}
+
+def _case(corpus: str, kind: str, query: str, relevant) -> Dict:
+    return {"corpus": corpus, "kind": kind, "query": query, "relevant": sorted(set(relevant))}
+
+def _part_type(row: Dict) -> str:
+    """Part name without its leading brand and appliance words, e.g. "Caloric Dishwasher Faucet Adapter" -> "faucet adapter" """
+    words = row["part_name"].lower().split()
+    skip = set(row["brand"].lower().split()) | set(re.findall(r"\w+", row["appliance_types"].lower()))
+    while words and words[0] in skip:
+        words.pop(0)
+    return " ".join(words)
+
+def build_part_cases(sample: int, rng: random.Random) -> List[Dict]:
+    from RAG.part_catalog import PART_DEFAULTS, get_part_catalog, is_plausible_cross_reference, parse_cross_references
+
+    catalog = get_part_catalog()
+    rows = list(catalog.by_part_id.values())
+    by_name: Dict[str, set] = {}
+    by_mpn: Dict[str, set] = {}
+    by_symptom: Dict[tuple, set] = {}
+    for row in rows:
+        by_name.setdefault(row["part_name"].lower(), set()).add(row["part_id"].upper())
+        if row["mpn_id"] != PART_DEFAULTS["mpn_id"]:
+            by_mpn.setdefault(row["mpn_id"].upper(), set()).add(row["part_id"].upper())
+        for symptom in row["symptoms"].split("|"):
+            by_symptom.setdefault((_part_type(row), symptom.strip().lower()), set()).add(row["part_id"].upper())
+
+    cases = []
+    for row in rng.sample(rows, min(sample, len(rows))):
+        part_id = row["part_id"].upper()
+        cases.append(_case("parts", "part_id", PART_TEMPLATES["part_id"].format(value=part_id), [part_id]))
+        mpn = row["mpn_id"].upper()
+        if mpn in by_mpn:
+            cases.append(_case("parts", "mpn", PART_TEMPLATES["mpn"].format(value=mpn), by_mpn[mpn]))
+        numbers = [n for n in parse_cross_references(row["replace_parts"]) if is_plausible_cross_reference(n)]
+        if numbers:
+            number = rng.choice(numbers)
+            relevant = catalog.by_cross_reference.get(number, [part_id])
+            cases.append(_case("parts", "cross_reference", PART_TEMPLATES["cross_reference"].format(value=number), relevant))
+        cases.append(_case("parts", "name", row["part_name"], by_name[row["part_name"].lower()]))
+        if row["symptoms"] != PART_DEFAULTS["symptoms"]:
+            symptom = rng.choice(row["symptoms"].split("|")).strip().lower()
+            appliance = row["appliance_types"].split(",")[0].strip(" .").lower()
+            query = f"{appliance} {symptom} {_part_type(row)}"
+            cases.append(_case("parts", "symptom", query, by_symptom[(_part_type(row), symptom)]))
+    return cases
+
+def build_repair_cases() -> List[Dict]:
+    from RAG.vectorize_repairs import REPAIRS_CSV
+
+    cases = []
+    for _, row in pd.read_csv(REPAIRS_CSV).iterrows():
+        label = f"{row['Product']}/{row['symptom']}"
+        for template in REPAIR_TEMPLATES:
+            query = template.format(appliance=row["Product"].lower(), symptom=row["symptom"].lower())
+            cases.append(_case("repairs", "symptom", query, [label]))
+    return cases
+
+def build_policy_cases() -> List[Dict]:
+    return [_case("policy", "question", question, titles) for question, titles in POLICY_QUESTIONS]
+
+def build_eval_set(part_sample: int, seed: int) -> Dict:
+    rng = random.Random(seed)
+    cases = build_part_cases(part_sample, rng) + build_repair_cases() + build_policy_cases()
+    return {"seed": seed, "part_sample": part_sample, "cases": cases}
+
+def parse_config(spec: str) -> Dict:
+    """"int8" -> the preset; "name:key=value,..." -> a custom config; "name" can also be a preset with overrides"""
+    name, _, overrides = spec.partition(":")
+    if name not in PRESETS and not overrides:
+        raise argparse.ArgumentTypeError(f"unknown preset {name!r}; presets: {', '.join(PRESETS)}")
+    config = dict(PRESETS.get(name, {}))
+    for item in filter(None, overrides.split(",")):
+        key, _, value = item.partition("=")
+        if key not in CONFIG_TYPES:
+            raise argparse.ArgumentTypeError(f"unknown config key {key!r}; keys: {', '.join(CONFIG_TYPES)}")
+        config[key] = CONFIG_TYPES[key](value)
+    return {"name": name, **config}
+
+def install_config(config: Dict, directory: str, default_lexical_weight: float):
+    """Point get_index() and hybrid search at the backends and weights a config describes"""
+    from RAG import index_backend, lexical
+
+    lexical.HYBRID_LEXICAL_WEIGHT = config.get("lexical_weight", default_lexical_weight)
+
+    with index_backend._indexes_lock:
+        for name in ("parts", "repairs", "policy"):
+            if config.get("backend", "local") == "pinecone":
+                index_backend._indexes[name] = index_backend.PineconeIndexBackend(name)
+            else:
+                index_backend._indexes[name] = index_backend.LocalIndexBackend(
+                    name,
+                    directory=directory,
+                    approximate=config.get("approximate", index_backend.LOCAL_INDEX_APPROXIMATE),
+                    nprobe=config.get("nprobe", index_backend.LOCAL_INDEX_NPROBE),
+                    quantization=config.get("quantization", index_backend.LOCAL_INDEX_QUANTIZATION),
+                    rerank=config.get("rerank", index_backend.LOCAL_INDEX_RERANK),
+                )
+
+def rank_of_first_hit(keys: List[str], relevant: set) -> Optional[int]:
+    for rank, key in enumerate(keys, start=1):
+        if key in relevant:
+            return rank
+    return None
+
+def recall_at(keys: List[str], relevant: set, k: int) -> float:
+    """Share of the relevant labels found in the top k, out of at most k (so one hit in top-1 is 1.0)"""
+    found = set(keys[:k]) & relevant
+    return len(found) / min(len(relevant), k)
+
+def run_config(cases: List[Dict], vectors: np.ndarray, top_k: int) -> List[Dict]:
+    from RAG.retrieval import CORPORA
+
+    # One untimed query per corpus so BM25 and catalog construction are not billed to the first case
+    for corpus in {case["corpus"] for case in cases}:
+        query_fn, _, fields = CORPORA[corpus]
+        query_fn("warm up", top_k=top_k, query_vector=vectors[0].tolist(), fields=fields)
+
+    results = []
+    for case, vector in zip(cases, vectors):
+        query_fn, _, fields = CORPORA[case["corpus"]]
+        start = time.perf_counter()
+        matches = query_fn(case["query"], top_k=top_k, query_vector=vector.tolist(), fields=fields)["matches"]
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        keys = []
+        for match in matches:
+            key = RELEVANCE_KEYS[case["corpus"]](match.get("metadata") or {})
+            if key not in keys:
+                keys.append(key)
+        results.append({
+            "corpus": case["corpus"],
+            "kind": case["kind"],
+            "query": case["query"],
+            "rank": rank_of_first_hit(keys, set(case["relevant"])),
+            "recall": {str(k): recall_at(keys, set(case["relevant"]), k) for k in KS if k <= top_k},
+            "ms": round(elapsed_ms, 3),
+        })
+    return results
+
+def summarize(results: List[Dict]) -> Dict:
+    latencies = [result["ms"] for result in results]
+    summary = {
+        "queries": len(results),
+        "mrr": float(np.mean([1 / result["rank"] if result["rank"] else 0.0 for result in results])),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "mean_ms": float(np.mean(latencies)),
+    }
+    for k in results[0]["recall"]:
+        summary[f"recall@{k}"] = float(np.mean([result["recall"][k] for result in results]))
+    return summary
+
+def report_config(results: List[Dict]) -> Dict:
+    """Summary per corpus, and per query kind within each corpus"""
+    report = {}
+    for corpus in sorted({result["corpus"] for result in results}):
+        in_corpus = [result for result in results if result["corpus"] == corpus]
+        report[corpus] = summarize(in_corpus)
+        report[corpus]["by_kind"] = {
+            kind: summarize([result for result in in_corpus if result["kind"] == kind])
+            for kind in sorted({result["kind"] for result in in_corpus})
+        }
+    return report
+
+def print_report(report: Dict):
+    metrics = [f"recall@{k}" for k in KS if k <= report["top_k"]] + ["mrr", "p50_ms", "p95_ms"]
+    print(f"{'config':<16}{'corpus':<10}{'queries':>8}" + "".join(f"{metric:>11}" for metric in metrics))
+    for name, result in report["configs"].items():
+        for corpus, summary in result["corpora"].items():
+            print(f"{name:<16}{corpus:<10}{summary['queries']:>8}" + "".join(f"{summary[metric]:>11.3f}" for metric in metrics))
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> List[str]:
+    """Print quality deltas against a baseline report; returns the config/corpus/metric triples that dropped"""
+    regressions = []
+    for name, result in current["configs"].items():
+        before_corpora = baseline.get("configs", {}).get(name, {}).get("corpora", {})
+        for corpus, summary in result["corpora"].items():
+            before = before_corpora.get(corpus)
+            if before is None:
+                continue
+            for metric in [key for key in summary if key.startswith("recall@")] + ["mrr"]:
+                if metric not in before:
+                    continue
+                change = summary[metric] - before[metric]
+                regressed = change < -threshold
+                if regressed:
+                    regressions.append(f"{name}/{corpus}/{metric}")
+                print(f"{name + '/' + corpus:<28}{metric:<11}{before[metric]:>8.3f}{summary[metric]:>8.3f}{change:>+8.3f}{'  REGRESSED' if regressed else ''}")
+    return regressions
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--configs", type=parse_config, nargs="+", default=[parse_config("exact")])
+    parser.add_argument("--corpora", nargs="+", choices=["parts", "repairs", "policy"], default=["parts", "repairs", "policy"])
+    parser.add_argument("--top-k", type=int, default=max(KS))
+    parser.add_argument("--parts", type=int, default=100, help="parts sampled into the generated eval set")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--eval-set", default=None, help="load labeled cases from JSON instead of generating them")
+    parser.add_argument("--write-set", default=None, help="write the labeled cases as JSON and exit")
+    parser.add_argument("--index-dir", default=None, help="local index artifacts (default LOCAL_INDEX_DIR)")
+    parser.add_argument("--hashing", action="store_true", help="embed queries with the hashing encoder from benchmarks.stub_index")
+    parser.add_argument("--output", default=None, help="write the report as JSON")
+    parser.add_argument("--compare", default=None, help="baseline report JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.02, help="absolute drop in recall@k or MRR that counts as a regression")
+    args = parser.parse_args(argv)
+
+    # The RAG modules read these at import time
+    if args.index_dir:
+        os.environ["LOCAL_INDEX_DIR"] = args.index_dir
+    os.environ.setdefault("INDEX_BACKEND", "local")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from RAG.embedding import encode_batch
+    from RAG.index_backend import LOCAL_INDEX_DIR
+    from RAG.lexical import HYBRID_LEXICAL_WEIGHT
+
+    if args.hashing:
+        from benchmarks.stub_index import use_hashing_encoder
+        use_hashing_encoder()
+
+    if args.eval_set:
+        with open(args.eval_set, "r", encoding="utf-8") as f:
+            eval_set = json.load(f)
+    else:
+        eval_set = build_eval_set(args.parts, args.seed)
+    if args.write_set:
+        os.makedirs(os.path.dirname(os.path.abspath(args.write_set)), exist_ok=True)
+        with open(args.write_set, "w", encoding="utf-8") as f:
+            json.dump(eval_set, f, indent=2)
+        print(f"Wrote {len(eval_set['cases'])} cases to {args.write_set}")
+        return 0
+
+    cases = [case for case in eval_set["cases"] if case["corpus"] in args.corpora]
+    start = time.perf_counter()
+    vectors = np.asarray(encode_batch([case["query"] for case in cases]), dtype=np.float32)
+    embed_ms = (time.perf_counter() - start) * 1000
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "eval_set": {key: value for key, value in eval_set.items() if key != "cases"},
+        "top_k": args.top_k,
+        "hashing": args.hashing,
+        "embed_ms_per_query": embed_ms / max(len(cases), 1),
+        "configs": {},
+    }
+    for config in args.configs:
+        install_config(config, LOCAL_INDEX_DIR, HYBRID_LEXICAL_WEIGHT)
+        results = run_config(cases, vectors, args.top_k)
+        report["configs"][config["name"]] = {"config": config, "corpora": report_config(results), "queries": results}
+
+    print_report(report)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        if regressions:
+            print(f"Regressed: {', '.join(regressions)}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
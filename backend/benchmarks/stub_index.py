@@ -0,0 +1,85 @@
+"""
+Local stand-ins for the vector side of the pipeline, for offline load tests
+
+- HashingEncoder replaces the sentence transformer with hashed bag-of-words vectors, so
+  indexes build in seconds and queries cost microseconds. Texts that share words still
+  land near each other, so filtering, fusion and formatting see realistic matches.
+- build_stub_indexes writes parts, repairs and policy artifacts for the local backend with
+  the real ingestion code.
+- DelayedIndexBackend adds a configurable wait to every query, standing in for the
+  round trip to a hosted index.
+
+The RAG modules read INDEX_BACKEND and LOCAL_INDEX_DIR at import time, so set them
+before importing this module (benchmarks.e2e does).
+"""
+import hashlib
+import random
+import re
+import time
+from typing import List, Sequence, Union
+
+import numpy as np
+
+from RAG import embedding
+from RAG.index_backend import _indexes, _indexes_lock, LocalIndexBackend
+
+DIMENSION = 384
+
+class HashingEncoder:
+    """Deterministic sentence-transformer substitute exposing the encode() calls the backend makes"""
+
+    def __init__(self, dimension: int = DIMENSION):
+        self.dimension = dimension
+
+    def _vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in re.findall(r"\w+", text.lower()):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimension
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, texts: Union[str, Sequence[str]], **kwargs) -> np.ndarray:
+        if isinstance(texts, str):
+            return self._vector(texts)
+        return np.stack([self._vector(text) for text in texts]) if len(texts) else np.zeros((0, self.dimension), np.float32)
+
+def use_hashing_encoder():
+    """Make get_model() return the hashing encoder instead of loading the transformer"""
+    embedding._model = HashingEncoder()
+
+def build_stub_indexes(directory: str):
+    """Write all three local index artifacts into directory (must be LOCAL_INDEX_DIR)"""
+    from RAG.vectorize import vectorize_parts
+    from RAG.vectorize_repairs import vectorize_repairs
+    from RAG.vectorize_support import vectorize_support
+
+    vectorize_parts(local=True, output_dir=directory)
+    vectorize_repairs(local=True)
+    vectorize_support(local=True)
+
+class DelayedIndexBackend:
+    """Wraps an index backend and sleeps latency_ms +/- jitter_ms before each query"""
+
+    def __init__(self, inner, latency_ms: float, jitter_ms: float = 0.0, seed: int = 0):
+        self.inner = inner
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self._rng = random.Random(seed)
+
+    def query(self, *args, **kwargs):
+        delay_ms = self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay_ms > 0:
+            # Queries run on the search thread pool, so a blocking sleep behaves like a blocking HTTP call
+            time.sleep(delay_ms / 1000)
+        return self.inner.query(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+def install_index_latency(latency_ms: float, jitter_ms: float = 0.0, names: List[str] = ("parts", "repairs", "policy")):
+    """Serve the named local indexes through DelayedIndexBackend from get_index()"""
+    with _indexes_lock:
+        for i, name in enumerate(names):
+            _indexes[name] = DelayedIndexBackend(LocalIndexBackend(name), latency_ms, jitter_ms, seed=i)
@@ -0,0 +1,84 @@
+"""
+Prompt tokens spent on tool results: verbose vs compact format
+
+Runs each tool on a set of queries in both formats and reports the estimated tokens per
+result, plus what a conversation re-sends over several turns. Run from backend/ against
+whatever index backend is configured:
+    python -m benchmarks.tool_result_tokens [--turns 5] [--query-file queries.txt]
+
+Query files hold one "tool<TAB>query" per line. Token counts use the same estimate as the
+tool budgets; the [Tokens] lines logged by the server give the exact per-turn figures.
+"""
+import argparse
+import json
+from typing import Dict, List, Tuple
+
+from RAG.search_tool import parts_info, repair_info, support_info
+from RAG.tool_format import TOOL_TOKEN_BUDGETS, estimate_tokens
+
+TOOLS = {"parts_info": parts_info, "repair_info": repair_info, "support_info": support_info}
+
+DEFAULT_QUERIES: List[Tuple[str, str]] = [
+    ("parts_info", "PS11752778"),
+    ("parts_info", "whirlpool refrigerator door shelf bin"),
+    ("parts_info", "dishwasher water inlet valve under $50"),
+    ("parts_info", "ice maker not working easy install"),
+    ("repair_info", "refrigerator is noisy"),
+    ("repair_info", "dishwasher not draining"),
+    ("repair_info", "fridge leaking water"),
+    ("support_info", "what is the return policy"),
+    ("support_info", "how long does shipping take"),
+]
+
+def load_queries(path: str) -> List[Tuple[str, str]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        rows = [line.rstrip('\n').split('\t', 1) for line in f if line.strip()]
+    return [(tool, query) for tool, query in rows if tool in TOOLS]
+
+def measure(queries: List[Tuple[str, str]]) -> List[Dict]:
+    rows = []
+    for tool, query in queries:
+        row = {"tool": tool, "query": query}
+        for result_format in ("verbose", "compact"):
+            result = TOOLS[tool](query, result_format=result_format)
+            row[f"{result_format}_tokens"] = estimate_tokens(result)
+            row[f"{result_format}_chars"] = len(result)
+        rows.append(row)
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--query-file", default=None)
+    parser.add_argument("--turns", type=int, default=5, help="turns a tool result stays in the history")
+    parser.add_argument("--output", default=None, help="also write the report as JSON")
+    args = parser.parse_args()
+
+    rows = measure(load_queries(args.query_file) if args.query_file else DEFAULT_QUERIES)
+
+    print(f"{'tool':<14}{'verbose':>9}{'compact':>9}{'saved':>8}  query")
+    for row in rows:
+        saved = 1 - row["compact_tokens"] / max(row["verbose_tokens"], 1)
+        print(f"{row['tool']:<14}{row['verbose_tokens']:>9}{row['compact_tokens']:>9}{saved:>8.0%}  {row['query']}")
+
+    summary = {}
+    for tool in TOOLS:
+        tool_rows = [row for row in rows if row["tool"] == tool]
+        if not tool_rows:
+            continue
+        verbose = sum(row["verbose_tokens"] for row in tool_rows) / len(tool_rows)
+        compact = sum(row["compact_tokens"] for row in tool_rows) / len(tool_rows)
+        summary[tool] = {
+            "avg_verbose_tokens": verbose,
+            "avg_compact_tokens": compact,
+            "budget": TOOL_TOKEN_BUDGETS[tool],
+            "reduction": 1 - compact / max(verbose, 1),
+            # A tool message is re-sent with every later request while it stays in the history
+            f"resent_over_{args.turns}_turns_saved": (verbose - compact) * args.turns,
+        }
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"queries": rows, "summary": summary}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+class ConversationStore(ABC):
+    """
+    Conversation histories keyed by conversation_id
+    get() returns a copy that callers may mutate; changes are only kept once passed to save()
+    """
+
+    def __init__(self, idle_ttl: float, max_messages: int):
+        self.idle_ttl = idle_ttl
+        self.max_messages = max_messages
+
+    @abstractmethod
+    def get(self, conversation_id: str) -> List[Dict]:
+        """The stored history, or an empty list for an unknown or expired conversation"""
+
+    @abstractmethod
+    def save(self, conversation_id: str, messages: List[Dict]):
+        """Store the history, capped to max_messages"""
+
+    @abstractmethod
+    def reset(self, conversation_id: str):
+        """Forget a conversation"""
+
+    def cap(self, messages: List[Dict]) -> List[Dict]:
+        """Keep the leading system messages plus the newest messages, never starting on an orphaned tool reply"""
+        if len(messages) <= self.max_messages:
+            return messages
+        start = 0
+        while start < len(messages) and messages[start].get("role") == "system":
+            start += 1
+        head = messages[:start]
+        tail = messages[len(messages) - (self.max_messages - len(head)):]
+        while tail and tail[0].get("role") == "tool":
+            tail = tail[1:]
+        return head + tail
+
+class InMemoryConversationStore(ConversationStore):
+    """Per-process store with a max-sessions LRU, idle expiry and a per-session message cap"""
+
+    def __init__(self, max_sessions: int = 10000, idle_ttl: float = 3600, max_messages: int = 50):
+        super().__init__(idle_ttl, max_messages)
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, conversation_id):
+        with self._lock:
+            entry = self._sessions.get(conversation_id)
+            if entry is None:
+                return []
+            last_access, messages = entry
+            if time.monotonic() - last_access > self.idle_ttl:
+                del self._sessions[conversation_id]
+                return []
+            self._sessions[conversation_id] = (time.monotonic(), messages)
+            self._sessions.move_to_end(conversation_id)
+            return list(messages)
+
+    def save(self, conversation_id, messages):
+        with self._lock:
+            self._sessions[conversation_id] = (time.monotonic(), self.cap(list(messages)))
+            self._sessions.move_to_end(conversation_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def reset(self, conversation_id):
+        with self._lock:
+            self._sessions.pop(conversation_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+class SQLiteConversationStore(ConversationStore):
+    """Persistent store that survives restarts and can be shared by workers on one host"""
+
+    def __init__(self, path: str, idle_ttl: float = 3600, max_messages: int = 50):
+        super().__init__(idle_ttl, max_messages)
+        self._lock = threading.Lock()
+        self._saves = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS conversations ("
+            "id TEXT PRIMARY KEY, messages TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, conversation_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT messages, updated_at FROM conversations WHERE id = ?", (conversation_id,)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.idle_ttl:
+            return []
+        return json.loads(row[0])
+
+    def save(self, conversation_id, messages):
+        payload = json.dumps(self.cap(list(messages)))
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO conversations (id, messages, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET messages = excluded.messages, updated_at = excluded.updated_at",
+                (conversation_id, payload, time.time())
+            )
+            # Purge idle sessions every so often instead of on every write
+            self._saves += 1
+            if self._saves % 100 == 0:
+                self._conn.execute(
+                    "DELETE FROM conversations WHERE updated_at < ?", (time.time() - self.idle_ttl,)
+                )
+            self._conn.commit()
+
+    def reset(self, conversation_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+
+def create_conversation_store(backend: Optional[str] = None) -> ConversationStore:
+    """Build the store selected by CONVERSATION_STORE ("memory" or "sqlite")"""
+    backend = (backend or os.environ.get("CONVERSATION_STORE", "memory")).lower()
+    idle_ttl = float(os.environ.get("CONVERSATION_IDLE_TTL", "3600"))
+    max_messages = int(os.environ.get("CONVERSATION_MAX_MESSAGES", "50"))
+
+    if backend == "sqlite":
+        path = os.environ.get("CONVERSATION_DB_PATH", "conversations.db")
+        return SQLiteConversationStore(path, idle_ttl=idle_ttl, max_messages=max_messages)
+    if backend == "memory":
+        max_sessions = int(os.environ.get("CONVERSATION_MAX_SESSIONS", "10000"))
+        return InMemoryConversationStore(max_sessions=max_sessions, idle_ttl=idle_ttl, max_messages=max_messages)
+    raise ValueError(f"Unknown CONVERSATION_STORE: {backend}")
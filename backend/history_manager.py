@@ -0,0 +1,148 @@
+import json
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+from RAG.facets import extract_appliance_types, normalize_symptoms
+from RAG.tool_format import estimate_tokens, truncate_to_tokens
+from RAG.vectorize import IdentifierExtractor
+
+# Marks a tool result that has already been compacted, so later turns skip it
+SUMMARY_PREFIX = "[Earlier result, summarized] "
+# System message right after the system prompt holding facts carried across turns as JSON
+FACTS_PREFIX = "Conversation facts from earlier turns (most recent values): "
+# Lines of verbose tool output worth keeping in a summary
+_VERBOSE_KEY_LINE = re.compile(r"^(Part|ID|Price|Problem|Appliance|Policy):")
+
+def message_tokens(message: Dict) -> int:
+    """Estimated tokens of one message including its tool calls and a little per-message overhead"""
+    tokens = 4 + estimate_tokens(message.get("content") or "")
+    for tool_call in message.get("tool_calls") or []:
+        tokens += estimate_tokens(tool_call["function"]["name"] + tool_call["function"]["arguments"])
+    return tokens
+
+def split_turns(messages: List[Dict]) -> Tuple[List[Dict], List[List[Dict]]]:
+    """
+    Split a history into its leading system messages and turns, each turn starting at a user
+    message. An assistant tool call and its tool replies always land in the same turn.
+    """
+    start = 0
+    while start < len(messages) and messages[start].get("role") == "system":
+        start += 1
+    turns: List[List[Dict]] = []
+    for message in messages[start:]:
+        if message.get("role") == "user" or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return messages[:start], turns
+
+def summarize_tool_output(content: str, max_tokens: int) -> str:
+    """
+    Shrink a tool result to its identifying facts: the first fields of each compact line
+    (ID, name, price / symptom, parts) or the key lines of a verbose block
+    """
+    lines = [" | ".join(line.split(" | ")[:3]) for line in content.splitlines() if " | " in line]
+    if not lines:
+        lines = [line.strip() for line in content.splitlines() if _VERBOSE_KEY_LINE.match(line.strip())] or [content]
+    return SUMMARY_PREFIX + truncate_to_tokens("; ".join(lines), max_tokens)
+
+class HistoryManager:
+    """
+    Keeps a conversation within a token budget instead of a fixed message count
+    - Facts (last part, brand, appliance, symptom) are extracted from each new turn into a
+      facts message, so they outlive the turns they came from
+    - Tool results older than the newest raw_tool_turns turns are replaced by short summaries
+    - Whole turns are then dropped oldest first until the history fits the budget
+    Each step only looks at the newest turn or at results not yet summarized, so the work per
+    turn does not grow with the conversation.
+    """
+
+    def __init__(self, token_budget: int = 4000, raw_tool_turns: int = 1, summary_tokens: int = 60):
+        self.token_budget = token_budget
+        self.raw_tool_turns = raw_tool_turns
+        self.summary_tokens = summary_tokens
+
+    def fit(self, messages: List[Dict]) -> List[Dict]:
+        """Return the history to store after a turn: facts updated, old tool results compacted, budget applied"""
+        head, turns = split_turns(messages)
+        if not turns:
+            return messages
+
+        system = [message for message in head if not (message.get("content") or "").startswith(FACTS_PREFIX)]
+        facts = self.update_facts(self.read_facts(head), turns[-1])
+        facts_message = [{"role": "system", "content": FACTS_PREFIX + json.dumps(facts)}] if facts else []
+
+        raw_from = max(len(turns) - self.raw_tool_turns, 0)
+        turns = [self.compact(turn) if i < raw_from else turn for i, turn in enumerate(turns)]
+
+        fixed = sum(message_tokens(message) for message in system + facts_message)
+        sizes = [sum(message_tokens(message) for message in turn) for turn in turns]
+        # The newest turn is always kept, even when it alone exceeds the budget
+        while len(turns) > 1 and fixed + sum(sizes) > self.token_budget:
+            turns.pop(0)
+            sizes.pop(0)
+
+        return system + facts_message + [message for turn in turns for message in turn]
+
+    def compact(self, turn: List[Dict]) -> List[Dict]:
+        """Replace tool results in a turn with summaries; results summarized before are left as they are"""
+        compacted = []
+        for message in turn:
+            content = message.get("content") or ""
+            if message.get("role") == "tool" and not content.startswith(SUMMARY_PREFIX):
+                message = dict(message, content=summarize_tool_output(content, self.summary_tokens))
+            compacted.append(message)
+        return compacted
+
+    @staticmethod
+    def read_facts(head: List[Dict]) -> Dict[str, str]:
+        for message in head:
+            content = message.get("content") or ""
+            if content.startswith(FACTS_PREFIX):
+                try:
+                    return json.loads(content[len(FACTS_PREFIX):])
+                except json.JSONDecodeError:
+                    return {}
+        return {}
+
+    @staticmethod
+    def update_facts(facts: Dict[str, str], turn: List[Dict]) -> Dict[str, str]:
+        """Merge what the newest turn established into the carried facts"""
+        facts = dict(facts)
+        user_text = " ".join(m.get("content") or "" for m in turn if m.get("role") == "user")
+        tool_text = "\n".join(m.get("content") or "" for m in turn if m.get("role") == "tool")
+        final = (turn[-1].get("content") or "") if turn[-1].get("role") == "assistant" else ""
+
+        # The part the user named, else the one the answer talked about, else the top result
+        for text in (user_text, final, tool_text):
+            part_id = IdentifierExtractor.extract_part_id(text)
+            if part_id:
+                previous = facts.get("last_part") or ""
+                facts["last_part"] = _describe_part(part_id, tool_text) or (previous if previous.startswith(part_id) else part_id)
+                break
+
+        brand = IdentifierExtractor.extract_brand(user_text)
+        if brand:
+            facts["brand"] = brand
+        appliance_types = extract_appliance_types(user_text)
+        if appliance_types:
+            facts["appliance"] = ", ".join(appliance_types)
+        symptoms = normalize_symptoms(user_text)
+        if symptoms:
+            facts["symptom"] = ", ".join(symptoms).replace("_", " ")
+        return facts
+
+def _describe_part(part_id: str, tool_text: str) -> Optional[str]:
+    """The compact result line for a part, cut to ID, name and price, if the turn returned one"""
+    for line in tool_text.splitlines():
+        if line.startswith(part_id) and " | " in line:
+            fields = line.split(" | ")
+            return " | ".join([fields[0]] + [field for field in fields[1:] if field.startswith("$")])
+    return None
+
+def create_history_manager() -> HistoryManager:
+    """Build the manager from HISTORY_TOKEN_BUDGET, HISTORY_RAW_TOOL_TURNS and HISTORY_SUMMARY_TOKENS"""
+    return HistoryManager(
+        token_budget=int(os.environ.get("HISTORY_TOKEN_BUDGET", "4000")),
+        raw_tool_turns=int(os.environ.get("HISTORY_RAW_TOOL_TURNS", "1")),
+        summary_tokens=int(os.environ.get("HISTORY_SUMMARY_TOKENS", "60")),
+    )
@@ -1,20 +1,47 @@
-from fastapi import FastAPI, Request
+from dotenv import load_dotenv
+
+# Load environment variables once, before the imports below: several modules read their settings at import time
+load_dotenv()
+
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from models import Message, ChatRequest
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from models import Message, ChatRequest, ResetRequest, SearchRequest
+from conversation_store import create_conversation_store
+from history_manager import create_history_manager
 from openai import AsyncOpenAI
 import os
-from dotenv import load_dotenv
 import httpx
-from collections import defaultdict
-from RAG.search_tool import parts_info, repair_info, support_info
-from RAG.response_validator import validate_response
+from RAG.search_tool import ASYNC_TOOLS
+from RAG.retrieval import retrieve
+from RAG.embedding import encode_async
+from RAG.content_filter import local_content_filter
+from RAG.response_validator import validate_with_policy
+from RAG.observability import get_logger, metrics_payload, record_llm_usage, span, timed, trace
+from RAG.warmup import WARMUP_MODE, run_warmup, skip_warmup, warmup_state
 import json
 import asyncio
+import re
+from contextlib import asynccontextmanager
+from typing import Optional
 
-# Load environment variables
-load_dotenv()
+logger = get_logger("chat")
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load and warm the model, indexes and lookup tables per WARMUP (background, blocking or off)"""
+    warmup_task = None
+    if WARMUP_MODE == "blocking":
+        await asyncio.to_thread(run_warmup)
+    elif WARMUP_MODE == "background":
+        warmup_task = asyncio.create_task(asyncio.to_thread(run_warmup))
+    else:
+        skip_warmup()
+    yield
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -28,22 +55,24 @@ app.add_middleware(
     max_age=600,
 )
 
-# Initialize clients
+# Initialize clients; DEEPSEEK_BASE_URL can point at any OpenAI-compatible server (e.g. benchmarks.fake_llm)
+DEEPSEEK_BASE_URL = os.environ.get("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
 async_client = httpx.AsyncClient()
 client = AsyncOpenAI(
     api_key=os.environ.get("DEEPSEEK_API_KEY"),
-    base_url="https://api.deepseek.com",
+    base_url=DEEPSEEK_BASE_URL,
     http_client=async_client
 )
 
 content_filter = AsyncOpenAI(
     api_key=os.environ.get("DEEPSEEK_API_KEY"),
-    base_url="https://api.deepseek.com",
+    base_url=DEEPSEEK_BASE_URL,
     http_client=async_client
 )
 
-# Message history
-message_history = defaultdict(list)
+# Message history - bounded per-session store (in memory or SQLite, see conversation_store.py)
+conversation_store = create_conversation_store()
+history_manager = create_history_manager()
 
 SYSTEM_PROMPT = {
     "role": "system",
@@ -99,9 +128,33 @@ SYSTEM_PROMPT = {
     IMPORTANT: Maintain context from previous messages. If a user refers to a previously mentioned part, use that context in your response."""
 }
 
+@timed("content_filter")
 async def check_content(query: str) -> bool:
     """
     Check if the content is appropriate and on-topic.
+    Clear cases are decided locally from the query embedding; only borderline
+    scores fall through to the LLM filter.
+    Returns True if content is safe and relevant, False otherwise.
+    """
+    try:
+        vector = await encode_async(query)
+        if local_content_filter.loaded:
+            decision, local_score = local_content_filter.classify(vector)
+        else:
+            # The first call embeds the labeled examples (and may load the model), so keep it off the event loop
+            decision, local_score = await asyncio.to_thread(local_content_filter.classify, vector)
+        logger.debug("Local content filter score: %.3f, decision: %s", local_score, decision.upper())
+        if decision != "borderline":
+            return decision == "allow"
+    except Exception as e:
+        logger.warning("Local content filter error, using LLM filter: %s", e)
+    
+    return await llm_check_content(query)
+
+@timed("content_filter.llm")
+async def llm_check_content(query: str) -> bool:
+    """
+    LLM content filter used for borderline queries.
     Returns True if content is safe and relevant, False otherwise.
     """
     filter_prompt = {
@@ -129,19 +182,17 @@ async def check_content(query: str) -> bool:
         
         result = response.choices[0].message.content.lower()
         # Look for score and decision in the response
-        is_allowed = "allow" in result
-        score = 0
-        try:
-            # Try to extract score from response
-            score = int(''.join(filter(str.isdigit, result.split()[0])))
-        except:
-            score = 0 if not is_allowed else 80
+        is_allowed = "reject" not in result and "allow" in result
+        score_match = re.search(r'score\D{0,20}?(\d{1,3})', result) or re.search(r'\b(\d{1,3})\b', result)
+        score = int(score_match.group(1)) if score_match else None
+        if score is None or score > 100:
+            score = 80 if is_allowed else 0
             
-        print(f"[Content Filter] Score: {score}, Decision: {'ALLOW' if is_allowed else 'REJECT'}")
+        logger.debug("LLM content filter score: %d, decision: %s", score, "ALLOW" if is_allowed else "REJECT")
         return score >= 70 and is_allowed
         
     except Exception as e:
-        print(f"[Content Filter] Error: {str(e)}")
+        logger.warning("LLM content filter error: %s", e)
         return True  # Default to allowing if filter fails
 
 
@@ -209,10 +260,103 @@ tools = [
         }
     }
 ]
+
+async def create_completion(stage: str, **kwargs):
+    """
+    Non-streaming completion timed as the completion.<stage> span, with its token usage
+    counted per stage ("tools", "answer", "retry")
+    """
+    with span(f"completion.{stage}"):
+        response = await client.chat.completions.create(model="deepseek-chat", **kwargs)
+    record_llm_usage(stage, response.usage)
+    return response
+
+REJECTION_MESSAGE = "I apologize, but I can only assist with appliance parts and repair-related questions. Please rephrase your query to focus on these topics."
+ERROR_MESSAGE = "I apologize, but I encountered an error processing your request. Please try again."
+
+async def run_tool_call(tool_call: dict) -> dict:
+    """Execute a single tool call and return its raw response for history and validation"""
+    name = tool_call["function"]["name"]
+    args = json.loads(tool_call["function"]["arguments"])
+    tool = ASYNC_TOOLS.get(name)
+    
+    if tool:
+        with span(f"tool.{name}"):
+            search_result = await tool(args["query"])
+    else:
+        search_result = f"Error: Unknown tool {name}"
+    
+    return {
+        "tool": name,
+        "query": args["query"],
+        "result": search_result
+    }
+
+def get_conversation_id(request) -> str:
+    return getattr(request, 'conversation_id', None) or "default"
+
+def start_turn(conversation_id: str, user_message: str) -> list:
+    """
+    Return the conversation history with the new user message appended (not saved until finish_turn)
+    Blocking (the store may read from disk), so handlers run it with asyncio.to_thread
+    """
+    temp_history = conversation_store.get(conversation_id) or [SYSTEM_PROMPT]
+    temp_history.append({
+        "role": "user",
+        "content": user_message
+    })
+    return temp_history
+
+def record_tool_results(history: list, content: str, tool_calls: list, raw_responses: list):
+    """Append each tool call and its result to the conversation history"""
+    for tool_call, raw_response in zip(tool_calls, raw_responses):
+        # Add the tool call to history
+        history.append({
+            "role": "assistant",
+            "content": content,
+            "tool_calls": [{
+                "id": tool_call["id"],
+                "type": "function",
+                "function": {
+                    "name": tool_call["function"]["name"],
+                    "arguments": tool_call["function"]["arguments"]
+                }
+            }]
+        })
+        
+        # Add the tool response to history
+        history.append({
+            "role": "tool",
+            "tool_call_id": tool_call["id"],
+            "content": raw_response["result"]
+        })
+
+def add_retry_feedback(history: list, retry_suggestions: list):
+    """Add validation feedback to the conversation before regenerating a response"""
+    history.append({
+        "role": "system",
+        "content": f"Please improve the response. Issues found: {json.dumps(retry_suggestions)}"
+    })
+
+def finish_turn(conversation_id: str, history: list, content: str):
+    """
+    Store the assistant's final response, trim the history and save it
+    Blocking (fit can load the part catalog), so handlers run it with asyncio.to_thread
+    """
+    history.append({
+        "role": "assistant",
+        "content": content
+    })
+    
+    # Budget the history by tokens: carry facts forward, summarize old tool results, drop whole old turns
+    history = history_manager.fit(history)
+    
+    conversation_store.save(conversation_id, history)
+
 @app.post("/reset")
-async def reset_chat() -> Message:
-    """Reset the chat by clearing message history."""
-    message_history.clear()
+async def reset_chat(request: Optional[ResetRequest] = None) -> Message:
+    """Reset the chat by clearing the caller's message history."""
+    await asyncio.to_thread(conversation_store.reset, get_conversation_id(request))
     return Message(
         role="assistant",
         content="""Welcome to PartSelect's AI Assistant! I specialize in refrigerator and dishwasher parts and am happy to help you with any questions you have on those topics!
@@ -236,110 +380,61 @@ All answers come straight from official PartSelect resources, meaning that my re
 How can I help you find the right parts or solve your appliance issues today?"""
     )
 
+@app.post("/search")
+async def search(request: SearchRequest) -> dict:
+    """Retrieval only, no LLM: encode once, search the requested corpora in parallel, report timings"""
+    try:
+        return await retrieve(request.query, request.corpora, request.top_k, request.include_records)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/metrics")
+async def metrics() -> Response:
+    """Prometheus metrics: stage latency histograms, LLM tokens, cache, filter and validation counters"""
+    payload, content_type = metrics_payload()
+    return Response(content=payload, media_type=content_type)
+
+@app.get("/ready")
+async def ready() -> JSONResponse:
+    """Readiness probe: 200 once warm-up has finished (or is off), 503 while it runs or if a step failed"""
+    return JSONResponse(warmup_state.snapshot(), status_code=200 if warmup_state.ready else 503)
+
 @app.post("/chat")
 async def chat(request: ChatRequest) -> Message:
+    with trace("chat"):
+        return await run_chat_turn(request)
+
+async def run_chat_turn(request: ChatRequest) -> Message:
     # Get existing conversation/start new one with system prompt
-    conversation_id = request.conversation_id if hasattr(request, 'conversation_id') else "default"
-    
-    if not message_history[conversation_id]:
-        message_history[conversation_id] = [SYSTEM_PROMPT]
-    
-    temp_history = message_history[conversation_id].copy()
-    temp_history.append({
-        "role": "user",
-        "content": request.message
-    })
+    conversation_id = get_conversation_id(request)
+    temp_history = await asyncio.to_thread(start_turn, conversation_id, request.message)
     
     # Run content check and main processing concurrently
     try:
         is_safe, response = await asyncio.gather(
             check_content(request.message),
-            client.chat.completions.create(
-                model="deepseek-chat",
-                messages=temp_history,
-                tools=tools
-            )
+            create_completion("tools", messages=temp_history, tools=tools)
         )
         
         if not is_safe:
-            return Message(
-                role="assistant",
-                content="I apologize, but I can only assist with appliance parts and repair-related questions. Please rephrase your query to focus on these topics."
-            )
+            return Message(role="assistant", content=REJECTION_MESSAGE)
         
         # If content is safe, update the real message history
-        message_history[conversation_id] = temp_history
+        history = temp_history
         assistant_message = response.choices[0].message
         
-        # Store search results for validation
-        all_search_results = []
-        raw_responses = []
-        
-        # Handle tool calls
+        # Handle tool calls - all calls in a turn run concurrently
         if assistant_message.tool_calls:
-            for tool_call in assistant_message.tool_calls:
-                args = json.loads(tool_call.function.arguments)
-                
-                # Execute the appropriate tool and store raw response
-                if tool_call.function.name == "parts_info":
-                    search_result = parts_info(args["query"])
-                    raw_responses.append({
-                        "tool": "parts_info",
-                        "query": args["query"],
-                        "result": search_result
-                    })
-                elif tool_call.function.name == "repair_info":
-                    search_result = repair_info(args["query"])
-                    raw_responses.append({
-                        "tool": "repair_info",
-                        "query": args["query"],
-                        "result": search_result
-                    })
-                elif tool_call.function.name == "support_info":
-                    search_result = support_info(args["query"])
-                    raw_responses.append({
-                        "tool": "support_info",
-                        "query": args["query"],
-                        "result": search_result
-                    })
-                else:
-                    search_result = f"Error: Unknown tool {tool_call.function.name}"
-                    raw_responses.append({
-                        "tool": tool_call.function.name,
-                        "query": args["query"],
-                        "result": search_result
-                    })
-                
-                # Add the tool call to history
-                message_history[conversation_id].append({
-                    "role": "assistant",
-                    "content": assistant_message.content,
-                    "tool_calls": [{
-                        "id": tool_call.id,
-                        "type": "function",
-                        "function": {
-                            "name": tool_call.function.name,
-                            "arguments": tool_call.function.arguments
-                        }
-                    }]
-                })
-                
-                # Add the tool response to history
-                message_history[conversation_id].append({
-                    "role": "tool",
-                    "tool_call_id": tool_call.id,
-                    "content": search_result
-                })
+            tool_calls = [tool_call.model_dump() for tool_call in assistant_message.tool_calls]
+            raw_responses = await asyncio.gather(*(run_tool_call(tool_call) for tool_call in tool_calls))
+            record_tool_results(history, assistant_message.content, tool_calls, raw_responses)
             
             # Get final response after processing all tool calls
-            response = await client.chat.completions.create(
-                model="deepseek-chat",
-                messages=message_history[conversation_id]
-            )
+            response = await create_completion("answer", messages=history)
             assistant_message = response.choices[0].message
             
             # Validate response
-            is_satisfactory, analysis, retry_suggestions = await validate_response(
+            is_satisfactory, analysis, retry_suggestions = await validate_with_policy(
                 query=request.message,
                 response=assistant_message.content,
                 search_results=raw_responses
@@ -347,36 +442,152 @@ async def chat(request: ChatRequest) -> Message:
             
             # If response needs improvement, retry
             if not is_satisfactory and retry_suggestions:
-                # Add validation feedback to conversation
-                message_history[conversation_id].append({
-                    "role": "system",
-                    "content": f"Please improve the response. Issues found: {json.dumps(retry_suggestions)}"
-                })
-                
-                # Retry the response
-                retry_response = await client.chat.completions.create(
-                    model="deepseek-chat",
-                    messages=message_history[conversation_id]
-                )
+                add_retry_feedback(history, retry_suggestions)
+                retry_response = await create_completion("retry", messages=history)
                 assistant_message = retry_response.choices[0].message
         
         # Add assistant's response to history
-        message_history[conversation_id].append({
-            "role": "assistant",
-            "content": assistant_message.content
-        })
-        
-        # Keep only last N messages to prevent context window from growing too large
-        if len(message_history[conversation_id]) > 12:  # Adjust this number as needed
-            message_history[conversation_id] = [SYSTEM_PROMPT] + message_history[conversation_id][-11:]
+        await asyncio.to_thread(finish_turn, conversation_id, history, assistant_message.content)
         
         return Message(
             role="assistant",
             content=assistant_message.content
         )
     except Exception as e:
-        print(f"[Error] Chat processing failed: {str(e)}")
-        return Message(
-            role="assistant",
-            content="I apologize, but I encountered an error processing your request. Please try again."
-        ) 
\ No newline at end of file
+        logger.exception("Chat processing failed: %s", e)
+        return Message(role="assistant", content=ERROR_MESSAGE)
+
+async def traced_events(events, name: str):
+    """Run an event stream inside a trace so its spans are logged as one line when it ends"""
+    with trace(name):
+        async for event in events:
+            yield event
+
+def sse_event(event: str, data: dict) -> str:
+    """Format a single Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def stream_completion(messages: list, use_tools: bool = False, stage: str = "answer"):
+    """
+    Stream a completion, yielding ("token", text) for content deltas and finally
+    ("tool_calls", [...]) with the assembled tool calls, if any
+    """
+    with span(f"completion.{stage}"):
+        kwargs = {"tools": tools} if use_tools else {}
+        stream = await client.chat.completions.create(
+            model="deepseek-chat",
+            messages=messages,
+            stream=True,
+            # Sent as a raw body field: the pinned openai client predates the stream_options argument
+            extra_body={"stream_options": {"include_usage": True}},
+            **kwargs
+        )
+    
+        tool_calls = {}
+        async for chunk in stream:
+            # With include_usage the last chunk carries the token counts and no choices
+            record_llm_usage(stage, getattr(chunk, "usage", None))
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                yield "token", delta.content
+            for tool_call_delta in delta.tool_calls or []:
+                # Tool call ids, names and arguments arrive in fragments keyed by index
+                tool_call = tool_calls.setdefault(tool_call_delta.index, {
+                    "id": "",
+                    "type": "function",
+                    "function": {"name": "", "arguments": ""}
+                })
+                if tool_call_delta.id:
+                    tool_call["id"] = tool_call_delta.id
+                if tool_call_delta.function:
+                    tool_call["function"]["name"] += tool_call_delta.function.name or ""
+                    tool_call["function"]["arguments"] += tool_call_delta.function.arguments or ""
+    
+        if tool_calls:
+            yield "tool_calls", [tool_calls[index] for index in sorted(tool_calls)]
+
+async def chat_events(request: ChatRequest):
+    """Run one chat turn and yield SSE events: status updates, tokens, and a final done event"""
+    conversation_id = get_conversation_id(request)
+    temp_history = await asyncio.to_thread(start_turn, conversation_id, request.message)
+    safety_check = asyncio.create_task(check_content(request.message))
+    
+    try:
+        # Tokens are held back until the content check passes
+        pending_tokens = []
+        content = ""
+        tool_calls = []
+        async for kind, value in stream_completion(temp_history, use_tools=True, stage="tools"):
+            if kind == "tool_calls":
+                tool_calls = value
+                continue
+            content += value
+            if not safety_check.done():
+                pending_tokens.append(value)
+                continue
+            if not safety_check.result():
+                break
+            for token in pending_tokens:
+                yield sse_event("token", {"content": token})
+            pending_tokens = []
+            yield sse_event("token", {"content": value})
+        
+        if not await safety_check:
+            yield sse_event("done", {"content": REJECTION_MESSAGE, "rejected": True})
+            return
+        for token in pending_tokens:
+            yield sse_event("token", {"content": token})
+        
+        # If content is safe, update the real message history
+        history = temp_history
+        
+        if tool_calls:
+            for tool_call in tool_calls:
+                yield sse_event("status", {"stage": "tool", "tool": tool_call["function"]["name"]})
+            raw_responses = await asyncio.gather(*(run_tool_call(tool_call) for tool_call in tool_calls))
+            record_tool_results(history, content or None, tool_calls, raw_responses)
+            
+            # Stream the final response after processing all tool calls
+            if content:
+                yield sse_event("reset", {"stage": "answer"})
+            yield sse_event("status", {"stage": "answer"})
+            content = ""
+            async for kind, value in stream_completion(history):
+                content += value
+                yield sse_event("token", {"content": value})
+            
+            # Validate response
+            is_satisfactory, analysis, retry_suggestions = await validate_with_policy(
+                query=request.message,
+                response=content,
+                search_results=raw_responses
+            )
+            
+            # If response needs improvement, replace the streamed answer with a retry
+            if not is_satisfactory and retry_suggestions:
+                add_retry_feedback(history, retry_suggestions)
+                yield sse_event("reset", {"stage": "retry"})
+                content = ""
+                async for kind, value in stream_completion(history, stage="retry"):
+                    content += value
+                    yield sse_event("token", {"content": value})
+        
+        await asyncio.to_thread(finish_turn, conversation_id, history, content)
+        yield sse_event("done", {"content": content})
+    except Exception as e:
+        logger.exception("Streaming chat processing failed: %s", e)
+        yield sse_event("error", {"content": ERROR_MESSAGE})
+    finally:
+        if not safety_check.done():
+            safety_check.cancel()
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest) -> StreamingResponse:
+    """Stream a chat turn as Server-Sent Events (status, token, reset, done, error)"""
+    return StreamingResponse(
+        traced_events(chat_events(request), "chat_stream"),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 
 class Message(BaseModel):
@@ -8,4 +8,16 @@ class Message(BaseModel):
 class ChatRequest(BaseModel):
     message: str
     tools: Optional[List[str]] = None
-    conversation_id: Optional[str] = "default" 
\ No newline at end of file
+    conversation_id: Optional[str] = "default"
+
+class ResetRequest(BaseModel):
+    conversation_id: Optional[str] = "default"
+
+# Largest top_k /search accepts; anything above is a full scan in disguise
+MAX_SEARCH_TOP_K = 50
+
+class SearchRequest(BaseModel):
+    query: str
+    corpora: Optional[List[str]] = None
+    top_k: Optional[int] = Field(None, ge=1, le=MAX_SEARCH_TOP_K)
+    include_records: bool = False
\ No newline at end of file
@@ -1,5 +1,10 @@
 const API_URL = "http://localhost:8000";
 
+// One conversation per page load so sessions (and resets) stay isolated between tabs and users
+const CONVERSATION_ID = (window.crypto && window.crypto.randomUUID)
+    ? window.crypto.randomUUID()
+    : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+
 export const getAIMessage = async (userQuery, tools = null) => {
     try {
         const response = await fetch(`${API_URL}/chat`, {
@@ -11,7 +16,8 @@ export const getAIMessage = async (userQuery, tools = null) => {
             },
             body: JSON.stringify({
             message: userQuery,
-            tools: tools
+            tools: tools,
+            conversation_id: CONVERSATION_ID
             })
         });
         
@@ -38,6 +44,93 @@ export const getAIMessage = async (userQuery, tools = null) => {
     }
 };
 
+// Parse a Server-Sent Events buffer into complete events and the unparsed remainder
+const parseEvents = (buffer) => {
+    const blocks = buffer.split("\n\n");
+    const remainder = blocks.pop();
+    const events = blocks.map(block => {
+        let event = "message";
+        let data = "";
+        block.split("\n").forEach(line => {
+            if (line.startsWith("event:")) {
+                event = line.slice(6).trim();
+            } else if (line.startsWith("data:")) {
+                data += line.slice(5).trim();
+            }
+        });
+        return { event, data: data ? JSON.parse(data) : {} };
+    });
+    return { events, remainder };
+};
+
+// Stream a chat turn. Callbacks:
+//   onToken(text)     - a piece of assistant text
+//   onStatus(status)  - tool/answer stage updates, e.g. { stage: "tool", tool: "parts_info" }
+//   onReset()         - discard the text streamed so far (the answer is being regenerated)
+// Resolves with the final assistant message.
+export const streamAIMessage = async (userQuery, { onToken, onStatus, onReset } = {}, tools = null) => {
+    try {
+        const response = await fetch(`${API_URL}/chat/stream`, {
+            method: 'POST',
+            credentials: 'include',
+            headers: {
+            'Content-Type': 'application/json',
+            'Accept': 'text/event-stream'
+            },
+            body: JSON.stringify({
+            message: userQuery,
+            tools: tools,
+            conversation_id: CONVERSATION_ID
+            })
+        });
+
+        if (!response.ok || !response.body) {
+            throw new Error('Network response was not ok');
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+        let content = "";
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const parsed = parseEvents(buffer);
+            buffer = parsed.remainder;
+
+            for (const { event, data } of parsed.events) {
+                if (event === "token") {
+                    content += data.content;
+                    onToken && onToken(data.content);
+                } else if (event === "status") {
+                    onStatus && onStatus(data);
+                } else if (event === "reset") {
+                    content = "";
+                    onReset && onReset();
+                } else if (event === "done" || event === "error") {
+                    return { role: "assistant", content: data.content };
+                }
+            }
+        }
+
+        return { role: "assistant", content };
+        } catch (error) {
+        console.error('Error:', error);
+        if (error.message === 'Failed to fetch') {
+            return {
+            role: "assistant",
+            content: "Sorry, there was an error reaching the server."
+            };
+        }
+        return {
+            role: "assistant",
+            content: "Sorry, there was an error processing your request."
+        };
+    }
+};
+
 export const resetChat = async () => {
   try {
     const response = await fetch(`${API_URL}/reset`, {
@@ -46,7 +139,10 @@ export const resetChat = async () => {
       headers: {
         'Content-Type': 'application/json',
         'Accept': 'application/json'
-      }
+      },
+      body: JSON.stringify({
+        conversation_id: CONVERSATION_ID
+      })
     });
 
     if (!response.ok) {
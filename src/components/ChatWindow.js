@@ -1,6 +1,6 @@
 import React, { useState, useEffect, useRef } from "react";
 import "./ChatWindow.css";
-import { getAIMessage, resetChat } from "../api/api";
+import { streamAIMessage, resetChat } from "../api/api";
 import { marked } from "marked";
 
 // Function to extract YouTube video ID from URL
@@ -46,6 +46,7 @@ function ChatWindow() {
   const [messages, setMessages] = useState(defaultMessage);
   const [input, setInput] = useState("");
   const [isLoading, setIsLoading] = useState(false);
+  const [isStreaming, setIsStreaming] = useState(false);
 
   const messagesEndRef = useRef(null);
 
@@ -64,10 +65,40 @@ function ChatWindow() {
       setInput("");
       setIsLoading(true);
 
-      // Call API & set assistant message
-      const newMessage = await getAIMessage(input);
+      // Replace the content of the assistant message being streamed
+      const updateAssistantMessage = (update) => {
+        setMessages(prevMessages => {
+          const last = prevMessages[prevMessages.length - 1];
+          return [...prevMessages.slice(0, -1), { ...last, content: update(last.content) }];
+        });
+      };
+
+      // Call API & stream tokens into the assistant message as they arrive
+      let started = false;
+      const newMessage = await streamAIMessage(input, {
+        onToken: (token) => {
+          if (!started) {
+            started = true;
+            setIsStreaming(true);
+            setMessages(prevMessages => [...prevMessages, { role: "assistant", content: token }]);
+          } else {
+            updateAssistantMessage(content => content + token);
+          }
+        },
+        onReset: () => {
+          if (started) {
+            updateAssistantMessage(() => "");
+          }
+        }
+      });
+
+      if (started) {
+        updateAssistantMessage(() => newMessage.content);
+      } else {
+        setMessages(prevMessages => [...prevMessages, newMessage]);
+      }
+      setIsStreaming(false);
       setIsLoading(false);
-      setMessages(prevMessages => [...prevMessages, newMessage]);
     }
   };
 
@@ -92,7 +123,7 @@ function ChatWindow() {
           )}
         </div>
       ))}
-      {isLoading && (
+      {isLoading && !isStreaming && (
         <div className="assistant-message-container">
           <div className="message assistant-message typing-indicator">
             <span></span>